@@ -0,0 +1,165 @@
+"""Append-only segments holding the read links of a list, in ``<file>.archive/``.
+
+Each segment is a run of gzip members, each compressing consecutive
+``binary_storage.pack_link`` records. The snapshot lists every segment
+with the number of bytes it has committed, so bytes appended by an
+interrupted compaction are never read, and are cut off by the next
+append. Segments are never rewritten in place: dropping archived links
+writes new segments and the old ones are pruned once the snapshot no
+longer names them.
+
+Each member also gets a terms file, ``<segment>.<member offset>.terms``
+(see ``search_index``), so searches only decompress members that match.
+"""
+
+from __future__ import annotations
+
+import gzip
+import os
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from . import search_index
+from .binary_storage import pack_link, unpack_link, unpack_links
+from .models import Link
+
+SEGMENT_SUFFIX = ".gz"
+TERMS_SUFFIX = ".terms"
+# Appends go to a new segment once the current one reaches this size.
+SEGMENT_MAX_BYTES = 4 * 1024 * 1024
+# Larger appends are split, so reading one archived link back decompresses
+# at most this many.
+MEMBER_MAX_LINKS = 1000
+COMPRESSLEVEL = 6
+
+
+def read(directory: Path, segments: Iterable[tuple[str, int]]) -> Iterator[Link]:
+    """Lazily yield the archived links, one segment at a time.
+
+    Raises FileNotFoundError if a segment was pruned by a newer snapshot
+    and ValueError if one is shorter than the snapshot says.
+    """
+    for name, size in segments:
+        with (directory / name).open("rb") as handle:
+            data = handle.read(size)
+        if len(data) != size:
+            raise ValueError(f"Truncated archive segment {name}")
+        yield from unpack_links(gzip.decompress(data))
+
+
+def append(
+    directory: Path, segments: Iterable[tuple[str, int]], links: Iterable[Link]
+) -> list[tuple[str, int]]:
+    """Add *links* after *segments* and return the new segment table."""
+    segments = [*segments]
+    links = [*links]
+    if not links:
+        return segments
+    if segments and segments[-1][1] < SEGMENT_MAX_BYTES:
+        name, size = segments[-1]
+        mode = "r+b"
+    else:
+        directory.mkdir(parents=True, exist_ok=True)
+        name, size = _next_name(directory), 0
+        segments.append((name, size))
+        mode = "xb"
+    with (directory / name).open(mode) as handle:
+        # Drop whatever an interrupted append left after the committed end.
+        handle.truncate(size)
+        handle.seek(size)
+        for first in range(0, len(links), MEMBER_MAX_LINKS):
+            payload, terms = _member(links[first : first + MEMBER_MAX_LINKS])
+            handle.write(payload)
+            _terms_path(directory, name, size).write_bytes(terms)
+            size += len(payload)
+        handle.flush()
+        os.fsync(handle.fileno())
+    segments[-1] = (name, size)
+    return segments
+
+
+def _member(links: list[Link]) -> tuple[bytes, bytes]:
+    """Return one gzip member holding *links* and its terms file."""
+    records = [pack_link(link) for link in links]
+    payload = gzip.compress(b"".join(records), COMPRESSLEVEL, mtime=0)
+    offsets = [0]
+    for record in records[:-1]:
+        offsets.append(offsets[-1] + len(record))
+    return payload, search_index.encode(links, offsets, len(payload))
+
+
+def _terms_path(directory: Path, name: str, start: int) -> Path:
+    return directory / f"{name}.{start}{TERMS_SUFFIX}"
+
+
+def _member_start(path: Path) -> tuple[str, int] | None:
+    if not path.name.endswith(TERMS_SUFFIX):
+        return None
+    name, dot, start = path.name.removesuffix(TERMS_SUFFIX).rpartition(".")
+    if not dot or not start.isdigit():
+        return None
+    return name, int(start)
+
+
+def terms(
+    directory: Path, segments: Iterable[tuple[str, int]]
+) -> list[tuple[str, int, search_index.TermsFile]] | None:
+    """Return ``(segment, member offset, terms)`` for every archived member.
+
+    Returns None unless the terms files cover *segments* exactly, e.g. for
+    an archive written before they existed.
+    """
+    members = []
+    for name, size in segments:
+        start = 0
+        while start < size:
+            found = search_index.read(_terms_path(directory, name, start))
+            if found is None:
+                return None
+            members.append((name, start, found))
+            start += found.member_size
+        if start != size:
+            return None
+    return members
+
+
+def read_links(
+    directory: Path, name: str, start: int, size: int, record_offsets: list[int]
+) -> list[Link]:
+    """Decode the links at *record_offsets* of one member of segment *name*."""
+    with (directory / name).open("rb") as handle:
+        handle.seek(start)
+        data = gzip.decompress(handle.read(size))
+    return [unpack_link(data, offset) for offset in record_offsets]
+
+
+def _next_name(directory: Path) -> str:
+    numbers = [
+        int(path.name.removesuffix(SEGMENT_SUFFIX))
+        for path in directory.glob(f"*{SEGMENT_SUFFIX}")
+        if path.name.removesuffix(SEGMENT_SUFFIX).isdigit()
+    ]
+    return f"{max(numbers, default=0) + 1:06d}{SEGMENT_SUFFIX}"
+
+
+def prune(directory: Path, segments: Iterable[tuple[str, int]]) -> None:
+    """Delete the segments and terms files of *directory* not in *segments*."""
+    keep = dict(segments)
+    try:
+        paths = [*directory.iterdir()]
+    except FileNotFoundError:
+        return
+    for path in paths:
+        member = _member_start(path)
+        if member is not None:
+            name, start = member
+            if start < keep.get(name, 0):
+                continue
+        elif path.name in keep:
+            continue
+        path.unlink(missing_ok=True)
+    if not keep:
+        try:
+            directory.rmdir()
+        except OSError:
+            pass
@@ -0,0 +1,236 @@
+"""Compact binary encoding for reading list snapshots.
+
+Layout (little-endian)::
+
+    header   "BEJW", format version u16, flags u16, capacity u32,
+             list version u64, host count u32, link count u32
+    hosts    per host: byte length u32, UTF-8 "scheme://host"
+    records  per link: byte length u32 of the rest of the record, host
+             index u32, created_key i64, then the character lengths u32
+             of id, url path, title, created_at and read_at (NO_VALUE for
+             a missing read_at), then those five strings as one UTF-8 run,
+             followed by a JSON object of the link's ``extras`` if it has any
+    archive  only with the ARCHIVE_FLAG flag: segment count u32, then per
+             segment its name (byte length u32, UTF-8) and size u64
+
+Each URL is stored as an index into the host table plus the rest of the
+URL, so a list of links from a few sites stays small. Storing the parsed
+``created_key`` lets loading skip timestamp parsing altogether. Strings are
+encoded with ``surrogatepass``, so that arguments that were not valid
+UTF-8 (which Python passes on as lone surrogates) round-trip.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+from typing import Iterator, Sequence
+
+from .models import Link, ReadingList
+
+MAGIC = b"BEJW"
+FORMAT_VERSION = 1
+NO_VALUE = 0xFFFFFFFF
+# Used for URLs without a "scheme://host" part.
+NO_HOST = 0xFFFFFFFF
+# Set in the header flags when the archive segment table follows the records.
+ARCHIVE_FLAG = 1
+
+_HEADER = struct.Struct("<4sHHIQII")
+_LENGTH = struct.Struct("<I")
+_RECORD = struct.Struct("<IIq5I")
+_SIZE = struct.Struct("<Q")
+_NO_EXTRAS: dict = {}
+_ERRORS = "surrogatepass"
+
+
+def is_binary(data: bytes) -> bool:
+    return data[: len(MAGIC)] == MAGIC
+
+
+def _split_url(url: str) -> tuple[str, str]:
+    start = url.find("://")
+    if start < 0:
+        return "", url
+    end = url.find("/", start + 3)
+    if end < 0:
+        return url, ""
+    return url[:end], url[end:]
+
+
+def _extras_text(link: Link) -> str:
+    if link.final_url is None and link.dead_at is None:
+        return ""
+    return json.dumps(link.extras(), ensure_ascii=False, separators=(",", ":"))
+
+
+def pack_link(link: Link) -> bytes:
+    """Return one self-contained record (no host table) for *link*."""
+    read_at = link.read_at or ""
+    extras = _extras_text(link)
+    text = f"{link.id}{link.url}{link.title}{link.created_at}{read_at}{extras}".encode(
+        "utf-8", _ERRORS
+    )
+    return (
+        _RECORD.pack(
+            len(text) + _RECORD.size - _LENGTH.size,
+            NO_HOST,
+            link.created_key,
+            len(link.id),
+            len(link.url),
+            len(link.title),
+            len(link.created_at),
+            NO_VALUE if link.read_at is None else len(read_at),
+        )
+        + text
+    )
+
+
+def _decode_record(
+    buffer: bytes, offset: int, host_prefix: Sequence[str]
+) -> tuple[Link, int]:
+    """Decode the record at *offset*, returning the link and the next offset.
+
+    ``host_prefix[index]`` is the "scheme://host" put in front of the stored
+    URL path; records without a host index keep the stored URL as it is.
+    """
+    size, host, key, id_end, url, title, created, read = _RECORD.unpack_from(
+        buffer, offset
+    )
+    end = offset + _LENGTH.size + size
+    text = buffer[offset + _RECORD.size : end].decode("utf-8", _ERRORS)
+    url += id_end
+    title += url
+    created += title
+    fields_end = created if read == NO_VALUE else created + read
+    link = Link.restore(
+        text[:id_end],
+        text[id_end:url] if host == NO_HOST else host_prefix[host] + text[id_end:url],
+        text[url:title],
+        text[title:created],
+        None if read == NO_VALUE else text[created:fields_end],
+        key,
+        **(json.loads(text[fields_end:]) if len(text) > fields_end else _NO_EXTRAS),
+    )
+    return link, end
+
+
+def unpack_link(data: bytes, offset: int) -> Link:
+    """Decode the record written by ``pack_link`` at *offset* of *data*."""
+    return _decode_record(data, offset, ())[0]
+
+
+def unpack_links(data: bytes) -> Iterator[Link]:
+    """Decode consecutive ``pack_link`` records filling *data*."""
+    offset = 0
+    end = len(data)
+    while offset < end:
+        link, offset = _decode_record(data, offset, ())
+        yield link
+
+
+def encode(reading_list: ReadingList) -> bytes:
+    """Return the binary snapshot of *reading_list*."""
+    hosts: dict[str, int] = {}
+    records = []
+    pack_record = _RECORD.pack
+    for link in reading_list.links:
+        host, rest = _split_url(link.url)
+        if host:
+            index = hosts.setdefault(host, len(hosts))
+        else:
+            index = NO_HOST
+        read_at = link.read_at or ""
+        extras = _extras_text(link)
+        text = f"{link.id}{rest}{link.title}{link.created_at}{read_at}{extras}".encode(
+            "utf-8", _ERRORS
+        )
+        records.append(
+            pack_record(
+                len(text) + _RECORD.size - _LENGTH.size,
+                index,
+                link.created_key,
+                len(link.id),
+                len(rest),
+                len(link.title),
+                len(link.created_at),
+                NO_VALUE if link.read_at is None else len(read_at),
+            )
+        )
+        records.append(text)
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        ARCHIVE_FLAG if reading_list.archive else 0,
+        reading_list.capacity,
+        reading_list.version,
+        len(hosts),
+        len(reading_list.links),
+    )
+    host_table = []
+    for host in hosts:
+        encoded = host.encode("utf-8", _ERRORS)
+        host_table.append(_LENGTH.pack(len(encoded)))
+        host_table.append(encoded)
+    archive_table = []
+    if reading_list.archive:
+        archive_table.append(_LENGTH.pack(len(reading_list.archive)))
+        for name, size in reading_list.archive:
+            encoded = name.encode()
+            archive_table += [_LENGTH.pack(len(encoded)), encoded, _SIZE.pack(size)]
+    return b"".join([header, *host_table, *records, *archive_table])
+
+
+def decode(data: bytes) -> ReadingList:
+    """Build a ReadingList from a binary snapshot.
+
+    Raises ValueError if *data* is not a snapshot this version can read.
+    """
+    if len(data) < _HEADER.size or not is_binary(data):
+        raise ValueError("Not a bejw binary snapshot")
+    _magic, format_version, flags, capacity, version, host_count, link_count = (
+        _HEADER.unpack_from(data)
+    )
+    if format_version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported bejw binary format version {format_version}")
+    try:
+        links, offset = _decode_links(data, host_count, link_count)
+        archive = _decode_archive(data, offset) if flags & ARCHIVE_FLAG else []
+    except (struct.error, IndexError) as error:
+        raise ValueError("Truncated bejw binary snapshot") from error
+    reading_list = ReadingList(capacity=capacity, links=links)
+    reading_list.version = version
+    reading_list.archive = archive
+    return reading_list
+
+
+def _decode_links(
+    data: bytes, host_count: int, link_count: int
+) -> tuple[list[Link], int]:
+    offset = _HEADER.size
+    hosts = []
+    for _index in range(host_count):
+        (size,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        hosts.append(data[offset : offset + size].decode("utf-8", _ERRORS))
+        offset += size
+    links = []
+    for _index in range(link_count):
+        link, offset = _decode_record(data, offset, hosts)
+        links.append(link)
+    return links, offset
+
+
+def _decode_archive(data: bytes, offset: int) -> list[tuple[str, int]]:
+    (count,) = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    archive = []
+    for _index in range(count):
+        (size,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        name = data[offset : offset + size].decode()
+        offset += size
+        (segment_size,) = _SIZE.unpack_from(data, offset)
+        offset += _SIZE.size
+        archive.append((name, segment_size))
+    return archive
@@ -0,0 +1,223 @@
+"""Probe links for ``bejw check``: still there, moved elsewhere or dead.
+
+Links are probed on ``fetch.run_concurrently``'s threads, like pages are
+fetched, but politely per host: at most ``HOST_CONCURRENCY`` requests to
+a host at once, started at least ``HOST_INTERVAL`` seconds apart. URLs
+are interleaved by host, so that the threads waiting on one busy host
+are few. A probe is a HEAD request, sent again as
+a GET when the server fails it. Results are cached per URL with the
+validators of the final response; a result younger than the TTL is
+reused as is, an older one is revalidated with a conditional request.
+"""
+
+from __future__ import annotations
+
+import http.client
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from enum import StrEnum
+from itertools import chain, zip_longest
+from pathlib import Path
+from typing import Iterable
+from urllib.parse import urljoin, urlsplit
+
+from .fetch import (
+    CONCURRENCY,
+    MAX_REDIRECTS,
+    REDIRECT_STATUSES,
+    TIMEOUT,
+    USER_AGENT,
+    ConnectionPool,
+    FetchError,
+    ResponseCache,
+    run_concurrently,
+)
+
+HOST_CONCURRENCY = 2
+HOST_INTERVAL = 0.1
+TTL = 24 * 60 * 60.0
+# Answers meaning the page is gone, rather than unreachable for now.
+DEAD_STATUSES = frozenset({404, 410})
+# Resolver errors meaning the host name does not exist (NXDOMAIN). Others,
+# such as EAI_AGAIN, or a refused connection, may clear up by themselves.
+DEAD_LOOKUP_ERRORS = frozenset({socket.EAI_NONAME})
+
+
+class Status(StrEnum):
+    OK = "ok"
+    DEAD = "dead"
+    FAILED = "failed"
+
+
+@dataclass(frozen=True, slots=True)
+class CheckResult:
+    """How probing *url* went; *final_url* is set when it redirected."""
+
+    url: str
+    status: Status
+    final_url: str | None = None
+    detail: str | None = None
+
+
+class _HostLimit:
+    """Rate limit for one host, entered around each probe by any thread."""
+
+    def __init__(self, concurrency: int, interval: float) -> None:
+        self._semaphore = threading.Semaphore(concurrency)
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def __enter__(self) -> None:
+        self._semaphore.acquire()
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self._interval
+        if start > now:
+            time.sleep(start - now)
+
+    def __exit__(self, *exc_info) -> None:
+        self._semaphore.release()
+
+
+def _request(
+    pool: ConnectionPool, url: str, headers: dict[str, str]
+) -> tuple[int, http.client.HTTPMessage]:
+    try:
+        status, response_headers, _body, _complete = pool.request(url, headers, "HEAD")
+    except (http.client.HTTPException, ConnectionResetError):
+        status = None
+    if status is None or status >= 400:
+        # Some servers refuse or mishandle HEAD; ask for the page itself.
+        status, response_headers, _body, _complete = pool.request(url, headers)
+    return status, response_headers
+
+
+def _probe(
+    pool: ConnectionPool, url: str, cached: dict | None
+) -> tuple[int, http.client.HTTPMessage, str]:
+    """Follow *url*'s redirects; return the final status, headers and URL."""
+    current = url
+    for _redirect in range(MAX_REDIRECTS + 1):
+        headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "identity"}
+        if cached is not None and cached.get("validated_url") == current:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+        status, response_headers = _request(pool, current, headers)
+        if status not in REDIRECT_STATUSES or "Location" not in response_headers:
+            return status, response_headers, current
+        current = urljoin(current, response_headers["Location"])
+    raise FetchError("Too many redirects")
+
+
+def _from_cache(cached: dict) -> CheckResult:
+    result = cached["result"]
+    return CheckResult(
+        cached["url"], Status(result["status"]), result["final_url"], result["detail"]
+    )
+
+
+def _check_one(
+    pool: ConnectionPool, cache: ResponseCache, url: str, cached: dict | None
+) -> CheckResult:
+    response_headers = None
+    final = url
+    try:
+        status, response_headers, final = _probe(pool, url, cached)
+    except socket.gaierror as error:
+        if error.errno not in DEAD_LOOKUP_ERRORS:
+            return CheckResult(url, Status.FAILED, detail=str(error))
+        result = CheckResult(url, Status.DEAD, detail=str(error))
+    except (OSError, http.client.HTTPException, FetchError, ValueError) as error:
+        return CheckResult(
+            url, Status.FAILED, detail=str(error) or type(error).__name__
+        )
+    else:
+        if status == 304 and cached is not None:
+            result = _from_cache(cached)
+        elif status < 300:
+            result = CheckResult(url, Status.OK, final if final != url else None)
+        elif status in DEAD_STATUSES:
+            result = CheckResult(url, Status.DEAD, detail=f"HTTP {status}")
+        else:
+            # Forbidden, rate limited, server errors: nothing is known yet.
+            return CheckResult(url, Status.FAILED, detail=f"HTTP {status}")
+    etag = last_modified = None
+    if response_headers is not None:
+        # A 304 need not repeat the validators it confirmed.
+        previous = cached if status == 304 and cached is not None else {}
+        etag = response_headers.get("ETag") or previous.get("etag")
+        last_modified = response_headers.get("Last-Modified") or previous.get(
+            "last_modified"
+        )
+    cache.put(
+        url,
+        {
+            "url": url,
+            "checked_at": time.time(),
+            "validated_url": final,
+            "etag": etag,
+            "last_modified": last_modified,
+            "result": {
+                "status": result.status,
+                "final_url": result.final_url,
+                "detail": result.detail,
+            },
+        },
+    )
+    return result
+
+
+def _host(url: str) -> str:
+    try:
+        return urlsplit(url).netloc.lower()
+    except ValueError:
+        return ""
+
+
+def _interleave(urls: list[str]) -> list[str]:
+    """Reorder *urls* round-robin by host."""
+    by_host: dict[str, list[str]] = {}
+    for url in urls:
+        by_host.setdefault(_host(url), []).append(url)
+    rounds = zip_longest(*by_host.values())
+    return [url for url in chain.from_iterable(rounds) if url is not None]
+
+
+def check_links(
+    urls: Iterable[str],
+    cache_dir: Path | None = None,
+    ttl: float = TTL,
+    concurrency: int = CONCURRENCY,
+    timeout: float = TIMEOUT,
+    host_concurrency: int = HOST_CONCURRENCY,
+    host_interval: float = HOST_INTERVAL,
+) -> dict[str, CheckResult]:
+    """Probe every distinct URL of *urls*, keyed by URL.
+
+    Results cached in *cache_dir* less than *ttl* seconds ago are reused
+    without a request. Network errors become FAILED results, never raised.
+    """
+    unique = _interleave([*dict.fromkeys(urls)])
+    cache = ResponseCache(cache_dir)
+    limits = {
+        host: _HostLimit(host_concurrency, host_interval)
+        for host in {_host(url) for url in unique}
+    }
+    now = time.time()
+
+    def _check(pool: ConnectionPool, url: str) -> CheckResult:
+        cached = cache.get(url)
+        if cached is not None and now - cached.get("checked_at", 0) < ttl:
+            return _from_cache(cached)
+        with limits[_host(url)]:
+            return _check_one(pool, cache, url, cached)
+
+    results = run_concurrently(_check, unique, concurrency, timeout)
+    cache.prune()
+    return results
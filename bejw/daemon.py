@@ -0,0 +1,242 @@
+"""``bejw serve``: keep a reading list in memory and answer over a Unix socket.
+
+The protocol is one compact JSON object per line in each direction. Every
+request names an ``op``; a response is either the op's result or
+``{"error": code}`` where code is ``invalid``, ``missing`` or ``full``.
+"""
+
+from __future__ import annotations
+
+import json
+import socket
+import socketserver
+from itertools import islice
+from pathlib import Path
+from typing import Callable, TypeVar
+
+from . import storage
+from .models import CapacityError, ConflictError, Link, OnDuplicate, ReadingList
+
+CLIENT_TIMEOUT = 10.0
+
+T = TypeVar("T")
+
+
+class NoReplyError(Exception):
+    """Raised when a request that changes the list got no reply.
+
+    The daemon may have applied it, so it must not be retried directly.
+    """
+
+    def __init__(self, message: str = "bejw serve did not reply") -> None:
+        super().__init__(message)
+
+
+class RequestError(Exception):
+    """Raised by an op to send ``{"error": code}`` back to the client."""
+
+    def __init__(self, code: str) -> None:
+        super().__init__(code)
+        self.code = code
+
+
+def socket_path(file_path: str) -> Path:
+    path = storage.storage_path(file_path)
+    return path.with_name(path.name + storage.SOCKET_SUFFIX)
+
+
+def _encode(payload: dict) -> bytes:
+    return json.dumps(payload, separators=(",", ":")).encode() + b"\n"
+
+
+def _read_only(payload: dict) -> bool:
+    op = payload.get("op")
+    return op in ("ping", "list", "read") or (
+        op == "capacity" and payload.get("value") is None
+    )
+
+
+def request(file_path: str, payload: dict) -> dict | None:
+    """Send *payload* to a running daemon; None if none is serving *file_path*.
+
+    None also when the daemon could not have acted on *payload*: it was not
+    sent whole, or it only reads the list. Raises NoReplyError when a change
+    was sent but the reply timed out or was cut off.
+    """
+    path = socket_path(file_path)
+    if not path.exists():
+        return None
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(CLIENT_TIMEOUT)
+        try:
+            client.connect(str(path))
+        except (ConnectionRefusedError, FileNotFoundError):
+            # A socket left behind by a daemon that is gone.
+            return None
+        try:
+            client.sendall(_encode(payload))
+        except OSError:
+            # Without the whole line the daemon cannot have acted on it.
+            return None
+        try:
+            with client.makefile("rb") as reader:
+                return json.loads(reader.readline())
+        except (OSError, ValueError):
+            # The daemon died or stalled mid-request (a timeout is an
+            # OSError, and a cut-off response a JSON error).
+            if _read_only(payload):
+                return None
+            raise NoReplyError()
+
+
+class Daemon:
+    """The in-memory state behind ``bejw serve`` and its op handlers."""
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        self.reading_list: ReadingList | None = None
+
+    def _current(self) -> ReadingList:
+        # Other processes may still write the file directly (e.g. `init`).
+        if self.reading_list is None or storage.is_stale(
+            self.reading_list, self.file_path
+        ):
+            self.reading_list = storage.load(self.file_path)
+        return self.reading_list
+
+    def _mutate(self, mutate: Callable[[ReadingList], T]) -> T:
+        for _attempt in range(storage.UPDATE_ATTEMPTS):
+            with storage.lock(self.file_path):
+                reading_list = self._current()
+                try:
+                    result = mutate(reading_list)
+                    storage.save(reading_list, self.file_path)
+                except ConflictError:
+                    self.reading_list = None
+                    continue
+                except RequestError:
+                    raise
+                except BaseException:
+                    # The in-memory copy may be half-mutated; reload it.
+                    self.reading_list = None
+                    raise
+                return result
+        raise ConflictError()
+
+    @staticmethod
+    def _resolve(reading_list: ReadingList, spec: str) -> list[tuple[int, Link]]:
+        try:
+            return reading_list.resolve_spec(spec)
+        except ValueError:
+            raise RequestError("invalid")
+        except LookupError:
+            raise RequestError("missing")
+
+    def handle(self, payload: dict) -> dict:
+        handler = getattr(self, f"op_{payload.get('op', '').replace('-', '_')}", None)
+        if handler is None:
+            return {"error": "unknown-op"}
+        try:
+            return handler(payload)
+        except RequestError as error:
+            return {"error": error.code}
+
+    def op_ping(self, payload: dict) -> dict:
+        return {}
+
+    def op_add(self, payload: dict) -> dict:
+        url = payload["url"]
+        on_duplicate = OnDuplicate(payload.get("on_duplicate", OnDuplicate.ADD))
+
+        def _add(reading_list: ReadingList) -> tuple[int, bool]:
+            duplicate = reading_list.duplicate_of(url) is not None
+            try:
+                link = reading_list.add_link(url, payload["title"], on_duplicate)
+            except CapacityError:
+                raise RequestError("full")
+            number = reading_list.unread_number(link.id) or reading_list.unread_count()
+            return number, duplicate
+
+        number, duplicate = self._mutate(_add)
+        return {"number": number, "duplicate": duplicate}
+
+    def op_list(self, payload: dict) -> dict:
+        reading_list = self._current()
+        offset, limit = payload.get("offset", 0), payload.get("limit")
+        numbered = reading_list.iter_links(
+            include_read=payload.get("include_read", False),
+            reverse=payload.get("reverse", False),
+        )
+        stop = None if limit is None else offset + limit
+        links = [
+            [number, link.to_dict()] for number, link in islice(numbered, offset, stop)
+        ]
+        return {
+            "capacity": reading_list.capacity,
+            "unread_count": reading_list.unread_count(),
+            "links": links,
+        }
+
+    def op_read(self, payload: dict) -> dict:
+        resolved = self._resolve(self._current(), payload["numbers"])
+        return {"links": [[number, link.url] for number, link in resolved]}
+
+    def op_mark_read(self, payload: dict) -> dict:
+        def _mark_read(reading_list: ReadingList) -> list[int]:
+            resolved = self._resolve(reading_list, payload["numbers"])
+            for _number, link in resolved:
+                reading_list.mark_read(link.id)
+            return [number for number, _link in resolved]
+
+        return {"numbers": self._mutate(_mark_read)}
+
+    def op_remove(self, payload: dict) -> dict:
+        def _remove(reading_list: ReadingList) -> None:
+            for _number, link in self._resolve(reading_list, payload["numbers"]):
+                reading_list.remove_link(link.id)
+
+        self._mutate(_remove)
+        return {}
+
+    def op_capacity(self, payload: dict) -> dict:
+        value = payload.get("value")
+        if value is None:
+            return {"capacity": self._current().capacity}
+
+        def _set_capacity(reading_list: ReadingList) -> None:
+            reading_list.capacity = value
+
+        self._mutate(_set_capacity)
+        return {"capacity": value}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "_Server"
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                payload = json.loads(line)
+            except json.JSONDecodeError:
+                response = {"error": "bad-request"}
+            else:
+                response = self.server.daemon.handle(payload)
+            self.wfile.write(_encode(response))
+            self.wfile.flush()
+
+
+class _Server(socketserver.UnixStreamServer):
+    def __init__(self, path: Path, daemon: Daemon) -> None:
+        self.daemon = daemon
+        super().__init__(str(path), _Handler)
+
+
+def make_server(file_path: str) -> socketserver.UnixStreamServer:
+    """Bind the socket for *file_path*; requests are handled one at a time."""
+    path = socket_path(file_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        if request(file_path, {"op": "ping"}) is not None:
+            raise OSError(f"bejw is already serving {storage.storage_path(file_path)}")
+        path.unlink()
+    return _Server(path, Daemon(file_path))
@@ -0,0 +1,355 @@
+"""Fetch page titles for links added without one.
+
+Pages are fetched concurrently: each request runs on one of at most
+``CONCURRENCY`` worker threads, over a keep-alive connection from a
+per-host pool, with a socket timeout of ``TIMEOUT``.
+Only the first ``MAX_BYTES`` of a page are read, since titles live in its
+head. What a page yields is cached per URL in the cache directory along
+with its ETag and Last-Modified, so fetching it again costs one
+conditional request that the server can answer with 304. The cache keeps
+the ``CACHE_MAX_ENTRIES`` most recently used URLs.
+
+``run_concurrently`` and ``get`` are also how ``pages`` downloads whole
+pages for reading offline.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import http.client
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from functools import partial
+from itertools import repeat
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Callable, Iterable, TypeVar
+from urllib.parse import urljoin, urlsplit
+
+from .storage import write_atomic
+
+CONCURRENCY = 16
+TIMEOUT = 10.0
+MAX_REDIRECTS = 5
+MAX_BYTES = 256 * 1024
+CACHE_MAX_ENTRIES = 10_000
+USER_AGENT = "bejw (+https://github.com/menisadi/bejw)"
+
+_CONNECTIONS = {
+    "http": http.client.HTTPConnection,
+    "https": http.client.HTTPSConnection,
+}
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+# Raised by a keep-alive connection the server has closed meanwhile.
+_STALE = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+T = TypeVar("T")
+
+
+class FetchError(Exception):
+    """Raised when a page cannot be fetched."""
+
+
+@dataclass(frozen=True, slots=True)
+class PageInfo:
+    """What fetching *url* taught us; *error* is set instead if it failed."""
+
+    url: str
+    title: str | None = None
+    canonical_url: str | None = None
+    content_length: int | None = None
+    error: str | None = None
+
+
+class _HeadParser(HTMLParser):
+    """Collect the title and the canonical link of an HTML page."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.title: str | None = None
+        self.og_title: str | None = None
+        self.canonical: str | None = None
+        self._title_parts: list[str] | None = None
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        values = {name: value or "" for name, value in attrs}
+        if tag == "title" and self.title is None:
+            self._title_parts = []
+        elif tag == "meta" and values.get("property") == "og:title":
+            self.og_title = self.og_title or values.get("content") or None
+        elif tag == "link" and "canonical" in values.get("rel", "").lower().split():
+            self.canonical = self.canonical or values.get("href") or None
+
+    def handle_data(self, data: str) -> None:
+        if self._title_parts is not None:
+            self._title_parts.append(data)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "title" and self._title_parts is not None:
+            self.title = " ".join("".join(self._title_parts).split()) or None
+            self._title_parts = None
+
+
+def parse_head(html: str, base_url: str) -> tuple[str | None, str | None]:
+    """Return the title and absolute canonical URL declared by *html*."""
+    parser = _HeadParser()
+    parser.feed(html)
+    title = parser.title or parser.og_title
+    canonical = None
+    if parser.canonical:
+        canonical = urljoin(base_url, parser.canonical.strip())
+        if urlsplit(canonical).scheme not in _CONNECTIONS:
+            canonical = None
+    return title, canonical
+
+
+class ConnectionPool:
+    """Keep-alive connections per ``(scheme, host)``, shared by worker threads."""
+
+    def __init__(self, timeout: float) -> None:
+        self.timeout = timeout
+        self._idle: dict[tuple[str, str], list[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    def _acquire(self, key: tuple[str, str]) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        scheme, netloc = key
+        return _CONNECTIONS[scheme](netloc, timeout=self.timeout), False
+
+    def _release(
+        self, key: tuple[str, str], connection: http.client.HTTPConnection
+    ) -> None:
+        with self._lock:
+            self._idle.setdefault(key, []).append(connection)
+
+    def close(self) -> None:
+        with self._lock:
+            for connections in self._idle.values():
+                for connection in connections:
+                    connection.close()
+            self._idle.clear()
+
+    def request(
+        self,
+        url: str,
+        headers: dict[str, str],
+        method: str = "GET",
+        max_bytes: int = MAX_BYTES,
+    ) -> tuple[int, http.client.HTTPMessage, bytes, bool]:
+        """Send one request for *url*; return the status, the headers, at
+        most *max_bytes* of the body and whether that is the whole body."""
+        parts = urlsplit(url)
+        if parts.scheme not in _CONNECTIONS or not parts.netloc:
+            raise FetchError(f"Not an http(s) URL: {url}")
+        key = (parts.scheme, parts.netloc)
+        target = parts.path or "/"
+        if parts.query:
+            target += f"?{parts.query}"
+        while True:
+            connection, reused = self._acquire(key)
+            try:
+                connection.request(method, target, headers=headers)
+                response = connection.getresponse()
+            except _STALE:
+                connection.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                connection.close()
+                raise
+            break
+        try:
+            body = response.read(max_bytes)
+        except BaseException:
+            connection.close()
+            raise
+        complete = response.isclosed()
+        if complete and not response.will_close:
+            self._release(key, connection)
+        else:
+            connection.close()
+        return response.status, response.headers, body, complete
+
+
+class ResponseCache:
+    """What was learned per URL, and its validators, in one JSON file each."""
+
+    def __init__(self, directory: Path | None) -> None:
+        self.directory = directory
+
+    def _path(self, url: str) -> Path:
+        return self.directory / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+    def get(self, url: str) -> dict | None:
+        if self.directory is None:
+            return None
+        path = self._path(url)
+        try:
+            entry = json.loads(path.read_bytes())
+        except (OSError, ValueError):
+            return None
+        if entry.get("url") != url:
+            return None
+        try:
+            # Marks the entry as recently used for prune().
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, url: str, entry: dict) -> None:
+        if self.directory is None:
+            return
+        try:
+            write_atomic(self._path(url), json.dumps(entry).encode(), durable=False)
+        except OSError:
+            # The cache is only an optimisation, e.g. for a read-only directory.
+            return
+
+    def prune(self, max_entries: int = CACHE_MAX_ENTRIES) -> None:
+        """Drop the least recently used entries past *max_entries*."""
+        if self.directory is None:
+            return
+        try:
+            paths = [*self.directory.glob("*.json")]
+        except OSError:
+            return
+        if len(paths) <= max_entries:
+            return
+        entries = []
+        for path in paths:
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        entries.sort()
+        for _mtime, path in entries[: max(len(entries) - max_entries, 0)]:
+            path.unlink(missing_ok=True)
+
+
+def _charset(headers: http.client.HTTPMessage) -> str:
+    charset = headers.get_content_charset() or "utf-8"
+    try:
+        "".encode(charset)
+    except LookupError:
+        return "utf-8"
+    return charset
+
+
+def get(
+    pool: ConnectionPool,
+    url: str,
+    headers: dict[str, str],
+    max_bytes: int = MAX_BYTES,
+) -> tuple[int, http.client.HTTPMessage, bytes, bool, str]:
+    """GET *url* over *pool*, following redirects.
+
+    Returns what ``ConnectionPool.request`` does for the last response,
+    followed by the URL it came from.
+    """
+    headers = dict(headers)
+    current = url
+    for _redirect in range(MAX_REDIRECTS + 1):
+        status, response_headers, body, complete = pool.request(
+            current, headers, max_bytes=max_bytes
+        )
+        if status not in REDIRECT_STATUSES or "Location" not in response_headers:
+            return status, response_headers, body, complete, current
+        current = urljoin(current, response_headers["Location"])
+        # Validators only apply to the URL they were cached for.
+        headers.pop("If-None-Match", None)
+        headers.pop("If-Modified-Since", None)
+    raise FetchError("Too many redirects")
+
+
+def _fetch_one(pool: ConnectionPool, cache: ResponseCache, url: str) -> PageInfo:
+    cached = cache.get(url)
+    headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "identity"}
+    if cached is not None:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    status, response_headers, body, complete, current = get(pool, url, headers)
+    if status == 304 and cached is not None:
+        return PageInfo(**cached["info"])
+    if status >= 400:
+        raise FetchError(f"HTTP {status}")
+    length = response_headers.get("Content-Length")
+    content_length = int(length) if length and length.isdigit() else None
+    if content_length is None and complete:
+        content_length = len(body)
+    title = canonical = None
+    if response_headers.get_content_type() in ("text/html", "application/xhtml+xml"):
+        title, canonical = parse_head(
+            body.decode(_charset(response_headers), errors="replace"), current
+        )
+    info = PageInfo(url, title, canonical, content_length)
+    etag = response_headers.get("ETag")
+    last_modified = response_headers.get("Last-Modified")
+    if etag or last_modified:
+        cache.put(
+            url,
+            {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "info": asdict(info),
+            },
+        )
+    return info
+
+
+def _fetch_safely(pool: ConnectionPool, url: str, cache: ResponseCache) -> PageInfo:
+    try:
+        return _fetch_one(pool, cache, url)
+    except (OSError, http.client.HTTPException, FetchError, ValueError) as error:
+        return PageInfo(url, error=str(error) or type(error).__name__)
+
+
+def run_concurrently(
+    worker: Callable[[ConnectionPool, str], T],
+    urls: Iterable[str],
+    concurrency: int = CONCURRENCY,
+    timeout: float = TIMEOUT,
+) -> dict[str, T]:
+    """Call ``worker(pool, url)`` for every distinct URL of *urls*, keyed by URL.
+
+    Calls run on at most *concurrency* threads and share one connection
+    pool; *worker* is expected to turn network errors into results.
+    """
+    unique = [*dict.fromkeys(urls)]
+    if not unique:
+        return {}
+    pool = ConnectionPool(timeout)
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return dict(zip(unique, executor.map(worker, repeat(pool), unique)))
+    finally:
+        pool.close()
+
+
+def fetch_pages(
+    urls: Iterable[str],
+    cache_dir: Path | None = None,
+    concurrency: int = CONCURRENCY,
+    timeout: float = TIMEOUT,
+) -> dict[str, PageInfo]:
+    """Fetch every distinct URL of *urls* concurrently, keyed by URL.
+
+    A page that cannot be fetched gets a PageInfo with only *error* set;
+    this never raises for network errors.
+    """
+    cache = ResponseCache(cache_dir)
+    pages = run_concurrently(
+        partial(_fetch_safely, cache=cache), urls, concurrency, timeout
+    )
+    cache.prune()
+    return pages
@@ -0,0 +1,313 @@
+"""Read links from bookmark and read-later exports, for ``bejw import``.
+
+Each reader parses its file incrementally and yields one ``Link`` at a time,
+so an export with hundreds of thousands of entries is never held in memory
+as a document:
+
+- ``html``: Netscape bookmark files, as exported by every browser and by
+  Pocket; links under a heading containing "Archive" are read
+- ``json``: Chrome's ``Bookmarks`` file, Firefox's JSON backups, or any JSON
+  whose objects have a ``url`` (or ``uri``/``href``) field
+- ``csv``: Pocket and Instapaper exports, or any CSV with a ``url`` column;
+  rows whose ``status`` or ``folder`` is ``archive`` are read
+
+Timestamps are kept as ``created_at``. Exports don't say when an archived
+link was read, so read links get their ``created_at`` as ``read_at`` unless
+the export has a ``read_at`` or ``time_read`` field. Only http(s) URLs are
+imported; titles are not fetched, and untitled links get their URL.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import re
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+from json.decoder import scanstring
+from pathlib import Path
+from typing import Iterator, TextIO
+from uuid import uuid4
+
+from .models import ImportFormat, Link
+
+CHUNK_SIZE = 64 * 1024
+# Longest number or literal a JSON scalar is expected to need.
+_SCALAR_LOOKAHEAD = 64
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_SCALAR = re.compile(r"true|false|null|-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?")
+# Microseconds between 1601-01-01, the epoch of Chrome's timestamps, and 1970.
+_WINDOWS_EPOCH_OFFSET = 11_644_473_600_000_000
+_URL_FIELDS = ("url", "uri", "href")
+_TITLE_FIELDS = ("title", "name")
+_CREATED_FIELDS = (
+    "created_at",
+    "date_added",
+    "dateadded",
+    "time_added",
+    "add_date",
+    "timestamp",
+)
+_READ_FIELDS = ("read_at", "time_read")
+
+
+_SUFFIXES = {
+    ".html": ImportFormat.HTML,
+    ".htm": ImportFormat.HTML,
+    ".json": ImportFormat.JSON,
+    ".csv": ImportFormat.CSV,
+}
+
+
+def detect_format(path: Path) -> ImportFormat:
+    """Guess the format of *path* from its suffix, or else its first character."""
+    suffix_format = _SUFFIXES.get(path.suffix.lower())
+    if suffix_format is not None:
+        return suffix_format
+    with path.open(encoding="utf-8-sig", errors="replace") as handle:
+        start = handle.read(1024).lstrip()
+    if start.startswith("<"):
+        return ImportFormat.HTML
+    if start.startswith(("{", "[")):
+        return ImportFormat.JSON
+    return ImportFormat.CSV
+
+
+def _timestamp(value: object) -> str | None:
+    """Normalize an export's timestamp to an ISO string, or None if unusable.
+
+    Numbers are epoch seconds, milliseconds or microseconds, told apart by
+    magnitude; Chrome's microseconds since 1601 are larger than any of them.
+    """
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+        try:
+            value = float(value)
+        except ValueError:
+            try:
+                parsed = datetime.fromisoformat(value)
+            except ValueError:
+                return None
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed.isoformat()
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        return None
+    if value >= 1e16:
+        micros = value - _WINDOWS_EPOCH_OFFSET
+    elif value >= 1e14:
+        micros = value
+    elif value >= 1e11:
+        micros = value * 1_000
+    else:
+        micros = value * 1_000_000
+    try:
+        return datetime.fromtimestamp(micros / 1_000_000, timezone.utc).isoformat()
+    except (OverflowError, OSError, ValueError):
+        return None
+
+
+def _link(
+    url: object, title: object, created: object, read: object, archived: bool
+) -> Link | None:
+    if not isinstance(url, str) or not url.strip().lower().startswith(
+        ("http://", "https://")
+    ):
+        return None
+    url = url.strip()
+    title = title.strip() if isinstance(title, str) else ""
+    created_at = _timestamp(created) or datetime.now(timezone.utc).isoformat()
+    read_at = _timestamp(read)
+    if read_at is None and archived:
+        read_at = created_at
+    return Link(str(uuid4()), url, title or url, created_at, read_at)
+
+
+def _first(fields: dict, names: tuple[str, ...]) -> object:
+    for name in names:
+        value = fields.get(name)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _from_fields(fields: dict, archived: bool = False) -> Link | None:
+    fields = {key.strip().lower(): value for key, value in fields.items() if key}
+    status = str(_first(fields, ("status", "folder")) or "").strip().lower()
+    return _link(
+        _first(fields, _URL_FIELDS),
+        _first(fields, _TITLE_FIELDS),
+        _first(fields, _CREATED_FIELDS),
+        _first(fields, _READ_FIELDS),
+        archived or status in ("archive", "archived", "read"),
+    )
+
+
+class _BookmarkParser(HTMLParser):
+    """Collects the anchors of a Netscape bookmark file as they are fed."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.links: list[Link] = []
+        self._anchor: dict | None = None
+        self._title: list[str] = []
+        self._heading: list[str] | None = None
+        self._archived = False
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag == "a":
+            self._anchor = dict(attrs)
+            self._title = []
+        elif tag == "h1":
+            self._heading = []
+
+    def handle_data(self, data: str) -> None:
+        if self._anchor is not None:
+            self._title.append(data)
+        elif self._heading is not None:
+            self._heading.append(data)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "a" and self._anchor is not None:
+            link = _from_fields(
+                {**self._anchor, "title": "".join(self._title)}, self._archived
+            )
+            if link is not None:
+                self.links.append(link)
+            self._anchor = None
+        elif tag == "h1" and self._heading is not None:
+            # Pocket lists read links under "Read Archive".
+            self._archived = "archive" in "".join(self._heading).lower()
+            self._heading = None
+
+
+def _html_links(handle: TextIO) -> Iterator[Link]:
+    parser = _BookmarkParser()
+    while chunk := handle.read(CHUNK_SIZE):
+        parser.feed(chunk)
+        yield from parser.links
+        parser.links.clear()
+    parser.close()
+    yield from parser.links
+
+
+class _JSONTokens:
+    """A pull parser for JSON read in chunks, yielding ``(event, value)``.
+
+    Events are ``start_map``, ``end_map``, ``start_array``, ``end_array``,
+    ``key`` and ``value``. Only the current chunk is buffered. Separators
+    are not checked, so some malformed documents are read anyway.
+    """
+
+    def __init__(self, handle: TextIO) -> None:
+        self.handle = handle
+        self.buffer = ""
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        chunk = self.handle.read(CHUNK_SIZE)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def _next_char(self) -> str | None:
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return None
+
+    def _string(self) -> str:
+        while True:
+            try:
+                value, self.pos = scanstring(self.buffer, self.pos + 1)
+                return value
+            except ValueError:
+                # The string may continue in the next chunk.
+                if not self._fill():
+                    raise
+
+    def _scalar(self) -> object:
+        while len(self.buffer) - self.pos < _SCALAR_LOOKAHEAD and self._fill():
+            pass
+        match = _SCALAR.match(self.buffer, self.pos)
+        if match is None:
+            raise ValueError(f"Unexpected {self.buffer[self.pos]!r} in JSON")
+        self.pos = match.end()
+        return json.loads(match.group())
+
+    def __iter__(self) -> Iterator[tuple[str, object]]:
+        # Per open container: "key" or "value" for objects, "item" for arrays.
+        expecting: list[str] = []
+        while (char := self._next_char()) is not None:
+            if char in ",:":
+                self.pos += 1
+                continue
+            if char in "{[":
+                self.pos += 1
+                expecting.append("key" if char == "{" else "item")
+                yield ("start_map" if char == "{" else "start_array"), None
+                continue
+            if char in "}]":
+                self.pos += 1
+                if not expecting:
+                    raise ValueError(f"Unexpected {char!r} in JSON")
+                expecting.pop()
+                yield ("end_map" if char == "}" else "end_array"), None
+            elif char == '"' and expecting and expecting[-1] == "key":
+                yield "key", self._string()
+                expecting[-1] = "value"
+                continue
+            else:
+                yield "value", self._string() if char == '"' else self._scalar()
+            if expecting and expecting[-1] == "value":
+                expecting[-1] = "key"
+
+
+def _json_links(handle: TextIO) -> Iterator[Link]:
+    # The scalar fields of each open object (None for arrays); nested
+    # bookmark folders are never built.
+    objects: list[dict | None] = []
+    key = None
+    for event, value in _JSONTokens(handle):
+        if event == "key":
+            key = value
+        elif event == "value":
+            if objects and objects[-1] is not None and key is not None:
+                objects[-1][key] = value
+        elif event == "start_map":
+            objects.append({})
+        elif event == "start_array":
+            objects.append(None)
+        else:
+            fields = objects.pop()
+            if fields:
+                link = _from_fields(fields)
+                if link is not None:
+                    yield link
+
+
+def _csv_links(handle: TextIO) -> Iterator[Link]:
+    for row in csv.DictReader(handle):
+        link = _from_fields(row)
+        if link is not None:
+            yield link
+
+
+_READERS = {
+    ImportFormat.HTML: _html_links,
+    ImportFormat.JSON: _json_links,
+    ImportFormat.CSV: _csv_links,
+}
+
+
+def read_links(path: Path, import_format: ImportFormat | None = None) -> Iterator[Link]:
+    """Yield the links exported in *path*, in file order."""
+    import_format = import_format or detect_format(path)
+    with path.open(encoding="utf-8-sig", errors="replace", newline="") as handle:
+        yield from _READERS[import_format](handle)
@@ -2,26 +2,89 @@
 bejw:  A capped reading list for links that shimmer
 """
 
-import webbrowser
+import csv
+import json
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Iterable, Iterator
 
 import typer
 
-from .models import CapacityError, Link, ReadingList
-from .render import ColorMode, OutputFormat, render_links
-from .storage import load, save
-from rich import print
+from . import trace
+from .models import (
+    MAX_CAPACITY,
+    CapacityError,
+    ImportFormat,
+    Link,
+    OnDuplicate,
+    ReadingList,
+    parse_number_spec,
+)
+from .render import ColorMode, OutputFormat, render_links, render_numbered_links
+from .storage import (
+    CHECK_CACHE_SUFFIX,
+    DEFAULT_LIST,
+    FETCH_CACHE_SUFFIX,
+    PAGES_SUFFIX,
+    SOCKET_SUFFIX,
+    SnapshotFormat,
+    convert as convert_storage,
+    list_names,
+    list_path,
+    load,
+    lock,
+    migrate as migrate_storage,
+    open_index,
+    save,
+    search as search_links,
+    storage_path,
+    summarize,
+    update,
+    update_unread,
+)
+from .unread_index import UnreadIndex
 
 DEFAULT_CAPACITY = 10
 DEFAULT_FILE_PATH = "~/.bejw/links.json"
 
 app = typer.Typer()
 
+LIST_OPTION = typer.Option(
+    None,
+    "--list",
+    metavar="NAME",
+    help=f"Named list to use (see bejw lists); {DEFAULT_LIST} is the file itself.",
+)
+
 
 @app.callback(invoke_without_command=True)
-def main(context: typer.Context) -> None:
+def main(
+    context: typer.Context,
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        help="Print wall time, CPU time and allocations per phase to stderr.",
+    ),
+    profile_json: Path = typer.Option(
+        None,
+        "--profile-json",
+        help="Write the --profile report to this JSON file instead.",
+    ),
+    cprofile: Path = typer.Option(
+        None,
+        "--cprofile",
+        help="Dump cProfile stats for the whole command to this file.",
+    ),
+) -> None:
+    if profile or profile_json is not None or cprofile is not None:
+        trace.start(json_path=profile_json, cprofile_path=cprofile)
+        context.call_on_close(trace.finish)
+    elif trace.start_from_env():
+        context.call_on_close(trace.finish)
     if context.invoked_subcommand is not None:
         return
+    from rich import print
+
     print(
         "[bold magenta]bejw[/bold magenta]: A capped reading list for links that shimmer"
     )
@@ -29,17 +92,34 @@ def main(context: typer.Context) -> None:
 
 
 @app.command()
-def init(capacity: int = DEFAULT_CAPACITY, file_path: str = DEFAULT_FILE_PATH) -> None:
+def init(
+    capacity: int = typer.Option(DEFAULT_CAPACITY, min=0, max=MAX_CAPACITY),
+    file_path: str = DEFAULT_FILE_PATH,
+    list_name: str = LIST_OPTION,
+) -> None:
     """Initialize the reading list with a specified capacity and file path."""
+    file_path = _select_list(file_path, list_name)
     # NOTE: this will override existing reading list
     # TODO: add a confirmation prompt before overriding
     reading_list = ReadingList(capacity=capacity)
-    save(reading_list, file_path)
-    expanded_path = str(Path(file_path).expanduser())
+    with lock(file_path):
+        save(reading_list, file_path)
+    expanded_path = str(storage_path(file_path))
     typer.echo(f"Initialized reading list at {expanded_path} with capacity {capacity}")
 
 
-def _prompt_replace(reading_list: ReadingList, url: str, title: str) -> Link | None:
+def _select_list(file_path: str, name: str | None) -> str:
+    """Return the file path of the list ``--list`` names, or exit."""
+    if name is None:
+        return file_path
+    try:
+        return list_path(file_path, name)
+    except ValueError as error:
+        typer.echo(str(error))
+        raise typer.Exit(code=1)
+
+
+def _prompt_replace(reading_list: ReadingList) -> Link | None:
     """Show unread links and let the user pick one to replace, or cancel."""
     from rich.console import Console
     from rich.table import Table, box
@@ -69,72 +149,375 @@ def _prompt_replace(reading_list: ReadingList, url: str, title: str) -> Link | N
     except ValueError:
         typer.echo("Invalid number. Cancelled.")
         return None
-    new_link = reading_list.replace_by_number(number, url, title)
-    if new_link is None:
+    target = reading_list.unread_at(number)
+    if target is None:
         typer.echo("No link found with that number. Cancelled.")
         return None
-    return new_link
+    return target
+
+
+NUMBERS_HELP = "Link number, or a spec such as 1-5,8,12-"
+
+
+def _resolve_numbers(
+    reading_list: ReadingList | UnreadIndex, spec: str
+) -> list[tuple[int, Link]]:
+    """Resolve a number spec against the unread numbering, or exit."""
+    try:
+        return reading_list.resolve_spec(spec)
+    except ValueError:
+        typer.echo(f"Invalid number spec: {spec}")
+        raise typer.Exit(code=1)
+    except LookupError:
+        typer.echo("No link found with that number.")
+        raise typer.Exit(code=1)
+
+
+def _ask_daemon(file_path: str, payload: dict) -> dict | None:
+    """Send *payload* to ``bejw serve`` if one is serving *file_path*.
+
+    Returns None when the command should fall back to direct file access.
+    """
+    path = storage_path(file_path)
+    if not path.with_name(path.name + SOCKET_SUFFIX).exists():
+        return None
+    from . import daemon
+
+    with trace.phase("daemon"):
+        try:
+            response = daemon.request(file_path, payload)
+        except daemon.NoReplyError:
+            typer.echo(
+                "bejw serve did not reply; the change may have been made. "
+                "Check with bejw list before trying again.",
+                err=True,
+            )
+            raise typer.Exit(code=1)
+    if response is None:
+        return None
+    error = response.get("error")
+    if error == "invalid":
+        typer.echo(f"Invalid number spec: {payload['numbers']}")
+        raise typer.Exit(code=1)
+    if error == "missing":
+        typer.echo("No link found with that number.")
+        raise typer.Exit(code=1)
+    if error == "full":
+        # Replacing needs a prompt; the direct path handles it.
+        return None
+    if error is not None:
+        typer.echo(f"bejw serve: {error}")
+        raise typer.Exit(code=1)
+    return response
+
+
+def _format_numbers(numbers: Iterable[int]) -> str:
+    return ", ".join(f"#{number}" for number in numbers)
+
+
+def _read_link_lines(
+    lines: Iterable[str], name: str
+) -> Iterator[tuple[str, str | None]]:
+    """Parse ``URL<TAB>TITLE``, ``URL`` or JSONL ``{"url": ..., "title": ...}`` lines.
+
+    Exits on a JSONL line that isn't an object with a ``url``, naming *name*
+    and the line number.
+    """
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            try:
+                record = json.loads(line)
+                url, title = record["url"], record.get("title")
+            except (ValueError, KeyError) as error:
+                reason = "no url" if isinstance(error, KeyError) else "invalid JSON"
+                typer.echo(f"Invalid line {line_number} of {name}: {reason}")
+                raise typer.Exit(code=1)
+        else:
+            url, _tab, title = line.partition("\t")
+        yield url, title or None
+
+
+def _fill_titles(
+    file_path: str, items: Iterable[tuple[str, str | None]], fetch: bool
+) -> list[tuple[str, str]]:
+    """Title untitled links from their pages (or their URL, if that fails).
+
+    A page that names a canonical URL is saved under that URL.
+    """
+    items = [*items]
+    missing = [url for url, title in items if not title]
+    pages = {}
+    if missing and fetch:
+        from . import fetch as fetcher
+
+        path = storage_path(file_path)
+        with trace.phase("fetch"):
+            pages = fetcher.fetch_pages(
+                missing, path.with_name(path.name + FETCH_CACHE_SUFFIX)
+            )
+        for page in pages.values():
+            if page.error is not None:
+                typer.echo(f"Could not fetch {page.url}: {page.error}", err=True)
+    filled = []
+    for url, title in items:
+        page = pages.get(url)
+        if title or page is None or page.error is not None:
+            filled.append((url, title or url))
+        else:
+            filled.append((page.canonical_url or url, page.title or url))
+    return filled
 
 
 @app.command()
-def add(url: str, title: str, file_path: str = DEFAULT_FILE_PATH) -> None:
+def add(
+    url: str = typer.Argument(None),
+    title: str = typer.Argument(
+        None, help="Defaults to the title of the page, fetched from URL."
+    ),
+    file_path: str = DEFAULT_FILE_PATH,
+    list_name: str = LIST_OPTION,
+    from_file: typer.FileText = typer.Option(
+        None,
+        "--from",
+        help="Add every URL<TAB>TITLE or JSONL line of FILE ('-' for stdin).",
+    ),
+    on_duplicate: OnDuplicate = typer.Option(
+        OnDuplicate.SKIP,
+        "--on-duplicate",
+        help="If the URL is already unread: skip it, refresh it, or add it again.",
+    ),
+    no_fetch: bool = typer.Option(
+        False,
+        "--no-fetch",
+        help="Title links given without one with their URL instead of fetching it.",
+    ),
+) -> None:
     """Add a link to the reading list."""
-    reading_list = load(file_path)
+    file_path = _select_list(file_path, list_name)
+    if from_file is not None:
+        _add_from(from_file, file_path, on_duplicate, not no_fetch)
+        return
+    if url is None:
+        raise typer.BadParameter("URL is required without --from.")
+    ((url, title),) = _fill_titles(file_path, [(url, title)], not no_fetch)
+    response = _ask_daemon(
+        file_path,
+        {"op": "add", "url": url, "title": title, "on_duplicate": on_duplicate},
+    )
+    if response is not None:
+        _echo_added(response["number"], response["duplicate"], on_duplicate)
+        return
+
+    def _add(reading_list: ReadingList) -> tuple[int, bool]:
+        duplicate = reading_list.duplicate_of(url) is not None
+        link = reading_list.add_link(url, title, on_duplicate)
+        number = reading_list.unread_number(link.id) or reading_list.unread_count()
+        return number, duplicate
+
     try:
-        link = reading_list.add_link(url, title)
+        number, duplicate = update(file_path, _add)
     except CapacityError:
-        link = _prompt_replace(reading_list, url, title)
-        if link is None:
+        # Prompt without holding the lock, then replace the chosen link by id.
+        target = _prompt_replace(load(file_path, include_read=False))
+        if target is None:
             raise typer.Exit(code=1)
-    save(reading_list, file_path)
-    ordered = reading_list.unread_links()
-    number = next(
-        (index for index, item in enumerate(ordered, start=1) if item.id == link.id),
-        len(ordered),
-    )
-    typer.echo(f"Added #{number}")
 
+        def _replace(reading_list: ReadingList) -> int:
+            link = reading_list.replace_link(target.id, url, title)
+            if link is None:
+                typer.echo("That link was changed meanwhile. Cancelled.")
+                raise typer.Exit(code=1)
+            return reading_list.unread_number(link.id) or reading_list.unread_count()
 
-@app.command()
-def remove(number: int, file_path: str = DEFAULT_FILE_PATH) -> None:
-    """Remove a link from the reading list by number."""
-    reading_list = load(file_path)
-    removed = reading_list.remove_by_number(number)
-    save(reading_list, file_path)
-    if not removed:
-        typer.echo("No link found with that number.")
+        number, duplicate = update(file_path, _replace), False
+    _echo_added(number, duplicate, on_duplicate)
+
+
+def _echo_added(number: int, duplicate: bool, on_duplicate: OnDuplicate) -> None:
+    if not duplicate or on_duplicate is OnDuplicate.ADD:
+        typer.echo(f"Added #{number}")
+    elif on_duplicate is OnDuplicate.SKIP:
+        typer.echo(f"Already saved as #{number}")
+    else:
+        typer.echo(f"Refreshed #{number}")
+
+
+def _add_from(
+    from_file: typer.FileText, file_path: str, on_duplicate: OnDuplicate, fetch: bool
+) -> None:
+    items = _fill_titles(file_path, _read_link_lines(from_file, from_file.name), fetch)
+
+    def _add_all(reading_list: ReadingList) -> int:
+        try:
+            return len(reading_list.add_links(items, on_duplicate))
+        except CapacityError:
+            free = max(reading_list.capacity - reading_list.unread_count(), 0)
+            typer.echo(f"Not enough room: {len(items)} links, {free} free slots.")
+            raise typer.Exit(code=1)
+
+    added = update(file_path, _add_all)
+    skipped = len(items) - added
+    if skipped:
+        typer.echo(f"Added {added} links, skipped {skipped} duplicates.")
+    else:
+        typer.echo(f"Added {added} links.")
+
+
+@app.command("import")
+def import_links(
+    export: Path = typer.Argument(
+        ..., exists=True, dir_okay=False, help="Bookmark or read-later export."
+    ),
+    import_format: ImportFormat = typer.Option(
+        None,
+        "--format",
+        help="Format of the export; guessed from its suffix or content by default.",
+    ),
+    file_path: str = DEFAULT_FILE_PATH,
+    list_name: str = LIST_OPTION,
+) -> None:
+    """Add every link of a bookmark, Pocket or Instapaper export in one write."""
+    from .importers import read_links
+
+    file_path = _select_list(file_path, list_name)
+
+    def _import(reading_list: ReadingList) -> tuple[int, int, int, int]:
+        with trace.phase("import"):
+            links = read_links(export, import_format)
+            return *reading_list.import_links(links), reading_list.capacity
+
+    try:
+        # With its read links loaded, the list is saved as one snapshot
+        # rather than a journal record per link.
+        added, skipped, dropped, capacity = update(
+            file_path, _import, include_read=True
+        )
+    except (ValueError, csv.Error) as error:
+        typer.echo(f"Could not read {export}: {error}", err=True)
         raise typer.Exit(code=1)
+    typer.echo(f"Imported {added} links.")
+    if skipped:
+        typer.echo(f"Skipped {skipped} already saved as unread links.")
+    if dropped:
+        typer.echo(
+            f"Dropped {dropped} unread links over the capacity of {capacity}; "
+            "raise it with bejw capacity to import them."
+        )
 
 
 @app.command()
-def read(number: int, file_path: str = DEFAULT_FILE_PATH) -> None:
-    """Open a link from the reading list by number."""
-    reading_list = load(file_path)
-    unread = reading_list.unread_links()
-    if number < 1 or number > len(unread):
-        typer.echo("No link found with that number.")
+def remove(
+    numbers: str = typer.Argument(..., help=NUMBERS_HELP),
+    file_path: str = DEFAULT_FILE_PATH,
+    list_name: str = LIST_OPTION,
+) -> None:
+    """Remove links from the reading list by number."""
+    file_path = _select_list(file_path, list_name)
+    if _ask_daemon(file_path, {"op": "remove", "numbers": numbers}) is not None:
+        return
+
+    def _remove(reading_list: ReadingList | UnreadIndex) -> None:
+        for _number, link in _resolve_numbers(reading_list, numbers):
+            reading_list.remove_link(link.id)
+
+    update_unread(file_path, _remove)
+
+
+@app.command()
+def read(
+    numbers: str = typer.Argument(..., help=NUMBERS_HELP),
+    file_path: str = DEFAULT_FILE_PATH,
+    list_name: str = LIST_OPTION,
+    offline: bool = typer.Option(
+        False, "--offline", help="Open the copies saved by bejw fetch instead."
+    ),
+) -> None:
+    """Open links from the reading list by number."""
+    import webbrowser
+
+    file_path = _select_list(file_path, list_name)
+    if offline:
+        _read_offline(file_path, numbers)
+        return
+    response = _ask_daemon(file_path, {"op": "read", "numbers": numbers})
+    if response is not None:
+        opened = response["links"]
+    else:
+        # The index decodes just the links being opened.
+        reading_list = open_index(file_path) or load(file_path, include_read=False)
+        opened = [
+            [number, link.url]
+            for number, link in _resolve_numbers(reading_list, numbers)
+        ]
+    for number, url in opened:
+        webbrowser.open(url)
+        typer.echo(f"Opened #{number}: {url}")
+
+
+def _pages_dir(file_path: str) -> Path:
+    path = storage_path(file_path)
+    return path.with_name(path.name + PAGES_SUFFIX)
+
+
+def _read_offline(file_path: str, numbers: str) -> None:
+    import webbrowser
+
+    from .pages import PageStore
+
+    reading_list = open_index(file_path) or load(file_path, include_read=False)
+    resolved = _resolve_numbers(reading_list, numbers)
+    with lock(file_path):
+        store = PageStore(_pages_dir(file_path))
+        copies = [(number, link, store.open_copy(link.id)) for number, link in resolved]
+        store.save()
+    missing = False
+    for number, link, copy in copies:
+        if copy is None:
+            typer.echo(f"No offline copy of #{number}: {link.url}", err=True)
+            missing = True
+        else:
+            webbrowser.open(copy.as_uri())
+            typer.echo(f"Opened #{number} offline: {link.url}")
+    if missing:
+        typer.echo("Run bejw fetch to save unread pages for offline reading.", err=True)
         raise typer.Exit(code=1)
 
-    url = unread[number - 1].url
-    webbrowser.open(url)
-    typer.echo(f"Opened #{number}: {url}")
+
+def _mark_numbers_read(
+    reading_list: ReadingList | UnreadIndex, spec: str
+) -> list[tuple[int, Link]]:
+    resolved = _resolve_numbers(reading_list, spec)
+    for _number, link in resolved:
+        reading_list.mark_read(link.id)
+    return resolved
 
 
 @app.command("mark-read")
-def mark_read(number: int, file_path: str = DEFAULT_FILE_PATH) -> None:
-    """Mark a link as read by number."""
-    reading_list = load(file_path)
-    marked = reading_list.mark_read_by_number(number)
-    if not marked:
-        typer.echo("No link found with that number.")
-        raise typer.Exit(code=1)
-    save(reading_list, file_path)
-    typer.echo(f"Marked #{number} as read.")
+def mark_read(
+    numbers: str = typer.Argument(..., help=NUMBERS_HELP),
+    file_path: str = DEFAULT_FILE_PATH,
+    list_name: str = LIST_OPTION,
+) -> None:
+    """Mark links as read by number."""
+    file_path = _select_list(file_path, list_name)
+    response = _ask_daemon(file_path, {"op": "mark-read", "numbers": numbers})
+    if response is not None:
+        marked = response["numbers"]
+    else:
+        resolved = update_unread(
+            file_path, lambda reading_list: _mark_numbers_read(reading_list, numbers)
+        )
+        marked = [number for number, _link in resolved]
+    typer.echo(f"Marked {_format_numbers(marked)} as read.")
 
 
 @app.command()
 def list(
     file_path: str = DEFAULT_FILE_PATH,
+    list_name: str = LIST_OPTION,
     show_ids: bool = False,
     include_read: bool = typer.Option(
         False,
@@ -157,9 +540,48 @@ def list(
         "--no-header",
         help="Omit the header row for tsv and csv output.",
     ),
+    limit: int = typer.Option(
+        None,
+        "--limit",
+        min=0,
+        help="Show at most this many links.",
+    ),
+    offset: int = typer.Option(
+        0,
+        "--offset",
+        min=0,
+        help="Skip this many links before showing any.",
+    ),
+    reverse: bool = typer.Option(
+        False,
+        "--reverse",
+        help="Show the newest links first (numbers are unchanged).",
+    ),
 ) -> None:
     """Display the reading list."""
-    reading_list = load(file_path)
+    file_path = _select_list(file_path, list_name)
+    response = _ask_daemon(
+        file_path,
+        {
+            "op": "list",
+            "include_read": include_read,
+            "offset": offset,
+            "limit": limit,
+            "reverse": reverse,
+        },
+    )
+    if response is not None:
+        render_numbered_links(
+            ((number, Link(**data)) for number, data in response["links"]),
+            unread_count=response["unread_count"],
+            capacity=response["capacity"],
+            show_ids=show_ids,
+            output_format=output_format,
+            include_header=not no_header,
+            color=color,
+        )
+        return
+    reading_list = load(file_path, include_read=include_read)
     render_links(
         reading_list,
         show_ids=show_ids,
@@ -167,32 +589,394 @@ def list(
         include_header=not no_header,
         include_read=include_read,
         color=color,
+        offset=offset,
+        limit=limit,
+        reverse=reverse,
     )
 
 
+@app.command()
+def search(
+    query: str = typer.Argument(
+        ..., help="Words to find in titles and URLs; each may be a word's start."
+    ),
+    file_path: str = DEFAULT_FILE_PATH,
+    list_name: str = LIST_OPTION,
+    show_ids: bool = False,
+    include_read: bool = typer.Option(
+        False,
+        "--include-read",
+        help="Also search links that have been marked as read.",
+    ),
+    output_format: OutputFormat = typer.Option(
+        OutputFormat.TABLE,
+        "--format",
+        "-f",
+        help="Output format: table, tsv, csv, or jsonl.",
+    ),
+    color: ColorMode = typer.Option(
+        ColorMode.AUTO,
+        "--color",
+        help="Color mode for output: auto, always, or never.",
+    ),
+    no_header: bool = typer.Option(
+        False,
+        "--no-header",
+        help="Omit the header row for tsv and csv output.",
+    ),
+    limit: int = typer.Option(
+        None,
+        "--limit",
+        min=0,
+        help="Show at most this many links.",
+    ),
+) -> None:
+    """Find links whose title or URL has every word of QUERY, best first.
+
+    Results keep the numbers `list` shows them with.
+    """
+    file_path = _select_list(file_path, list_name)
+    try:
+        reading_list, results = search_links(file_path, query, include_read)
+    except ValueError:
+        typer.echo("Nothing to search for.")
+        raise typer.Exit(code=1)
+    render_numbered_links(
+        results[:limit],
+        unread_count=reading_list.unread_count(),
+        capacity=reading_list.capacity,
+        show_ids=show_ids,
+        output_format=output_format,
+        include_header=not no_header,
+        color=color,
+    )
+
+
+@app.command()
+def check(
+    numbers: str = typer.Argument(
+        None, help="Links to check, e.g. 1-5,8 (default: all of them)."
+    ),
+    file_path: str = DEFAULT_FILE_PATH,
+    list_name: str = LIST_OPTION,
+    include_read: bool = typer.Option(
+        False,
+        "--include-read",
+        help="Check read links too; numbers then count them as list does.",
+    ),
+    mark_dead: bool = typer.Option(
+        False,
+        "--mark-dead",
+        help="Record dead links, so that list shows them as dead.",
+    ),
+    ttl: float = typer.Option(
+        24.0,
+        "--ttl",
+        min=0,
+        help="Trust results younger than this many hours without asking again.",
+    ),
+) -> None:
+    """Check that links still work, and record where they redirect to.
+
+    Pages that are gone (404, 410, unknown domain) are reported as dead;
+    other errors are reported as failed and checked again next time.
+    """
+    from . import check as checker
+
+    file_path = _select_list(file_path, list_name)
+    reading_list = load(file_path, include_read=include_read)
+    numbered = [*reading_list.iter_links(include_read=include_read)]
+    if numbers is not None:
+        try:
+            wanted = parse_number_spec(numbers, len(numbered))
+        except ValueError:
+            typer.echo(f"Invalid number spec: {numbers}")
+            raise typer.Exit(code=1)
+        except LookupError:
+            wanted = []
+        if not wanted:
+            typer.echo("No link found with that number.")
+            raise typer.Exit(code=1)
+        numbered = [numbered[number - 1] for number in wanted]
+    path = storage_path(file_path)
+    with trace.phase("check"):
+        results = checker.check_links(
+            (link.url for _number, link in numbered),
+            path.with_name(path.name + CHECK_CACHE_SUFFIX),
+            ttl=ttl * 3600,
+        )
+    now = datetime.now(timezone.utc).isoformat()
+    counts = {"ok": 0, "moved": 0, "dead": 0, "failed": 0}
+    found = {}
+    for number, link in numbered:
+        result = results[link.url]
+        final_url, dead_at = link.final_url, link.dead_at
+        if result.status == checker.Status.OK:
+            final_url, dead_at = result.final_url, None
+            if final_url is None:
+                counts["ok"] += 1
+            else:
+                counts["moved"] += 1
+                typer.echo(f"#{number} moved to {final_url}: {link.url}")
+        else:
+            counts[result.status] += 1
+            typer.echo(f"#{number} {result.status} ({result.detail}): {link.url}")
+            if result.status == checker.Status.DEAD and mark_dead:
+                dead_at = dead_at or now
+        if (final_url, dead_at) != (link.final_url, link.dead_at):
+            found[link.id] = (final_url, dead_at)
+
+    if found:
+
+        def _record(reading_list: ReadingList) -> None:
+            for link_id, (final_url, dead_at) in found.items():
+                reading_list.record_check(link_id, final_url, dead_at)
+
+        update(file_path, _record, include_read=include_read)
+    summary = ", ".join(f"{count} {status}" for status, count in counts.items())
+    typer.echo(f"Checked {len(numbered)} links: {summary}.")
+
+
+@app.command()
+def fetch(
+    numbers: str = typer.Argument(
+        None, help="Links to fetch, e.g. 1-5,8 (default: all unread links)."
+    ),
+    file_path: str = DEFAULT_FILE_PATH,
+    list_name: str = LIST_OPTION,
+    refresh: bool = typer.Option(
+        False, "--refresh", help="Download pages again even if a copy is saved."
+    ),
+    max_size: float = typer.Option(
+        256.0,
+        "--max-size",
+        min=0,
+        help="Keep saved pages within this many MiB by dropping the least "
+        "recently opened pages of read links. Unread links' pages are kept.",
+    ),
+) -> None:
+    """Save the pages of unread links for reading offline with read --offline."""
+    from . import pages
+
+    file_path = _select_list(file_path, list_name)
+    reading_list = open_index(file_path) or load(file_path, include_read=False)
+    if numbers is None:
+        numbered = [*enumerate(reading_list.unread_links(), start=1)]
+    else:
+        numbered = _resolve_numbers(reading_list, numbers)
+    store = pages.PageStore(_pages_dir(file_path))
+    wanted = [
+        (number, link)
+        for number, link in numbered
+        if refresh or store.get(link.id) is None
+    ]
+    with trace.phase("fetch"):
+        downloads = pages.download(store, (link.url for _number, link in wanted))
+    fetched = 0
+    with lock(file_path):
+        # Another fetch or read --offline may have changed the manifest.
+        store = pages.PageStore(_pages_dir(file_path))
+        for number, link in wanted:
+            result = downloads[link.url]
+            error = result.error
+            if error is None:
+                try:
+                    store.add(link.id, link.url, result.digest, result.content_type)
+                except FileNotFoundError:
+                    # Evicted by a concurrent fetch before it was recorded.
+                    error = "Evicted while fetching"
+            if error is not None:
+                typer.echo(f"Could not fetch #{number}: {error}", err=True)
+                continue
+            fetched += 1
+        unread = open_index(file_path) or load(file_path, include_read=False)
+        store.evict(
+            {link.id for link in unread.unread_links()}, int(max_size * 1024 * 1024)
+        )
+        store.save()
+    size = store.size() / (1024 * 1024)
+    typer.echo(f"Fetched {fetched} pages; {size:.1f} MiB saved for offline reading.")
+
+
+@app.command()
+def sync(
+    directory: Path = typer.Argument(
+        None, help="Shared folder to sync through; needed the first time only."
+    ),
+    file_path: str = DEFAULT_FILE_PATH,
+    list_name: str = LIST_OPTION,
+) -> None:
+    """Merge the list with the other devices that sync through a folder.
+
+    Each device logs its own changes to the folder; syncing applies the
+    changes the other devices logged since the last sync. Adds win over
+    concurrent removals, and the latest change to a link's read state or
+    to the capacity wins.
+    """
+    from . import sync as syncer
+
+    file_path = _select_list(file_path, list_name)
+    current = syncer.config(file_path)
+    if directory is not None:
+        if current is None:
+            current = syncer.setup(file_path, directory)
+            typer.echo(f"Syncing through {current['directory']}")
+        elif Path(current["directory"]) != directory.expanduser().resolve():
+            typer.echo(f"Already syncing through {current['directory']}")
+            raise typer.Exit(code=1)
+    try:
+        with trace.phase("sync"):
+            merged, devices = syncer.merge(file_path)
+    except syncer.SyncError as error:
+        typer.echo(str(error))
+        raise typer.Exit(code=1)
+    typer.echo(f"Merged {merged} changes from {devices} other devices.")
+
+
 @app.command()
 def capacity(
-    value: int = typer.Argument(None),
+    value: int = typer.Argument(None, min=0, max=MAX_CAPACITY),
     file_path: str = DEFAULT_FILE_PATH,
+    list_name: str = LIST_OPTION,
 ) -> None:
     """Show or change the capacity of the reading list."""
-    reading_list = load(file_path)
+    file_path = _select_list(file_path, list_name)
+    response = _ask_daemon(file_path, {"op": "capacity", "value": value})
+    if response is not None:
+        if value is None:
+            typer.echo(response["capacity"])
+        else:
+            typer.echo(f"Capacity set to {value}")
+        return
     if value is None:
-        typer.echo(reading_list.capacity)
+        typer.echo(load(file_path, include_read=False).capacity)
         return
-    reading_list.capacity = value
-    save(reading_list, file_path)
+
+    def _set_capacity(reading_list: ReadingList) -> None:
+        reading_list.capacity = value
+
+    update(file_path, _set_capacity)
     typer.echo(f"Capacity set to {value}")
 
 
 @app.command()
-def clear(file_path: str = DEFAULT_FILE_PATH) -> None:
+def clear(
+    file_path: str = DEFAULT_FILE_PATH,
+    list_name: str = LIST_OPTION,
+) -> None:
     """Clear the reading list."""
-    reading_list = load(file_path)
-    reading_list.clear_links()
-    save(reading_list, file_path)
+    file_path = _select_list(file_path, list_name)
+    update(file_path, ReadingList.clear_links)
     typer.echo("Reading list cleared")
 
 
+@app.command()
+def lists(file_path: str = DEFAULT_FILE_PATH) -> None:
+    """Show every named list with its unread links and capacity.
+
+    Counts come from each list's index; no links are loaded. A list that
+    was never saved is shown as empty.
+    """
+    names = list_names(file_path)
+    width = max(len(name) for name in names)
+    for name in names:
+        summary = summarize(list_path(file_path, name))
+        if summary is None:
+            typer.echo(f"{name:<{width}}  (empty)")
+        else:
+            capacity, unread = summary
+            typer.echo(f"{name:<{width}}  {unread}/{capacity} unread")
+
+
+@app.command()
+def dedupe(
+    file_path: str = DEFAULT_FILE_PATH,
+    list_name: str = LIST_OPTION,
+    include_read: bool = typer.Option(
+        False,
+        "--include-read",
+        help="Also remove read copies of a URL, keeping an unread one if any.",
+    ),
+) -> None:
+    """Remove links saved again under the same URL, keeping the first copy.
+
+    URLs are compared in canonical form: http and https, a trailing slash,
+    the fragment and tracking parameters such as utm_source are ignored.
+    """
+    file_path = _select_list(file_path, list_name)
+
+    def _dedupe(reading_list: ReadingList) -> int:
+        duplicates = reading_list.duplicate_links(include_read)
+        for link in duplicates:
+            reading_list.remove_link(link.id)
+        return len(duplicates)
+
+    removed = update(file_path, _dedupe, include_read=include_read)
+    typer.echo(f"Removed {removed} duplicates.")
+
+
+@app.command()
+def migrate(source: str, target: str) -> None:
+    """Copy a reading list into another file, converting its storage format.
+
+    Use a ``sqlite:`` prefix or a ``.db``/``.sqlite`` suffix on TARGET to
+    convert a JSON list into an indexed SQLite database.
+    """
+    reading_list = migrate_storage(source, target)
+    typer.echo(f"Migrated {len(reading_list.links)} links to {storage_path(target)}")
+
+
+@app.command()
+def convert(
+    target_format: SnapshotFormat = typer.Argument(
+        ..., help="Snapshot encoding to rewrite the file in: json or binary."
+    ),
+    file_path: str = DEFAULT_FILE_PATH,
+    list_name: str = LIST_OPTION,
+) -> None:
+    """Rewrite the reading list file in another snapshot encoding, in place.
+
+    Binary snapshots are smaller and faster to load; every command detects
+    the encoding by itself.
+    """
+    file_path = _select_list(file_path, list_name)
+    try:
+        reading_list = convert_storage(file_path, target_format)
+    except ValueError as error:
+        typer.echo(str(error))
+        raise typer.Exit(code=1)
+    typer.echo(
+        f"Converted {len(reading_list.links)} links in {storage_path(file_path)}"
+        f" to {target_format}"
+    )
+
+
+@app.command()
+def serve(
+    file_path: str = DEFAULT_FILE_PATH,
+    list_name: str = LIST_OPTION,
+) -> None:
+    """Keep the reading list in memory and answer other bejw calls over a socket.
+
+    While it runs, the other commands talk to it instead of loading the file.
+    """
+    from . import daemon
+
+    file_path = _select_list(file_path, list_name)
+    try:
+        server = daemon.make_server(file_path)
+    except OSError as error:
+        typer.echo(str(error))
+        raise typer.Exit(code=1)
+    typer.echo(f"Serving {storage_path(file_path)} on {daemon.socket_path(file_path)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.socket_path(file_path).unlink(missing_ok=True)
+
+
 if __name__ == "__main__":
     app()
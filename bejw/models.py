@@ -1,10 +1,20 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timedelta, timezone
-from typing import Iterable
+from enum import StrEnum
+from heapq import merge
+from operator import attrgetter
+from typing import Iterable, Iterator
 from uuid import uuid4
 
+from . import trace
+from .urls import canonical_url
+
+# Binary snapshots and the unread index store the capacity as a u32.
+MAX_CAPACITY = 2**32 - 1
+
 
 class CapacityError(Exception):
     """Raised when trying to add a link to a full reading list."""
@@ -13,97 +23,588 @@ class CapacityError(Exception):
         super().__init__(message)
 
 
-@dataclass(frozen=True)
+class ConflictError(Exception):
+    """Raised when the stored list changed after it was loaded."""
+
+    def __init__(self, message: str = "Reading list changed on disk") -> None:
+        super().__init__(message)
+
+
+class OnDuplicate(StrEnum):
+    """What adding a URL that is already saved as an unread link does."""
+
+    # Keep the saved link as it is.
+    SKIP = "skip"
+    # Replace it with a new link, as if it had just been added.
+    REFRESH = "refresh"
+    # Save the URL again.
+    ADD = "add"
+
+
+class ImportFormat(StrEnum):
+    """Export formats ``bejw import`` reads (see ``importers``)."""
+
+    HTML = "html"
+    JSON = "json"
+    CSV = "csv"
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_by_created_key = attrgetter("created_key")
+
+
+def _timestamp_key(value: str) -> int:
+    """Parse an ISO timestamp into microseconds since the epoch (UTC)."""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        parsed = datetime.min
+    try:
+        delta = parsed - _EPOCH
+    except TypeError:
+        # Naive timestamps from older versions are UTC.
+        delta = parsed.replace(tzinfo=timezone.utc) - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+@dataclass(frozen=True, slots=True)
 class Link:
     id: str
     url: str
     title: str
     created_at: str
     read_at: str | None = None
+    # Where ``url`` redirected to, and when it was found dead, at the last
+    # ``bejw check``.
+    final_url: str | None = None
+    dead_at: str | None = None
+    _created_key: int | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     @staticmethod
     def create(url: str, title: str) -> "Link":
         created_at = datetime.now(timezone.utc).isoformat()
         return Link(id=str(uuid4()), url=url, title=title, created_at=created_at)
 
+    @staticmethod
+    def restore(
+        id: str,
+        url: str,
+        title: str,
+        created_at: str,
+        read_at: str | None,
+        created_key: int,
+        final_url: str | None = None,
+        dead_at: str | None = None,
+    ) -> "Link":
+        """Rebuild a stored link whose ``created_key`` is already known."""
+        link = Link(id, url, title, created_at, read_at, final_url, dead_at)
+        object.__setattr__(link, "_created_key", created_key)
+        return link
+
+    @property
+    def created_key(self) -> int:
+        """``created_at`` in epoch microseconds, parsed once and cached."""
+        if self._created_key is None:
+            object.__setattr__(self, "_created_key", _timestamp_key(self.created_at))
+        return self._created_key
 
-def _created_at_key(link: Link) -> datetime:
-    try:
-        created_at = datetime.fromisoformat(link.created_at)
-    except ValueError:
-        return datetime.min.replace(tzinfo=timezone.utc)
-    if created_at.tzinfo is None:
-        return created_at.replace(tzinfo=timezone.utc)
-    return created_at
+    def extras(self) -> dict:
+        """The optional fields that are set, as stored next to the others."""
+        extras = {}
+        if self.final_url is not None:
+            extras["final_url"] = self.final_url
+        if self.dead_at is not None:
+            extras["dead_at"] = self.dead_at
+        return extras
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "url": self.url,
+            "title": self.title,
+            "created_at": self.created_at,
+            "read_at": self.read_at,
+            **self.extras(),
+        }
+
+
+def parse_number_spec(spec: str, count: int) -> list[int]:
+    """Expand a spec like ``1-5,8,12-`` into sorted, de-duplicated numbers.
+
+    Open-ended ranges stop at *count*. Raises ValueError if *spec* is malformed
+    and LookupError if it names a number past *count*, before expanding it.
+    """
+    numbers: set[int] = set()
+    for part in spec.split(","):
+        start, dash, end = part.strip().partition("-")
+        first = int(start)
+        last = (int(end) if end else count) if dash else first
+        if first < 1 or last < first:
+            raise ValueError(f"Invalid range: {part}")
+        if last > count:
+            raise LookupError(part)
+        numbers.update(range(first, last + 1))
+    return sorted(numbers)
 
 
 class ReadingList:
     def __init__(self, capacity: int = 10, links: Iterable[Link] | None = None) -> None:
-        self.capacity = capacity
-        self.links: list[Link] = list(links or [])
+        self._capacity = capacity
+        # Generation of the stored copy this list was loaded from.
+        self.version = 0
+        # ``(name, size)`` of the archive segments its read links were moved
+        # to when the stored copy was written (see ``storage``).
+        self.archive: list[tuple[str, int]] = []
+        # False when stored links were left out when loading (see
+        # ``storage``), so that holding no links doesn't mean there are none.
+        self.complete = True
+        # Links in insertion (file) order, plus the unread and read partitions
+        # as (created_key, insertion seq, id) entries kept sorted by bisect.
+        # Both are built on first use, so that loading parses no timestamps;
+        # most commands only ever need the unread one.
+        self._links: dict[str, Link] = {link.id: link for link in links or []}
+        self._unread: list[tuple] | None = None
+        self._read: list[tuple] | None = None
+        self._entries: dict[str, tuple] = {}
+        self._next_seq = len(self._links)
+        # Canonical URL -> ids of the unread links saved under it, built on
+        # first use and then kept current by ``_place`` and ``_unplace``.
+        self._urls: dict[str, list[str]] | None = None
+        # None until the list is known to match what is on disk; afterwards
+        # every mutation appends a change record (see ``apply_change``).
+        self._changes: list[dict] | None = None
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @capacity.setter
+    def capacity(self, value: int) -> None:
+        if value == self._capacity:
+            return
+        self._capacity = value
+        self._record({"op": "capacity", "value": value})
+
+    def __len__(self) -> int:
+        return len(self._links)
+
+    def get(self, link_id: str) -> Link | None:
+        return self._links.get(link_id)
+
+    @property
+    def links(self) -> list[Link]:
+        """All links in insertion order."""
+        return list(self._links.values())
+
+    def _unread_partition(self) -> list[tuple]:
+        if self._unread is None:
+            # The read partition is never built without this one, so
+            # renumbering here can't split the tie-breaking sequence.
+            self._unread = sorted(
+                [
+                    (link.created_key, seq, link.id)
+                    for seq, link in enumerate(self._links.values())
+                    if link.read_at is None
+                ]
+            )
+            self._entries = {entry[2]: entry for entry in self._unread}
+            self._next_seq = len(self._links)
+        return self._unread
+
+    def _read_partition(self) -> list[tuple]:
+        if self._read is None:
+            with trace.phase("sort_read"):
+                self._sort_partitions()
+        return self._read
+
+    def _sort_partitions(self) -> None:
+        # Renumber every link in insertion order so that both partitions
+        # share one tie-breaking sequence.
+        unread: list[tuple] = []
+        read: list[tuple] = []
+        for seq, link in enumerate(self._links.values()):
+            partition = unread if link.read_at is None else read
+            partition.append((link.created_key, seq, link.id))
+        unread.sort()
+        read.sort()
+        self._unread = unread
+        self._read = read
+        self._entries = {entry[2]: entry for entry in unread + read}
+        self._next_seq = len(self._links)
+
+    def _partition(self, link: Link) -> list[tuple] | None:
+        return self._unread if link.read_at is None else self._read
+
+    def _place(self, link: Link, entry: tuple) -> None:
+        partition = self._partition(link)
+        if partition is not None:
+            self._entries[link.id] = entry
+            insort(partition, entry)
+        if link.read_at is None and self._urls is not None:
+            self._urls.setdefault(canonical_url(link.url), []).append(link.id)
+
+    def _unplace(self, link: Link) -> tuple | None:
+        entry = self._entries.pop(link.id, None)
+        if entry is not None:
+            partition = self._partition(link)
+            del partition[bisect_left(partition, entry)]
+        if link.read_at is None and self._urls is not None:
+            key = canonical_url(link.url)
+            ids = self._urls[key]
+            ids.remove(link.id)
+            if not ids:
+                del self._urls[key]
+        return entry
+
+    def _url_index(self) -> dict[str, list[str]]:
+        if self._urls is None:
+            urls: dict[str, list[str]] = {}
+            for link in self.unread_links():
+                urls.setdefault(canonical_url(link.url), []).append(link.id)
+            self._urls = urls
+        return self._urls
+
+    def _insert(self, link: Link) -> None:
+        self._links[link.id] = link
+        self._place(link, (link.created_key, self._next_seq, link.id))
+        self._next_seq += 1
+
+    def _discard(self, link_id: str) -> Link | None:
+        link = self._links.pop(link_id, None)
+        if link is not None:
+            self._unplace(link)
+        return link
+
+    def _record(self, change: dict) -> None:
+        if self._changes is not None:
+            self._changes.append(change)
+
+    def changes(self) -> list[dict] | None:
+        """Return changes since the last save, or None if they are unknown."""
+        return None if self._changes is None else list(self._changes)
 
-    def add_link(self, url: str, title: str) -> Link:
-        if len(self.unread_links()) >= self.capacity:
+    def mark_saved(self) -> None:
+        """Declare the in-memory list identical to its stored copy."""
+        self._changes = []
+
+    def apply_change(self, change: dict) -> None:
+        """Replay a change record produced by the mutating methods."""
+        op = change["op"]
+        if op == "add":
+            self._insert(Link(**change["link"]))
+        elif op == "remove":
+            self._discard(change["id"])
+        elif op == "read":
+            link = self._links.get(change["id"])
+            if link is not None:
+                entry = self._unplace(link)
+                link = replace(link, read_at=change["read_at"])
+                self._links[link.id] = link
+                if entry is not None:
+                    self._place(link, entry)
+        elif op == "check":
+            link = self._links.get(change["id"])
+            if link is not None:
+                self._links[link.id] = replace(
+                    link, final_url=change["final_url"], dead_at=change["dead_at"]
+                )
+        elif op == "capacity":
+            self._capacity = change["value"]
+        elif op == "clear":
+            self.complete = True
+            self._links.clear()
+            self._entries.clear()
+            self._unread = []
+            self._read = []
+            self._urls = None
+        else:
+            raise ValueError(f"Unknown change: {op}")
+        self._record(change)
+
+    def duplicate_of(self, url: str) -> Link | None:
+        """Return the unread link saved under the canonical form of *url*."""
+        ids = self._url_index().get(canonical_url(url))
+        return self._links[ids[0]] if ids else None
+
+    def add_link(
+        self, url: str, title: str, on_duplicate: OnDuplicate = OnDuplicate.ADD
+    ) -> Link:
+        """Add a link, or handle an unread duplicate of it per *on_duplicate*.
+
+        Returns the saved link: the existing one when it is skipped.
+        """
+        if on_duplicate is not OnDuplicate.ADD:
+            existing = self.duplicate_of(url)
+            if existing is not None:
+                if on_duplicate is OnDuplicate.SKIP:
+                    return existing
+                return self.replace_link(existing.id, url, title)
+        if self.unread_count() >= self.capacity:
+            raise CapacityError("Reading list is full")
+        return self._add(Link.create(url, title))
+
+    def add_links(
+        self,
+        items: Iterable[tuple[str, str]],
+        on_duplicate: OnDuplicate = OnDuplicate.ADD,
+    ) -> list[Link]:
+        """Add several ``(url, title)`` pairs, checking capacity once up front.
+
+        Pairs duplicating an unread link or an earlier pair are handled per
+        *on_duplicate*; the links added or refreshed are returned.
+        """
+        items = list(items)
+        if on_duplicate is OnDuplicate.ADD:
+            if self.unread_count() + len(items) > self.capacity:
+                raise CapacityError("Reading list is full")
+            return [self._add(Link.create(url, title)) for url, title in items]
+        batch: dict[str, tuple[str, str]] = {}
+        for url, title in items:
+            key = canonical_url(url)
+            if on_duplicate is OnDuplicate.REFRESH or key not in batch:
+                batch[key] = (url, title)
+        urls = self._url_index()
+        planned = [
+            (urls[key][0] if key in urls else None, url, title)
+            for key, (url, title) in batch.items()
+            if on_duplicate is OnDuplicate.REFRESH or key not in urls
+        ]
+        added = sum(1 for existing, _url, _title in planned if existing is None)
+        if self.unread_count() + added > self.capacity:
             raise CapacityError("Reading list is full")
-        link = Link.create(url, title)
-        self.links.append(link)
+        return [
+            self._add(Link.create(url, title))
+            if existing is None
+            else self.replace_link(existing, url, title)
+            for existing, url, title in planned
+        ]
+
+    def import_links(self, links: Iterable[Link]) -> tuple[int, int, int]:
+        """Add links built elsewhere, such as from an export, as they are.
+
+        Unread links whose URL is already unread (or earlier in *links*) are
+        skipped, and unread links past the capacity are dropped; read links
+        are always added. Returns how many links were added, skipped and
+        dropped.
+        """
+        urls = self._url_index()
+        free = self.capacity - self.unread_count()
+        added = skipped = dropped = 0
+        unread: list[tuple] = []
+        read: list[tuple] = []
+        for link in links:
+            if link.read_at is None:
+                key = canonical_url(link.url)
+                if key in urls:
+                    skipped += 1
+                    continue
+                if free <= 0:
+                    dropped += 1
+                    continue
+                free -= 1
+                urls[key] = [link.id]
+            entry = (link.created_key, self._next_seq, link.id)
+            self._next_seq += 1
+            self._links[link.id] = link
+            (unread if link.read_at is None else read).append(entry)
+            self._record({"op": "add", "link": link.to_dict()})
+            added += 1
+        # One merge of sorted runs instead of an insort per link.
+        for partition, new in [(self._unread, unread), (self._read, read)]:
+            if partition is not None:
+                self._entries.update((entry[2], entry) for entry in new)
+        if self._unread is not None:
+            self._unread = sorted(self._unread + sorted(unread))
+        if self._read is not None:
+            self._read = sorted(self._read + sorted(read))
+        return added, skipped, dropped
+
+    def _add(self, link: Link) -> Link:
+        self._insert(link)
+        self._record({"op": "add", "link": link.to_dict()})
         return link
 
     def ordered_links(self) -> list[Link]:
-        return sorted(self.links, key=_created_at_key)
+        # Insertion seqs follow the order of ``_links``, so a stable sort on
+        # created_key alone matches the partitions without building them.
+        return sorted(self._links.values(), key=_by_created_key)
 
     def unread_links(self) -> list[Link]:
-        return [link for link in self.ordered_links() if link.read_at is None]
+        return [self._links[entry[2]] for entry in self._unread_partition()]
 
     def read_links(self) -> list[Link]:
-        return [link for link in self.ordered_links() if link.read_at is not None]
+        return [self._links[entry[2]] for entry in self._read_partition()]
+
+    def iter_links(
+        self, include_read: bool = False, reverse: bool = False
+    ) -> Iterator[tuple[int, Link]]:
+        """Lazily yield ``(number, link)`` pairs in list numbering order.
+
+        The partitions are already sorted, so taking the first few pairs
+        costs only as much as the pairs taken.
+        """
+        partitions = [self._unread_partition()]
+        if include_read:
+            partitions.append(self._read_partition())
+        total = sum(len(partition) for partition in partitions)
+        if reverse:
+            entries = merge(*(reversed(part) for part in partitions), reverse=True)
+            numbers = range(total, 0, -1)
+        else:
+            entries = merge(*partitions)
+            numbers = range(1, total + 1)
+        for number, entry in zip(numbers, entries):
+            yield number, self._links[entry[2]]
+
+    def unread_count(self) -> int:
+        if self._unread is None:
+            # Counting needs no timestamps, unlike building the partition.
+            return sum(1 for link in self._links.values() if link.read_at is None)
+        return len(self._unread)
+
+    def unread_at(self, number: int) -> Link | None:
+        """Return the unread link numbered *number* (1-based), if any."""
+        unread = self._unread_partition()
+        if number < 1 or number > len(unread):
+            return None
+        return self._links[unread[number - 1][2]]
+
+    def unread_number(self, link_id: str) -> int | None:
+        """Return the 1-based unread number of *link_id*, if it is unread."""
+        link = self._links.get(link_id)
+        if link is None or link.read_at is not None:
+            return None
+        return bisect_left(self._unread_partition(), self._entries[link_id]) + 1
+
+    def resolve_numbers(self, numbers: Iterable[int]) -> list[tuple[int, Link]] | None:
+        """Look up unread *numbers* in one snapshot; None if any is missing.
+
+        Resolve before mutating: removing or marking a link renumbers the
+        unread links after it.
+        """
+        resolved = []
+        for number in numbers:
+            link = self.unread_at(number)
+            if link is None:
+                return None
+            resolved.append((number, link))
+        return resolved
+
+    def resolve_spec(self, spec: str) -> list[tuple[int, Link]]:
+        """Resolve a number spec such as ``1-5,8`` against the unread numbering.
+
+        Raises ValueError if *spec* is malformed and LookupError if it names
+        a missing link or no link at all.
+        """
+        numbers = parse_number_spec(spec, self.unread_count())
+        resolved = self.resolve_numbers(numbers)
+        if not resolved:
+            raise LookupError(spec)
+        return resolved
+
+    def _visible_at(self, number: int, include_read: bool) -> Link | None:
+        if not include_read:
+            return self.unread_at(number)
+        visible_links = self.ordered_links()
+        if number < 1 or number > len(visible_links):
+            return None
+        return visible_links[number - 1]
 
     def remove_link(self, link_id: str) -> bool:
-        before = len(self.links)
-        self.links = [link for link in self.links if link.id != link_id]
-        return len(self.links) < before
+        if self._discard(link_id) is None:
+            return False
+        self._record({"op": "remove", "id": link_id})
+        return True
 
     def remove_by_number(self, number: int, include_read: bool = False) -> bool:
-        visible_links = self.ordered_links() if include_read else self.unread_links()
-        if number < 1 or number > len(visible_links):
+        target = self._visible_at(number, include_read)
+        if target is None:
             return False
-        target_id = visible_links[number - 1].id
-        return self.remove_link(target_id)
+        return self.remove_link(target.id)
 
     def replace_by_number(self, number: int, url: str, title: str) -> Link | None:
         """Remove unread link at *number* and add a new link in its place."""
-        unread = self.unread_links()
-        if number < 1 or number > len(unread):
+        target = self.unread_at(number)
+        if target is None:
             return None
-        target_id = unread[number - 1].id
-        self.links = [link for link in self.links if link.id != target_id]
-        link = Link.create(url, title)
-        self.links.append(link)
-        return link
+        return self.replace_link(target.id, url, title)
+
+    def replace_link(self, link_id: str, url: str, title: str) -> Link | None:
+        """Remove unread link *link_id* and add a new link in its place."""
+        if self.unread_number(link_id) is None:
+            return None
+        self.remove_link(link_id)
+        return self._add(Link.create(url, title))
+
+    def duplicate_links(self, include_read: bool = False) -> list[Link]:
+        """Return the links whose canonical URL an earlier link already has.
 
-    def clear_links(self) -> None:
-        self.links = []
+        One pass in list order over the unread links, then (if
+        *include_read*) the read ones, so the first unread copy of a URL
+        is kept over older read copies.
+        """
+        seen: set[str] = set()
+        duplicates = []
+        links = self.unread_links()
+        if include_read:
+            links += self.read_links()
+        for link in links:
+            key = canonical_url(link.url)
+            if key in seen:
+                duplicates.append(link)
+            else:
+                seen.add(key)
+        return duplicates
+
+    def clear_links(self) -> bool:
+        """Remove every link; False if there were none to remove."""
+        if not self._links and self.complete:
+            return False
+        self.apply_change({"op": "clear"})
+        return True
 
     def mark_read_by_number(self, number: int, include_read: bool = False) -> bool:
-        visible_links = self.ordered_links() if include_read else self.unread_links()
-        if number < 1 or number > len(visible_links):
+        target = self._visible_at(number, include_read)
+        if target is None:
             return False
+        return self.mark_read(target.id)
 
-        target_id = visible_links[number - 1].id
+    def mark_read(self, link_id: str) -> bool:
+        link = self._links.get(link_id)
+        if link is None:
+            return False
+        if link.read_at is not None:
+            return True
         read_at = datetime.now(timezone.utc).isoformat()
-        self.links = [
-            link
-            if link.id != target_id
-            else Link(**{**link.__dict__, "read_at": read_at})
-            for link in self.links
-        ]
+        self.apply_change({"op": "read", "id": link_id, "read_at": read_at})
+        return True
+
+    def record_check(
+        self, link_id: str, final_url: str | None, dead_at: str | None
+    ) -> bool:
+        """Store what ``bejw check`` found out about link *link_id*."""
+        link = self._links.get(link_id)
+        if link is None:
+            return False
+        if (link.final_url, link.dead_at) != (final_url, dead_at):
+            self.apply_change(
+                {
+                    "op": "check",
+                    "id": link_id,
+                    "final_url": final_url,
+                    "dead_at": dead_at,
+                }
+            )
         return True
 
     def to_dict(self) -> dict:
-        return {
-            "capacity": self.capacity,
-            "links": [link.__dict__ for link in self.links],
-        }
+        data = {"version": self.version, "capacity": self.capacity}
+        if self.archive:
+            data["archive"] = [[name, size] for name, size in self.archive]
+        data["links"] = [link.to_dict() for link in self.links]
+        return data
 
     @staticmethod
     def from_dict(data: dict) -> "ReadingList":
@@ -120,4 +621,7 @@ class ReadingList:
                 item = {**item, "read_at": None}
             links.append(Link(**item))
         capacity = data.get("capacity", 10)
-        return ReadingList(capacity=capacity, links=links)
+        reading_list = ReadingList(capacity=capacity, links=links)
+        reading_list.version = data.get("version", 0)
+        reading_list.archive = [(name, size) for name, size in data.get("archive", [])]
+        return reading_list
@@ -0,0 +1,242 @@
+"""Offline copies of saved pages, in ``<file>.pages/``, for ``read --offline``.
+
+``bejw fetch`` downloads pages concurrently over keep-alive connections
+(see ``fetch.run_concurrently``). Each body is stored once, compressed,
+under the SHA-256 of its content, so links to the same page share it::
+
+    blobs/<digest[:2]>/<digest>.gz   a page body, gzip-compressed
+    manifest.json                    link id -> digest, URL, type, last use
+    view/<digest>.<ext>              a decompressed copy for the browser
+
+The blobs and copies are kept within a size budget: the copies, which
+can be rebuilt from their blob, are dropped first, then the least
+recently used blobs, but never one that an unread link's copy needs.
+Changing the manifest needs the list's lock; blobs are written
+atomically and may be written without it.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import http.client
+import json
+import mimetypes
+import os
+import time
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Iterable
+
+from .fetch import (
+    CONCURRENCY,
+    TIMEOUT,
+    USER_AGENT,
+    ConnectionPool,
+    FetchError,
+    get,
+    run_concurrently,
+)
+from .storage import write_atomic
+
+# Larger pages are not stored.
+MAX_BYTES = 16 * 1024 * 1024
+# Default budget for the compressed blobs and decompressed copies.
+STORE_MAX_BYTES = 256 * 1024 * 1024
+COMPRESSLEVEL = 6
+MANIFEST_NAME = "manifest.json"
+BLOB_SUFFIX = ".gz"
+DEFAULT_EXTENSION = ".html"
+
+
+@dataclass(frozen=True, slots=True)
+class Download:
+    """The stored copy of *url*; *error* is set instead if it failed."""
+
+    url: str
+    digest: str | None = None
+    content_type: str | None = None
+    error: str | None = None
+
+
+def _extension(content_type: str | None) -> str:
+    if not content_type:
+        return DEFAULT_EXTENSION
+    media_type = content_type.partition(";")[0].strip().lower()
+    return mimetypes.guess_extension(media_type) or DEFAULT_EXTENSION
+
+
+class PageStore:
+    """The offline copies kept next to one list."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.pages: dict[str, dict] = self._read_manifest()
+        # Digests whose links got another copy; dropped on save() unless
+        # another link still uses them.
+        self._replaced: set[str] = set()
+
+    def _read_manifest(self) -> dict[str, dict]:
+        try:
+            manifest = json.loads((self.directory / MANIFEST_NAME).read_bytes())
+        except (OSError, ValueError):
+            return {}
+        return manifest.get("pages", {})
+
+    def save(self) -> None:
+        payload = json.dumps({"version": 1, "pages": self.pages}).encode()
+        write_atomic(self.directory / MANIFEST_NAME, payload)
+        used = {entry["digest"] for entry in self.pages.values()}
+        for digest in self._replaced - used:
+            self._drop_blob(digest)
+        self._replaced.clear()
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.directory / "blobs" / digest[:2] / f"{digest}{BLOB_SUFFIX}"
+
+    def _view_path(self, digest: str, content_type: str | None) -> Path:
+        return self.directory / "view" / f"{digest}{_extension(content_type)}"
+
+    def _views(self) -> list[tuple[float, int, Path]]:
+        """``(mtime, size, path)`` of every decompressed copy."""
+        views = []
+        try:
+            paths = [*(self.directory / "view").iterdir()]
+        except FileNotFoundError:
+            return []
+        for path in paths:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            views.append((stat.st_mtime, stat.st_size, path))
+        return views
+
+    def _drop_blob(self, digest: str) -> None:
+        self._blob_path(digest).unlink(missing_ok=True)
+        for view in (self.directory / "view").glob(f"{digest}.*"):
+            view.unlink(missing_ok=True)
+
+    def put_blob(self, body: bytes) -> str:
+        """Store *body* unless it is already stored; return its digest."""
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(digest)
+        if not path.exists():
+            write_atomic(path, gzip.compress(body, COMPRESSLEVEL, mtime=0))
+        return digest
+
+    def get(self, link_id: str) -> dict | None:
+        return self.pages.get(link_id)
+
+    def add(
+        self, link_id: str, url: str, digest: str, content_type: str | None
+    ) -> None:
+        """Record *digest* as the copy of *link_id*, replacing any older one."""
+        previous = self.pages.get(link_id)
+        if previous is not None and previous["digest"] != digest:
+            self._replaced.add(previous["digest"])
+        now = time.time()
+        self.pages[link_id] = {
+            "url": url,
+            "digest": digest,
+            "content_type": content_type,
+            "size": self._blob_path(digest).stat().st_size,
+            "fetched": now,
+            "used": now,
+        }
+
+    def open_copy(self, link_id: str) -> Path | None:
+        """Return a decompressed copy of *link_id*'s page, if one is stored."""
+        entry = self.pages.get(link_id)
+        if entry is None:
+            return None
+        view = self._view_path(entry["digest"], entry["content_type"])
+        if not view.exists():
+            try:
+                body = gzip.decompress(self._blob_path(entry["digest"]).read_bytes())
+            except FileNotFoundError:
+                del self.pages[link_id]
+                return None
+            write_atomic(view, body, durable=False)
+        else:
+            # Eviction drops the copies touched least recently first.
+            os.utime(view)
+        entry["used"] = time.time()
+        return view
+
+    def size(self) -> int:
+        """The compressed size of every stored blob, plus their copies."""
+        blobs = {entry["digest"]: entry["size"] for entry in self.pages.values()}
+        return sum(blobs.values()) + sum(size for _mtime, size, _path in self._views())
+
+    def evict(self, keep: set[str], max_bytes: int) -> list[str]:
+        """Drop copies, then least recently used blobs, to fit *max_bytes*.
+
+        Blobs that a link in *keep* uses are never dropped, even when the
+        store does not fit without them. Returns the ids of the links
+        whose blobs were dropped.
+        """
+        blobs: dict[str, dict] = {}
+        for link_id, entry in self.pages.items():
+            blob = blobs.setdefault(
+                entry["digest"],
+                {"size": entry["size"], "used": 0.0, "links": [], "kept": False},
+            )
+            blob["used"] = max(blob["used"], entry["used"])
+            blob["links"].append(link_id)
+            blob["kept"] = blob["kept"] or link_id in keep
+        total = sum(blob["size"] for blob in blobs.values())
+        views = sorted(self._views())
+        total += sum(size for _mtime, size, _path in views)
+        for _mtime, size, path in views:
+            if total <= max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        candidates = sorted(
+            (blob["used"], digest) for digest, blob in blobs.items() if not blob["kept"]
+        )
+        dropped = []
+        for _used, digest in candidates:
+            if total <= max_bytes:
+                break
+            blob = blobs[digest]
+            for link_id in blob["links"]:
+                del self.pages[link_id]
+            self._drop_blob(digest)
+            total -= blob["size"]
+            dropped.extend(blob["links"])
+        return dropped
+
+
+def _download_one(pool: ConnectionPool, url: str, store: PageStore) -> Download:
+    headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "identity"}
+    try:
+        status, response_headers, body, complete, _final = get(
+            pool, url, headers, MAX_BYTES
+        )
+        if status >= 400:
+            raise FetchError(f"HTTP {status}")
+        if not complete:
+            raise FetchError(f"Larger than {MAX_BYTES // (1024 * 1024)} MiB")
+        digest = store.put_blob(body)
+    except (OSError, http.client.HTTPException, FetchError, ValueError) as error:
+        return Download(url, error=str(error) or type(error).__name__)
+    return Download(url, digest, response_headers.get("Content-Type"))
+
+
+def download(
+    store: PageStore,
+    urls: Iterable[str],
+    concurrency: int = CONCURRENCY,
+    timeout: float = TIMEOUT,
+) -> dict[str, Download]:
+    """Download every distinct URL of *urls* into *store*'s blobs, keyed by URL.
+
+    Only the blobs are written; recording them is up to the caller. A page
+    that cannot be downloaded gets a Download with only *error* set.
+    """
+    return run_concurrently(
+        partial(_download_one, store=store), urls, concurrency, timeout
+    )
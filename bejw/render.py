@@ -1,12 +1,13 @@
 import csv
 import io
 import json
+import sys
 from enum import StrEnum
+from itertools import chain, islice
+from typing import Iterable, Iterator
 
-from rich.console import Console
-from rich.table import Table, box
-
-from .models import ReadingList
+from . import trace
+from .models import Link, ReadingList
 
 
 class OutputFormat(StrEnum):
@@ -30,58 +31,74 @@ def _link_headers(show_ids: bool) -> list[str]:
     return headers
 
 
-def _visible_links(reading_list: ReadingList, include_read: bool) -> list:
-    return reading_list.ordered_links() if include_read else reading_list.unread_links()
+def _visible_links(
+    reading_list: ReadingList,
+    include_read: bool,
+    offset: int = 0,
+    limit: int | None = None,
+    reverse: bool = False,
+) -> Iterator[tuple[int, Link]]:
+    """Yield the requested ``(number, link)`` slice without a full sort."""
+    numbered = reading_list.iter_links(include_read=include_read, reverse=reverse)
+    stop = None if limit is None else offset + limit
+    return islice(numbered, offset, stop)
+
+
+def _status(link: Link) -> str:
+    if link.read_at is not None:
+        return "read"
+    # Marked by ``bejw check --mark-dead``.
+    return "dead" if link.dead_at is not None else "unread"
 
 
 def _link_values(
-    reading_list: ReadingList, show_ids: bool, include_read: bool
-) -> list[list[str]]:
-    rows: list[list[str]] = []
-    ordered = _visible_links(reading_list, include_read)
-    for index, link in enumerate(ordered, start=1):
-        row: list[str] = [str(index)]
+    numbered: Iterable[tuple[int, Link]], show_ids: bool
+) -> Iterator[list[str]]:
+    for number, link in numbered:
+        row: list[str] = [str(number)]
         if show_ids:
             row.append(link.id)
-        row.append("read" if link.read_at is not None else "unread")
+        row.append(_status(link))
         row.append(link.title)
         row.append(link.url)
-        rows.append(row)
-    return rows
+        yield row
 
 
 def _render_delimited(
-    reading_list: ReadingList,
+    numbered: Iterable[tuple[int, Link]],
     show_ids: bool,
     include_header: bool,
     delimiter: str,
-    include_read: bool,
-) -> str:
+) -> Iterator[str]:
     output = io.StringIO()
     writer = csv.writer(output, delimiter=delimiter, lineterminator="\n")
 
+    rows = _link_values(numbered, show_ids)
     if include_header:
-        writer.writerow(_link_headers(show_ids))
-    writer.writerows(_link_values(reading_list, show_ids, include_read))
-    return output.getvalue()
+        rows = chain([_link_headers(show_ids)], rows)
+    for row in rows:
+        writer.writerow(row)
+        yield output.getvalue()
+        output.seek(0)
+        output.truncate()
 
 
-def _render_jsonl(reading_list: ReadingList, show_ids: bool, include_read: bool) -> str:
+def _render_jsonl(
+    numbered: Iterable[tuple[int, Link]], show_ids: bool
+) -> Iterator[str]:
     """Render the reading list as JSONL (JSON Lines) format."""
-    lines = []
-    ordered = _visible_links(reading_list, include_read)
-    for index, link in enumerate(ordered, start=1):
+    for number, link in numbered:
         payload = {
-            "number": index,
-            "status": "read" if link.read_at is not None else "unread",
+            "number": number,
+            "status": _status(link),
             "title": link.title,
             "url": link.url,
         }
+        if link.final_url is not None:
+            payload["final_url"] = link.final_url
         if show_ids:
             payload["id"] = link.id
-        lines.append(json.dumps(payload, ensure_ascii=False))
-    # Join the lines. Add a final newline at the end if there are any lines
-    return "\n".join(lines) + ("\n" if lines else "")
+        yield json.dumps(payload, ensure_ascii=False) + "\n"
 
 
 def render_links(
@@ -91,34 +108,81 @@ def render_links(
     include_header: bool = True,
     include_read: bool = False,
     color: ColorMode = ColorMode.AUTO,
+    offset: int = 0,
+    limit: int | None = None,
+    reverse: bool = False,
 ) -> None:
-    if color == ColorMode.ALWAYS:
-        render_console = Console(force_terminal=True)
-    elif color == ColorMode.NEVER:
-        render_console = Console(no_color=True)
-    else:
-        render_console = Console()
+    render_numbered_links(
+        _visible_links(reading_list, include_read, offset, limit, reverse),
+        unread_count=reading_list.unread_count(),
+        capacity=reading_list.capacity,
+        show_ids=show_ids,
+        output_format=output_format,
+        include_header=include_header,
+        color=color,
+    )
+
 
+def render_numbered_links(
+    numbered: Iterable[tuple[int, Link]],
+    unread_count: int,
+    capacity: int,
+    show_ids: bool = False,
+    output_format: OutputFormat = OutputFormat.TABLE,
+    include_header: bool = True,
+    color: ColorMode = ColorMode.AUTO,
+) -> None:
+    """Render already numbered links, e.g. a slice received from ``bejw serve``."""
+    with trace.phase("render"):
+        _render_numbered_links(
+            numbered,
+            unread_count,
+            capacity,
+            show_ids,
+            output_format,
+            include_header,
+            color,
+        )
+
+
+def _render_numbered_links(
+    numbered: Iterable[tuple[int, Link]],
+    unread_count: int,
+    capacity: int,
+    show_ids: bool,
+    output_format: OutputFormat,
+    include_header: bool,
+    color: ColorMode,
+) -> None:
+    # Machine formats are streamed straight to stdout, one row at a time, so
+    # that scripted calls never pay for importing rich.
     if output_format == OutputFormat.TSV:
-        render_console.file.write(
-            _render_delimited(
-                reading_list, show_ids, include_header, "\t", include_read
-            )
+        sys.stdout.writelines(
+            _render_delimited(numbered, show_ids, include_header, "\t")
         )
         return
     if output_format == OutputFormat.CSV:
-        render_console.file.write(
-            _render_delimited(reading_list, show_ids, include_header, ",", include_read)
+        sys.stdout.writelines(
+            _render_delimited(numbered, show_ids, include_header, ",")
         )
         return
     if output_format == OutputFormat.JSONL:
-        render_console.file.write(_render_jsonl(reading_list, show_ids, include_read))
+        sys.stdout.writelines(_render_jsonl(numbered, show_ids))
         return
 
     # If non of the above formats were selected, rendering a table
-    unread_count = len(reading_list.unread_links())
+    from rich.console import Console
+    from rich.table import Table, box
+
+    if color == ColorMode.ALWAYS:
+        render_console = Console(force_terminal=True)
+    elif color == ColorMode.NEVER:
+        render_console = Console(no_color=True)
+    else:
+        render_console = Console()
+
     table = Table(
-        title=f"Bejeweled Reading List ({unread_count}/{reading_list.capacity})",
+        title=f"Bejeweled Reading List ({unread_count}/{capacity})",
         box=box.SIMPLE,
         title_justify="left",
         title_style="bold red",
@@ -130,14 +194,7 @@ def render_links(
     table.add_column("Title", style="magenta")
     table.add_column("URL", style="green")
 
-    ordered = _visible_links(reading_list, include_read)
-    for index, link in enumerate(ordered, start=1):
-        row = [str(index)]
-        if show_ids:
-            row.append(str(link.id))
-        row.append("read" if link.read_at is not None else "unread")
-        row.append(link.title)
-        row.append(link.url)
+    for row in _link_values(numbered, show_ids):
         table.add_row(*row)
 
     render_console.print(table)
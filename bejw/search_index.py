@@ -0,0 +1,204 @@
+"""Inverted index over link titles and URLs, for ``bejw search``.
+
+Every gzip member appended to an archive segment (see ``archive``) gets a
+terms file describing the links in it, so archived links are found without
+decompressing the archive. Layout (little-endian)::
+
+    header    "BJWT", format version u16, flags u16, link count u32,
+              term count u32, compressed member size u64
+    links     per link: record offset u32 in the decompressed member,
+              created_key i64
+    keys      the created_key of every link, sorted
+    terms     term count + 1 offsets u32 into the term text, then
+              term count + 1 offsets u32 into the postings
+    text      the sorted terms, UTF-8, back to back
+    postings  link numbers u32, then one weight u8 per posting
+
+Terms are the lower-cased words of the title, the host and the rest of
+the URL, weighted in that order. A query matches links holding, for each
+of its words, a term starting with it; exact matches score double.
+"""
+
+from __future__ import annotations
+
+import mmap
+import re
+import struct
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterable
+from urllib.parse import urlsplit
+
+from .models import Link
+
+MAGIC = b"BJWT"
+FORMAT_VERSION = 1
+TITLE_WEIGHT = 3
+HOST_WEIGHT = 2
+PATH_WEIGHT = 1
+
+_HEADER = struct.Struct("<4sHHIIQ")
+_LINK = struct.Struct("<Iq")
+_KEY = struct.Struct("<q")
+_OFFSET = struct.Struct("<I")
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _WORD.findall(text.casefold())
+
+
+def link_terms(link: Link) -> dict[str, int]:
+    """Map each term of *link* to the weight of the best field holding it."""
+    parts = urlsplit(link.url)
+    terms: dict[str, int] = {}
+    for weight, text in (
+        (PATH_WEIGHT, f"{parts.path} {parts.query} {parts.fragment}"),
+        (HOST_WEIGHT, parts.netloc),
+        (TITLE_WEIGHT, link.title),
+    ):
+        for term in tokenize(text):
+            terms[term] = weight
+    return terms
+
+
+def score(terms: dict[str, int], query: list[str]) -> int:
+    """Score *terms* against the *query* words; 0 unless every word matches."""
+    total = 0
+    for word in query:
+        best = max(
+            (
+                weight * 2 if term == word else weight
+                for term, weight in terms.items()
+                if term.startswith(word)
+            ),
+            default=0,
+        )
+        if not best:
+            return 0
+        total += best
+    return total
+
+
+def encode(links: list[Link], record_offsets: list[int], member_size: int) -> bytes:
+    """Return the terms file of *links*, stored at *record_offsets* in a member."""
+    postings: dict[str, list[tuple[int, int]]] = {}
+    for number, link in enumerate(links):
+        for term, weight in link_terms(link).items():
+            postings.setdefault(term, []).append((number, weight))
+    terms = sorted(postings)
+    encoded = [term.encode() for term in terms]
+    text_offsets = [0]
+    posting_offsets = [0]
+    for term, encoded_term in zip(terms, encoded):
+        text_offsets.append(text_offsets[-1] + len(encoded_term))
+        posting_offsets.append(posting_offsets[-1] + len(postings[term]))
+    numbers = [number for term in terms for number, _weight in postings[term]]
+    weights = bytes(weight for term in terms for _number, weight in postings[term])
+    keys = [link.created_key for link in links]
+    return b"".join(
+        [
+            _HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(links), len(terms), member_size),
+            *(_LINK.pack(offset, key) for offset, key in zip(record_offsets, keys)),
+            struct.pack(f"<{len(keys)}q", *sorted(keys)),
+            struct.pack(f"<{len(text_offsets)}I", *text_offsets),
+            struct.pack(f"<{len(posting_offsets)}I", *posting_offsets),
+            *encoded,
+            struct.pack(f"<{len(numbers)}I", *numbers),
+            weights,
+        ]
+    )
+
+
+class TermsFile:
+    """View of a terms file that reads only the terms a query touches."""
+
+    def __init__(self, data: bytes | mmap.mmap) -> None:
+        magic, format_version, _flags, count, term_count, member_size = (
+            _HEADER.unpack_from(data)
+        )
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError("Not a bejw terms file")
+        self._data = data
+        self.count = count
+        self.member_size = member_size
+        self._term_count = term_count
+        self._keys = _HEADER.size + count * _LINK.size
+        self._text_offsets = self._keys + count * _KEY.size
+        self._posting_offsets = self._text_offsets + (term_count + 1) * _OFFSET.size
+        self._text = self._posting_offsets + (term_count + 1) * _OFFSET.size
+        self._postings = self._text + self._offset(self._text_offsets, term_count)
+        self._weights = self._postings + _OFFSET.size * self._offset(
+            self._posting_offsets, term_count
+        )
+        if self._weights + self._offset(self._posting_offsets, term_count) > len(data):
+            raise ValueError("Truncated bejw terms file")
+
+    def _offset(self, table: int, index: int) -> int:
+        return _OFFSET.unpack_from(self._data, table + index * _OFFSET.size)[0]
+
+    def _term(self, index: int) -> str:
+        start = self._text + self._offset(self._text_offsets, index)
+        end = self._text + self._offset(self._text_offsets, index + 1)
+        return self._data[start:end].decode()
+
+    def record_offset(self, number: int) -> int:
+        return _LINK.unpack_from(self._data, _HEADER.size + number * _LINK.size)[0]
+
+    def created_keys(self) -> tuple[int, ...]:
+        """The ``created_key`` of every link, sorted."""
+        return struct.unpack_from(f"<{self.count}q", self._data, self._keys)
+
+    def matches(self, query: list[str]) -> dict[int, int]:
+        """Score the links matching every *query* word, by link number."""
+        scores: dict[int, int] | None = None
+        for word in query:
+            best: dict[int, int] = {}
+            index = bisect_left(range(self._term_count), word, key=self._term)
+            while index < self._term_count:
+                term = self._term(index)
+                if not term.startswith(word):
+                    break
+                factor = 2 if term == word else 1
+                start = self._offset(self._posting_offsets, index)
+                end = self._offset(self._posting_offsets, index + 1)
+                numbers = struct.unpack_from(
+                    f"<{end - start}I",
+                    self._data,
+                    self._postings + start * _OFFSET.size,
+                )
+                weights = self._data[self._weights + start : self._weights + end]
+                for number, weight in zip(numbers, weights):
+                    best[number] = max(best.get(number, 0), weight * factor)
+                index += 1
+            if scores is None:
+                scores = best
+            else:
+                scores = {
+                    number: total + best[number]
+                    for number, total in scores.items()
+                    if number in best
+                }
+            if not scores:
+                return {}
+        return scores or {}
+
+
+def read(path: Path) -> TermsFile | None:
+    """Map the terms file at *path*, or return None if it is missing or bad."""
+    try:
+        with path.open("rb") as handle:
+            data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        # ValueError: mmap refuses empty files.
+        return None
+    try:
+        return TermsFile(data)
+    except (ValueError, struct.error):
+        return None
+
+
+def rank(scored: Iterable[tuple[int, int, Link]]) -> list[tuple[int, Link]]:
+    """Order ``(score, number, link)`` best first, then by number."""
+    ordered = sorted(scored, key=lambda item: (-item[0], item[1]))
+    return [(number, link) for _score, number, link in ordered]
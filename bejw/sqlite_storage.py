@@ -0,0 +1,192 @@
+"""SQLite backend, used for ``sqlite:`` paths and ``.db``/``.sqlite`` files."""
+
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+
+from .models import ConflictError, Link, ReadingList
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS links (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    created_key INTEGER NOT NULL,
+    read_at TEXT,
+    final_url TEXT,
+    dead_at TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS links_id ON links (id);
+CREATE INDEX IF NOT EXISTS links_read_created ON links (read_at, created_key, seq);
+"""
+
+_COLUMNS = "id, url, title, created_at, read_at, final_url, dead_at"
+# Columns added after the first release, created on databases lacking them.
+_ADDED_COLUMNS = ("final_url", "dead_at")
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Transactions are managed explicitly (see ``save``).
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.executescript(_SCHEMA)
+    columns = {row[1] for row in connection.execute("PRAGMA table_info(links)")}
+    for column in _ADDED_COLUMNS:
+        if column not in columns:
+            connection.execute(f"ALTER TABLE links ADD COLUMN {column} TEXT")
+    return connection
+
+
+def _insert(connection: sqlite3.Connection, link: Link) -> None:
+    connection.execute(
+        "INSERT INTO links"
+        " (id, url, title, created_at, created_key, read_at, final_url, dead_at)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            link.id,
+            link.url,
+            link.title,
+            link.created_at,
+            link.created_key,
+            link.read_at,
+            link.final_url,
+            link.dead_at,
+        ),
+    )
+
+
+def _get_meta(connection: sqlite3.Connection, key: str, default: int) -> int:
+    row = connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return int(row[0]) if row is not None else default
+
+
+def _set_meta(connection: sqlite3.Connection, key: str, value: int) -> None:
+    connection.execute(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value))
+    )
+
+
+def load(path: Path, include_read: bool = True) -> ReadingList:
+    """Load the list; without *include_read* only unread links are fetched."""
+    if not path.exists():
+        return ReadingList()
+    connection = _connect(path)
+    try:
+        # One read transaction, so capacity, version and rows agree.
+        connection.execute("BEGIN")
+        capacity = _get_meta(connection, "capacity", 10)
+        version = _get_meta(connection, "version", 0)
+        if include_read:
+            query = f"SELECT {_COLUMNS} FROM links ORDER BY seq"
+        else:
+            query = (
+                f"SELECT {_COLUMNS} FROM links WHERE read_at IS NULL"
+                " ORDER BY created_key, seq"
+            )
+        links = [Link(*values) for values in connection.execute(query)]
+        omitted = (
+            not include_read
+            and connection.execute(
+                "SELECT EXISTS (SELECT 1 FROM links WHERE read_at IS NOT NULL)"
+            ).fetchone()[0]
+        )
+        connection.execute("COMMIT")
+    finally:
+        connection.close()
+    reading_list = ReadingList(capacity=capacity, links=links)
+    reading_list.version = version
+    reading_list.complete = not omitted
+    reading_list.mark_saved()
+    return reading_list
+
+
+def summarize(path: Path) -> tuple[int, int] | None:
+    """Return the capacity and the number of unread links, without loading any.
+
+    Returns None if the database does not exist yet.
+    """
+    if not path.exists():
+        return None
+    connection = _connect(path)
+    try:
+        connection.execute("BEGIN")
+        capacity = _get_meta(connection, "capacity", 10)
+        (unread,) = connection.execute(
+            "SELECT COUNT(*) FROM links WHERE read_at IS NULL"
+        ).fetchone()
+        connection.execute("COMMIT")
+    finally:
+        connection.close()
+    return capacity, unread
+
+
+def stored_version(path: Path) -> int:
+    """Return the version counter of the database, bumped by every save."""
+    if not path.exists():
+        return 0
+    connection = _connect(path)
+    try:
+        return _get_meta(connection, "version", 0)
+    finally:
+        connection.close()
+
+
+def save(reading_list: ReadingList, path: Path) -> None:
+    """Apply pending changes, or rewrite every row if they are unknown.
+
+    Raises ConflictError if another writer saved since the list was loaded.
+    """
+    changes = reading_list.changes()
+    connection = _connect(path)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        version = _get_meta(connection, "version", 0)
+        if changes is not None and version != reading_list.version:
+            connection.execute("ROLLBACK")
+            raise ConflictError()
+        if changes is None:
+            connection.execute("DELETE FROM links")
+            _set_meta(connection, "capacity", reading_list.capacity)
+            for link in reading_list.links:
+                _insert(connection, link)
+        else:
+            for change in changes:
+                _apply(connection, change)
+        _set_meta(connection, "version", version + 1)
+        connection.execute("COMMIT")
+    except sqlite3.Error:
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        raise
+    finally:
+        connection.close()
+    reading_list.version = version + 1
+    reading_list.mark_saved()
+
+
+def _apply(connection: sqlite3.Connection, change: dict) -> None:
+    op = change["op"]
+    if op == "add":
+        _insert(connection, Link(**change["link"]))
+    elif op == "remove":
+        connection.execute("DELETE FROM links WHERE id = ?", (change["id"],))
+    elif op == "read":
+        connection.execute(
+            "UPDATE links SET read_at = ? WHERE id = ?",
+            (change["read_at"], change["id"]),
+        )
+    elif op == "check":
+        connection.execute(
+            "UPDATE links SET final_url = ?, dead_at = ? WHERE id = ?",
+            (change["final_url"], change["dead_at"], change["id"]),
+        )
+    elif op == "capacity":
+        _set_meta(connection, "capacity", change["value"])
+    elif op == "clear":
+        connection.execute("DELETE FROM links")
+    else:
+        raise ValueError(f"Unknown change: {op}")
@@ -1,22 +1,859 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import os
+import re
+import stat
+import struct
+import tempfile
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import StrEnum
 from pathlib import Path
+from typing import Callable, Iterator, TypeVar
+from weakref import WeakKeyDictionary, WeakSet
 
-from .models import ReadingList
+from . import archive, binary_storage, search_index, trace, unread_index
+from .models import ConflictError, Link, ReadingList
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - advisory locking is POSIX-only
+    fcntl = None
+
+SQLITE_PREFIX = "sqlite:"
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+# Mutations on a loaded list are appended to ``<file>.journal`` as one compact
+# JSON record per line; the snapshot is rewritten only once the journal grows
+# past either threshold. The journal's first line names the snapshot version
+# it extends, so a reader racing a compaction never replays it twice.
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_MAX_RECORDS = 1000
+JOURNAL_MAX_BYTES = 1024 * 1024
+
+# New files with this suffix get binary snapshots (see ``binary_storage``);
+# ``load`` recognises either encoding from the file's first bytes.
+BINARY_SUFFIX = ".bejw"
+
+# Loading a large JSON list leaves a binary copy of the decoded snapshot in
+# ``<file>.cache`` (the journal is replayed on top of it), keyed by the stat
+# of the snapshot and journal plus a hash of their contents. The hash is only
+# checked when the files were modified so close to the cache's creation that
+# an unchanged stat proves nothing.
+CACHE_SUFFIX = ".cache"
+CACHE_MIN_BYTES = 64 * 1024
+CACHE_RACY_NS = 2_000_000_000
+
+# Every save also rewrites ``<file>.index`` (see ``unread_index``), so that
+# commands needing only unread links never parse the read ones.
+INDEX_SUFFIX = ".index"
+
+# Compaction moves read links out of the snapshot into the segments of
+# ``<file>.archive/`` (see ``archive``), which only loads that include read
+# links open. A save also compacts once the snapshot holds more read links
+# than this, e.g. a file written before there was an archive.
+ARCHIVE_SUFFIX = ".archive"
+HOT_MAX_READ = 1000
+
+# Titles fetched for links added without one are cached in ``<file>.fetch/``
+# (see ``fetch``), one file per URL.
+FETCH_CACHE_SUFFIX = ".fetch"
+# ``bejw check`` keeps its results in ``<file>.check/`` (see ``check``).
+CHECK_CACHE_SUFFIX = ".check"
+# Pages downloaded by ``bejw fetch`` for reading offline (see ``pages``).
+PAGES_SUFFIX = ".pages"
+# Named lists (``--list NAME``) live in ``<file>.lists/`` as
+# ``<NAME><suffix of file>``, each a list file of its own with its own
+# journal, index and archive, so a command only opens the list it names.
+LISTS_SUFFIX = ".lists"
+# ``bejw sync`` keeps its device id, shared folder and log offsets in
+# ``<file>.sync`` and its merge state in ``<file>.sync-state`` (see ``sync``).
+SYNC_SUFFIX = ".sync"
+SYNC_STATE_SUFFIX = ".sync-state"
+DEFAULT_LIST = "default"
+_LIST_NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]*")
+
+LOCK_SUFFIX = ".lock"
+# Where ``bejw serve`` listens for the list stored next to it.
+SOCKET_SUFFIX = ".sock"
+UPDATE_ATTEMPTS = 5
+
+T = TypeVar("T")
+
+
+class SnapshotFormat(StrEnum):
+    JSON = "json"
+    BINARY = "binary"
+
+
+# What each loaded JSON list looked like on disk, checked again before saving.
+_tokens: WeakKeyDictionary[ReadingList, tuple] = WeakKeyDictionary()
+# Lists holding only the unread links, loaded from the index.
+_partial: WeakSet[ReadingList] = WeakSet()
+# The hot read count of each of those when it was loaded or last saved.
+_hot_reads: WeakKeyDictionary[ReadingList, int] = WeakKeyDictionary()
+
+
+@dataclass
+class _ArchiveState:
+    """What a loaded list knows about the archive of its file."""
+
+    # Archived links that are also held in memory, by id.
+    links: dict[str, Link] = field(default_factory=dict)
+    # Whether every archived link is held in memory, so that one missing
+    # from the list or changed in it was removed or changed since.
+    complete: bool = True
+    # Journal changes to archived links the list does not hold.
+    pending: list[dict] = field(default_factory=list)
+
+
+_archives: WeakKeyDictionary[ReadingList, _ArchiveState] = WeakKeyDictionary()
+
+
+def _journal_path(path: Path) -> Path:
+    return path.with_name(path.name + JOURNAL_SUFFIX)
+
+
+def _read_journal(journal: Path) -> bytes:
+    try:
+        return journal.read_bytes()
+    except FileNotFoundError:
+        return b""
+
+
+def _parse_journal(data: bytes, version: int) -> list[dict]:
+    # Split on b"\n" only: titles may hold other line separators.
+    lines = data.split(b"\n")
+    try:
+        header = json.loads(lines[0]) if lines[0] else {}
+    except ValueError:
+        return []
+    if header.get("base") != version:
+        # Left behind by a compaction that has already folded it in.
+        return []
+    changes = []
+    for line in lines[1:]:
+        if not line:
+            continue
+        try:
+            changes.append(json.loads(line))
+        except ValueError:
+            # A torn record from an interrupted append; later ones are whole.
+            continue
+    return changes
+
+
+def _append_journal(journal: Path, changes: list[dict], version: int) -> None:
+    with journal.open("a+b") as handle:
+        size = handle.seek(0, os.SEEK_END)
+        if size:
+            handle.seek(size - 1)
+            if handle.read(1) != b"\n":
+                # Drop a torn record left by an interrupted append, so the
+                # next record starts on a line of its own.
+                handle.seek(0)
+                size = handle.read().rfind(b"\n") + 1
+                handle.truncate(size)
+        records = changes if size else [{"base": version}, *changes]
+        # ASCII escapes keep titles that are not valid UTF-8 writable.
+        payload = "".join(
+            json.dumps(record, separators=(",", ":")) + "\n" for record in records
+        )
+        handle.write(payload.encode())
+        handle.flush()
+        os.fsync(handle.fileno())
+
+
+def _journal_needs_compaction(journal: Path) -> bool:
+    if journal.stat().st_size > JOURNAL_MAX_BYTES:
+        return True
+    return journal.read_bytes().count(b"\n") > JOURNAL_MAX_RECORDS + 1
+
+
+def _file_mode(path: Path) -> int:
+    """The permission bits *path* has, or would get from open() if new.
+
+    ``write_atomic`` gives its temporary file these, since mkstemp creates
+    files readable by their owner only.
+    """
+    try:
+        return stat.S_IMODE(path.stat().st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
 
-def load(file_path: str) -> ReadingList:
-    """Load the reading list from a JSON file."""
-    path = Path(file_path).expanduser()
-    if not path.exists():
-        return ReadingList()
-    data = json.loads(path.read_text(encoding="utf-8"))
-    return ReadingList.from_dict(data)
 
+def write_atomic(path: Path, payload: bytes, durable: bool = True) -> None:
+    """Replace *path* with *payload* so readers see the old or new file, whole.
 
-def save(reading_list: ReadingList, file_path: str) -> None:
-    path = Path(file_path).expanduser()
+    Files that can be rebuilt, such as caches, skip the fsync (*durable*).
+    """
     path.parent.mkdir(parents=True, exist_ok=True)
-    payload = json.dumps(reading_list.to_dict(), indent=2)
-    path.write_text(payload, encoding="utf-8")
+    descriptor, temp_name = tempfile.mkstemp(
+        prefix=f".{path.name}.", suffix=".tmp", dir=path.parent
+    )
+    try:
+        os.fchmod(descriptor, _file_mode(path))
+        with os.fdopen(descriptor, "wb") as handle:
+            handle.write(payload)
+            if durable:
+                handle.flush()
+                os.fsync(handle.fileno())
+        os.replace(temp_name, path)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+
+
+def _cache_path(path: Path) -> Path:
+    return path.with_name(path.name + CACHE_SUFFIX)
+
+
+def _content_digest(snapshot: bytes, journal: bytes) -> str:
+    digest = hashlib.sha256(snapshot)
+    digest.update(journal)
+    return digest.hexdigest()
+
+
+def _read_cache(path: Path, token: tuple) -> ReadingList | None:
+    cache = _cache_path(path)
+    try:
+        data = cache.read_bytes()
+        cached_at = cache.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    header_end = data.find(b"\n")
+    try:
+        header = json.loads(data[:header_end])
+    except json.JSONDecodeError:
+        return None
+    if header.get("token") != _token_key(token):
+        return None
+    modified = max(stat[2] for stat in token if stat is not None)
+    if modified + CACHE_RACY_NS > cached_at:
+        current = _content_digest(path.read_bytes(), _read_journal(_journal_path(path)))
+        if header.get("sha256") != current:
+            return None
+    try:
+        return binary_storage.decode(data[header_end + 1 :])
+    except ValueError:
+        return None
+
+
+def _write_cache(
+    path: Path, token: tuple, digest: str, reading_list: ReadingList
+) -> None:
+    header = json.dumps({"token": token, "sha256": digest}).encode()
+    try:
+        write_atomic(
+            _cache_path(path),
+            header + b"\n" + binary_storage.encode(reading_list),
+            durable=False,
+        )
+    except (OSError, struct.error, ValueError):
+        # The cache is only an optimisation, e.g. for a read-only directory
+        # or a list its encoding can't hold.
+        pass
+
+
+def _index_path(path: Path) -> Path:
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def _read_index(path: Path, token: tuple) -> unread_index.UnreadIndex | None:
+    index = unread_index.read(_index_path(path))
+    if index is None or index.token != _token_key(token):
+        return None
+    return index
+
+
+def _write_index(path: Path, reading_list: ReadingList, token: tuple) -> None:
+    try:
+        write_atomic(
+            _index_path(path),
+            unread_index.encode(reading_list, token, _hot_read_count(reading_list)),
+            durable=False,
+        )
+    except (OSError, struct.error, ValueError):
+        # Without an index, commands load the list instead.
+        _index_path(path).unlink(missing_ok=True)
+
+
+def _token_key(token: tuple) -> list:
+    """*token* as it reads back from JSON, for comparing with stored ones."""
+    return json.loads(json.dumps(token))
+
+
+def _stat_token(path: Path) -> tuple:
+    """Cheap fingerprint of the snapshot and journal, changed by any write."""
+    tokens = []
+    for candidate in (path, _journal_path(path)):
+        try:
+            stat = candidate.stat()
+        except FileNotFoundError:
+            tokens.append(None)
+        else:
+            tokens.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+    return tuple(tokens)
+
+
+def storage_path(file_path: str) -> Path:
+    """Return the on-disk path for *file_path*, without any scheme prefix."""
+    return Path(file_path.removeprefix(SQLITE_PREFIX)).expanduser()
+
+
+def _is_sqlite(file_path: str) -> bool:
+    return file_path.startswith(SQLITE_PREFIX) or file_path.endswith(SQLITE_SUFFIXES)
+
+
+def snapshot_format(file_path: str) -> SnapshotFormat:
+    """Return the encoding of the snapshot at *file_path*, or the one it will get."""
+    path = storage_path(file_path)
+    try:
+        with path.open("rb") as handle:
+            head = handle.read(len(binary_storage.MAGIC))
+    except FileNotFoundError:
+        if path.suffix == BINARY_SUFFIX:
+            return SnapshotFormat.BINARY
+        return SnapshotFormat.JSON
+    if binary_storage.is_binary(head):
+        return SnapshotFormat.BINARY
+    return SnapshotFormat.JSON
+
+
+def list_path(file_path: str, name: str) -> str:
+    """Return the file path of the list called *name* in the store *file_path*.
+
+    Raises ValueError for names that could clash with other files.
+    """
+    if name == DEFAULT_LIST:
+        return file_path
+    if not _LIST_NAME.fullmatch(name):
+        raise ValueError(f"Invalid list name: {name}")
+    path = storage_path(file_path)
+    named = path.with_name(path.name + LISTS_SUFFIX) / f"{name}{path.suffix}"
+    prefix = SQLITE_PREFIX if file_path.startswith(SQLITE_PREFIX) else ""
+    return f"{prefix}{named}"
+
+
+def list_names(file_path: str) -> list[str]:
+    """Return the names of the lists in the store *file_path*, default first."""
+    path = storage_path(file_path)
+    try:
+        file_names = os.listdir(path.with_name(path.name + LISTS_SUFFIX))
+    except FileNotFoundError:
+        file_names = []
+    # Sidecar files add a suffix of their own, so they never match.
+    pattern = re.compile(f"({_LIST_NAME.pattern}){re.escape(path.suffix)}")
+    names = [
+        match[1]
+        for file_name in file_names
+        if (match := pattern.fullmatch(file_name)) and match[1] != DEFAULT_LIST
+    ]
+    return [DEFAULT_LIST, *sorted(names)]
+
+
+def summarize(file_path: str) -> tuple[int, int] | None:
+    """Return the capacity and unread count of the list at *file_path*.
+
+    Both are read from the header of its unread index (or counted by
+    SQLite), so no link is decoded unless the index is out of date.
+    Returns None for a list that was never saved.
+    """
+    if _is_sqlite(file_path):
+        from . import sqlite_storage
+
+        return sqlite_storage.summarize(storage_path(file_path))
+    if not storage_path(file_path).exists():
+        return None
+    index = open_index(file_path)
+    if index is None:
+        reading_list = load(file_path, include_read=False)
+        return reading_list.capacity, reading_list.unread_count()
+    return index.capacity, index.unread_count()
+
+
+@contextmanager
+def lock(file_path: str) -> Iterator[None]:
+    """Hold an exclusive advisory lock for a read-modify-write of *file_path*.
+
+    Readers never need it: snapshots are replaced atomically and torn
+    journal records are ignored.
+    """
+    path = storage_path(file_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.with_name(path.name + LOCK_SUFFIX).open("a") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def update(
+    file_path: str,
+    mutate: Callable[[ReadingList], T],
+    include_read: bool = False,
+) -> T:
+    """Load, apply *mutate* and save under the lock, retrying on conflicts.
+
+    If *mutate* raises, nothing is saved.
+    """
+    for attempt in range(UPDATE_ATTEMPTS):
+        with lock(file_path):
+            # The save is about to invalidate the cache; don't build one.
+            reading_list = load(file_path, include_read, store_cache=False)
+            result = mutate(reading_list)
+            try:
+                save(reading_list, file_path)
+            except ConflictError:
+                if attempt == UPDATE_ATTEMPTS - 1:
+                    raise
+                continue
+            return result
+    raise AssertionError("unreachable")
+
+
+def update_unread(
+    file_path: str, mutate: Callable[[ReadingList | unread_index.UnreadIndex], T]
+) -> T:
+    """Like ``update``, for changes that only mark read or remove unread links.
+
+    With an up-to-date index *mutate* gets the index instead of a loaded
+    list: only the links it looks up are decoded, their change records are
+    appended to the journal and the index is rewritten without them.
+    """
+    path = storage_path(file_path)
+    if not _is_sqlite(file_path):
+        with lock(file_path):
+            token = _stat_token(path)
+            index = _read_index(path, token)
+            if index is not None:
+                result = mutate(index)
+                changes = index.changes()
+                if changes:
+                    _apply_to_index(path, file_path, index, changes)
+                    _log_changes(file_path, changes)
+                return result
+    return update(file_path, mutate)
+
+
+def _apply_to_index(
+    path: Path, file_path: str, index: unread_index.UnreadIndex, changes: list[dict]
+) -> None:
+    with trace.phase("save"):
+        _cache_path(path).unlink(missing_ok=True)
+        journal = _journal_path(path)
+        _append_journal(journal, changes, index.version)
+        if _journal_needs_compaction(journal) or index.read_count() > HOT_MAX_READ:
+            compact(_load_snapshot(path, _stat_token(path), False, False), file_path)
+            return
+        payload = index.encode_remaining(_stat_token(path))
+        write_atomic(_index_path(path), payload, durable=False)
+
+
+def load(
+    file_path: str, include_read: bool = True, store_cache: bool = True
+) -> ReadingList:
+    """Load the reading list stored at *file_path*.
+
+    Backends that can skip read links do so when *include_read* is False;
+    the returned list then holds only unread links (and, for JSON and binary
+    files, read links not yet moved to the archive) and must only be saved
+    back to the same file. Without *store_cache* a large JSON list is still
+    read from a valid cache, but no new cache is written.
+    """
+    with trace.phase("load"):
+        return _load(file_path, include_read, store_cache)
+
+
+def _load(file_path: str, include_read: bool, store_cache: bool) -> ReadingList:
+    path = storage_path(file_path)
+    if _is_sqlite(file_path):
+        from . import sqlite_storage
+
+        return sqlite_storage.load(path, include_read=include_read)
+    token = _stat_token(path)
+    if token[0] is None:
+        return ReadingList()
+    if not include_read:
+        with trace.phase("index"):
+            index = _read_index(path, token)
+        if index is not None:
+            reading_list = ReadingList(
+                capacity=index.capacity, links=index.unread_links()
+            )
+            reading_list.version = index.version
+            reading_list.complete = bool(index.flags & unread_index.FLAG_NO_READ)
+            reading_list.mark_saved()
+            _tokens[reading_list] = token
+            _partial.add(reading_list)
+            _hot_reads[reading_list] = index.hot_read
+            return reading_list
+    try:
+        return _load_snapshot(path, token, include_read, store_cache)
+    except FileNotFoundError:
+        if _stat_token(path) == token:
+            raise
+        # A compaction replaced the files after they were stat-ed.
+        return _load(file_path, include_read, store_cache)
+
+
+def _load_snapshot(
+    path: Path, token: tuple, include_read: bool, store_cache: bool
+) -> ReadingList:
+    with trace.phase("cache"):
+        reading_list = _read_cache(path, token)
+    journal = _read_journal(_journal_path(path))
+    if reading_list is None:
+        raw = path.read_bytes()
+        if binary_storage.is_binary(raw):
+            with trace.phase("decode"):
+                reading_list = binary_storage.decode(raw)
+        else:
+            with trace.phase("decode"):
+                data = json.loads(raw)
+            with trace.phase("from_dict"):
+                reading_list = ReadingList.from_dict(data)
+        # Binary snapshots load about as fast as the cache would.
+        if (
+            store_cache
+            and len(raw) >= CACHE_MIN_BYTES
+            and not binary_storage.is_binary(raw)
+        ):
+            digest = _content_digest(raw, journal)
+            _write_cache(path, token, digest, reading_list)
+    state = _ArchiveState(complete=not reading_list.archive)
+    if include_read and reading_list.archive:
+        with trace.phase("archive"):
+            reading_list = _with_archive(path, reading_list, state)
+    reading_list.complete = state.complete
+    with trace.phase("journal"):
+        for change in _parse_journal(journal, reading_list.version):
+            if not state.complete and _targets_archive(reading_list, change):
+                state.pending.append(change)
+            reading_list.apply_change(change)
+    _archives[reading_list] = state
+    if store_cache and _read_index(path, token) is None:
+        _write_index(path, reading_list, token)
+    reading_list.mark_saved()
+    _tokens[reading_list] = token
+    return reading_list
+
+
+def _archive_dir(path: Path) -> Path:
+    return path.with_name(path.name + ARCHIVE_SUFFIX)
+
+
+def _with_archive(path: Path, hot: ReadingList, state: _ArchiveState) -> ReadingList:
+    archived = [*archive.read(_archive_dir(path), hot.archive)]
+    reading_list = ReadingList(capacity=hot.capacity, links=[*archived, *hot.links])
+    reading_list.version = hot.version
+    reading_list.archive = hot.archive
+    state.links = {link.id: link for link in archived}
+    state.complete = True
+    return reading_list
+
+
+def _targets_archive(reading_list: ReadingList, change: dict) -> bool:
+    """Whether *change* may touch archived links *reading_list* doesn't hold."""
+    if change["op"] == "clear":
+        return True
+    return (
+        change["op"] in ("remove", "read", "check")
+        and reading_list.get(change["id"]) is None
+    )
+
+
+def _hot_read_count(reading_list: ReadingList) -> int:
+    """Read links of *reading_list* that are not archived yet."""
+    if reading_list in _partial:
+        # Its read links are only on disk; count what its changes did to them.
+        count = _hot_reads.get(reading_list, 0)
+        for change in reading_list.changes() or []:
+            if change["op"] == "clear":
+                count = 0
+            elif change["op"] == "read":
+                count += 1
+        return count
+    state = _archives.get(reading_list)
+    archived = 0 if state is None else len(state.links)
+    return len(reading_list) - reading_list.unread_count() - archived
+
+
+def is_stale(reading_list: ReadingList, file_path: str) -> bool:
+    """Return True if *file_path* was written since *reading_list* was loaded."""
+    path = storage_path(file_path)
+    if _is_sqlite(file_path):
+        from . import sqlite_storage
+
+        return sqlite_storage.stored_version(path) != reading_list.version
+    return _tokens.get(reading_list) != _stat_token(path)
+
+
+def open_index(file_path: str) -> unread_index.UnreadIndex | None:
+    """Return the up-to-date unread index of *file_path*, if there is one.
+
+    It answers ``unread_count``, ``unread_at`` and ``resolve_spec`` like a
+    loaded list while decoding only the links that are looked up.
+    """
+    if _is_sqlite(file_path):
+        return None
+    path = storage_path(file_path)
+    return _read_index(path, _stat_token(path))
+
+
+def search(
+    file_path: str, query: str, include_read: bool = False
+) -> tuple[ReadingList, list[tuple[int, Link]]]:
+    """Find links matching every word of *query*, best match first.
+
+    Returns the list the results are numbered in, as ``list`` numbers them
+    (it holds at least the unread links), and ``(number, link)`` pairs.
+    Archived links are looked up in the terms files of the archive, so only
+    the members holding a match are decompressed. Raises ValueError if
+    *query* has no words.
+    """
+    words = search_index.tokenize(query)
+    if not words:
+        raise ValueError("Empty search query")
+    with trace.phase("search"):
+        path = storage_path(file_path)
+        if include_read and not _is_sqlite(file_path):
+            token = _stat_token(path)
+            if token[0] is not None:
+                hot = _load_snapshot(path, token, False, False)
+                try:
+                    results = _search_tiers(path, hot, words)
+                except FileNotFoundError:
+                    # A compaction pruned the archive we were reading.
+                    results = None
+                if results is not None:
+                    return hot, results
+        reading_list = load(file_path, include_read=include_read)
+        scored = []
+        for number, link in reading_list.iter_links(include_read=include_read):
+            link_score = search_index.score(search_index.link_terms(link), words)
+            if link_score:
+                scored.append((link_score, number, link))
+        return reading_list, search_index.rank(scored)
+
+
+def _search_tiers(
+    path: Path, hot: ReadingList, words: list[str]
+) -> list[tuple[int, Link]] | None:
+    """Search the snapshot directly and the archive through its terms files.
+
+    Returns None if the archive can't be searched that way: it has pending
+    journal changes or lacks terms files.
+    """
+    directory = _archive_dir(path)
+    if _archives[hot].pending:
+        return None
+    members = archive.terms(directory, hot.archive)
+    if members is None:
+        return None
+    # Numbers follow ``ReadingList.iter_links`` on the full list, where every
+    # archived link precedes the snapshot's links created at the same time.
+    archived_keys = sorted(
+        key for _name, _start, terms in members for key in terms.created_keys()
+    )
+    scored = []
+    for number, link in hot.iter_links(include_read=True):
+        link_score = search_index.score(search_index.link_terms(link), words)
+        if link_score:
+            number += bisect_right(archived_keys, link.created_key)
+            scored.append((link_score, number, link))
+    hot_keys = sorted(link.created_key for link in hot.links)
+    for name, start, terms in members:
+        matches = terms.matches(words)
+        if not matches:
+            continue
+        offsets = [terms.record_offset(number) for number in matches]
+        links = archive.read_links(directory, name, start, terms.member_size, offsets)
+        for link_score, link in zip(matches.values(), links):
+            number = 1 + bisect_left(archived_keys, link.created_key)
+            number += bisect_left(hot_keys, link.created_key)
+            scored.append((link_score, number, link))
+    return search_index.rank(scored)
+
+
+def save(reading_list: ReadingList, file_path: str, log: bool = True) -> None:
+    """Persist *reading_list*, raising ConflictError if the file moved on.
+
+    A list with no changes since it was loaded or saved is not written.
+    Unless *log* is False, the changes also go to the sync log of a list
+    that is synced.
+    """
+    changes = reading_list.changes()
+    if changes == [] and storage_path(file_path).exists():
+        return
+    with trace.phase("save"):
+        _save(reading_list, file_path)
+    if log and changes:
+        _log_changes(file_path, changes)
+
+
+def _log_changes(file_path: str, changes: list[dict]) -> None:
+    path = storage_path(file_path)
+    if path.with_name(path.name + SYNC_SUFFIX).exists():
+        from . import sync
+
+        with trace.phase("sync"):
+            sync.log_changes(file_path, changes)
+
+
+def _save(reading_list: ReadingList, file_path: str) -> None:
+    path = storage_path(file_path)
+    if _is_sqlite(file_path):
+        from . import sqlite_storage
+
+        sqlite_storage.save(reading_list, path)
+        return
+    token = _tokens.get(reading_list)
+    if token is not None and token != _stat_token(path):
+        raise ConflictError()
+    _cache_path(path).unlink(missing_ok=True)
+    journal = _journal_path(path)
+    changes = reading_list.changes()
+    # More changes than the journal holds would be compacted right away;
+    # a list with its read links loaded skips writing and replaying them.
+    bulk = (
+        changes is not None
+        and len(changes) > JOURNAL_MAX_RECORDS
+        and reading_list not in _partial
+    )
+    if changes is not None and path.exists() and not bulk:
+        if changes:
+            _append_journal(journal, changes, reading_list.version)
+            state = _archives.get(reading_list)
+            if state is not None and not state.complete:
+                state.pending += [
+                    change for change in changes if change["op"] == "clear"
+                ]
+        hot_read = _hot_read_count(reading_list)
+        if (
+            not (journal.exists() and _journal_needs_compaction(journal))
+            and hot_read <= HOT_MAX_READ
+        ):
+            if reading_list in _partial:
+                _hot_reads[reading_list] = hot_read
+            reading_list.mark_saved()
+            _tokens[reading_list] = _stat_token(path)
+            _write_index(path, reading_list, _tokens[reading_list])
+            return
+    if reading_list in _partial:
+        # Read links are only on disk; fold the journal in with them.
+        hot = _load_snapshot(path, _stat_token(path), False, False)
+        compact(hot, file_path)
+        reading_list.version = hot.version
+        reading_list.archive = hot.archive
+        reading_list.mark_saved()
+        _tokens[reading_list] = _tokens[hot]
+        _hot_reads[reading_list] = 0
+        return
+    compact(reading_list, file_path)
+
+
+def migrate(source: str, target: str) -> ReadingList:
+    """Copy the reading list at *source* into a fresh *target* file."""
+    loaded = load(source)
+    reading_list = ReadingList(capacity=loaded.capacity, links=loaded.links)
+    with lock(target):
+        save(reading_list, target)
+    return reading_list
+
+
+def convert(file_path: str, target_format: SnapshotFormat) -> ReadingList:
+    """Rewrite the snapshot at *file_path* in *target_format*, in place."""
+    if _is_sqlite(file_path):
+        raise ValueError("SQLite lists cannot be converted; use migrate instead")
+    with lock(file_path):
+        reading_list = load(file_path)
+        compact(reading_list, file_path, target_format)
+    return reading_list
+
+
+def compact(
+    reading_list: ReadingList,
+    file_path: str,
+    target_format: SnapshotFormat | None = None,
+) -> None:
+    """Move read links to the archive, write a snapshot of the rest and
+    drop the journal.
+
+    The snapshot keeps the file's current encoding unless *target_format*
+    is given.
+    """
+    if reading_list in _partial:
+        raise ValueError("Cannot snapshot a list loaded without its read links")
+    path = storage_path(file_path)
+    if target_format is None:
+        target_format = snapshot_format(file_path)
+    reading_list.version += 1
+    _cache_path(path).unlink(missing_ok=True)
+    with trace.phase("archive"):
+        segments, state = _archive_read_links(path, reading_list)
+    hot = ReadingList(
+        capacity=reading_list.capacity,
+        links=[link for link in reading_list.links if link.read_at is None],
+    )
+    hot.version = reading_list.version
+    hot.archive = segments
+    if target_format == SnapshotFormat.BINARY:
+        payload = binary_storage.encode(hot)
+    else:
+        payload = json.dumps(hot.to_dict(), indent=2).encode()
+    write_atomic(path, payload)
+    _journal_path(path).unlink(missing_ok=True)
+    archive.prune(_archive_dir(path), segments)
+    reading_list.archive = segments
+    reading_list.mark_saved()
+    _tokens[reading_list] = _stat_token(path)
+    _archives[reading_list] = state
+    _write_index(path, reading_list, _tokens[reading_list])
+
+
+def _archive_read_links(
+    path: Path, reading_list: ReadingList
+) -> tuple[list[tuple[str, int]], _ArchiveState]:
+    """Bring the archive of *path* up to date with the read links in memory.
+
+    Returns the new segment table, to be committed by the next snapshot,
+    and what *reading_list* knows about it afterwards.
+    """
+    directory = _archive_dir(path)
+    read = [link for link in reading_list.links if link.read_at is not None]
+    state = _archives.get(reading_list)
+    if state is None:
+        # Not loaded from this file, so it replaces whatever was archived.
+        segments = archive.append(directory, [], read)
+        complete = True
+    elif state.pending or (
+        state.complete
+        and any(
+            reading_list.get(link_id) != link for link_id, link in state.links.items()
+        )
+    ):
+        # Archived links were removed or changed: write new segments.
+        links = read
+        if not state.complete:
+            archived = ReadingList(links=archive.read(directory, reading_list.archive))
+            for change in state.pending:
+                archived.apply_change(change)
+            links = [
+                link for link in archived.links if reading_list.get(link.id) is None
+            ] + read
+        segments = archive.append(directory, [], links)
+        complete = state.complete
+    else:
+        new = [link for link in read if link.id not in state.links]
+        segments = archive.append(directory, reading_list.archive, new)
+        complete = state.complete
+    return segments, _ArchiveState({link.id: link for link in read}, complete)
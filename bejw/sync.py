@@ -0,0 +1,271 @@
+"""Merge a list across devices through a shared folder, for ``bejw sync``.
+
+Each device appends the changes it saves to its own log in the folder,
+``<device id><LOG_SUFFIX>``, one JSON entry per line: the change record
+(see ``ReadingList.apply_change``) and the time it was made. No device
+ever writes another device's log, so a file syncing tool can't lose
+entries to a write conflict.
+
+``merge`` reads the entries appended to every log since the last merge,
+from a byte offset kept per log, and applies them so that all devices
+end up with the same list whatever order they merge in:
+
+- links form an add-wins set keyed by ``Link.id``: a removed id stays
+  removed, and a clear only removes the links its device had seen, i.e.
+  the entries before the offsets it records, so concurrent adds survive
+- ``read_at``, the fields ``check`` sets and the capacity are
+  last-writer-wins registers, ordered by entry time and then device id
+
+The device id, folder and offsets live in ``<file>.sync``; what merging
+needs to remember about links (where each was added, removed ids and the
+latest write to each register) lives in ``<file>.sync-state``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+
+from .models import ReadingList
+from .storage import (
+    SYNC_STATE_SUFFIX,
+    SYNC_SUFFIX,
+    load,
+    lock,
+    save,
+    storage_path,
+    write_atomic,
+)
+
+LOG_SUFFIX = ".jsonl"
+# Changes that set a register, keyed by their op.
+_REGISTER_FIELDS = {"read": ("read_at",), "check": ("final_url", "dead_at")}
+
+
+class SyncError(Exception):
+    """Raised when a list can't be synced as asked."""
+
+
+def _config_path(file_path: str) -> Path:
+    path = storage_path(file_path)
+    return path.with_name(path.name + SYNC_SUFFIX)
+
+
+def _state_path(file_path: str) -> Path:
+    path = storage_path(file_path)
+    return path.with_name(path.name + SYNC_STATE_SUFFIX)
+
+
+def _read_json(path: Path, default: dict) -> dict:
+    try:
+        return json.loads(path.read_bytes())
+    except FileNotFoundError:
+        return default
+
+
+def _write_json(path: Path, data: dict) -> None:
+    write_atomic(path, json.dumps(data, separators=(",", ":")).encode())
+
+
+def _log_path(config: dict, device: str) -> Path:
+    return Path(config["directory"]) / f"{device}{LOG_SUFFIX}"
+
+
+def _append(config: dict, changes: list[dict]) -> None:
+    now = time.time()
+    entries = []
+    for change in changes:
+        if change["op"] == "clear":
+            # What this device had merged from the others; its own earlier
+            # entries are implied by the position of this one.
+            change = {**change, "seen": config["cursors"]}
+        entries.append(json.dumps({"time": now, "change": change}) + "\n")
+    log = _log_path(config, config["device"])
+    log.parent.mkdir(parents=True, exist_ok=True)
+    with log.open("a+b") as handle:
+        size = handle.seek(0, os.SEEK_END)
+        if size:
+            handle.seek(size - 1)
+            if handle.read(1) != b"\n":
+                # Drop a torn entry left by an interrupted append; no merge
+                # has read past it, as it never ended in a newline.
+                handle.seek(0)
+                handle.truncate(handle.read().rfind(b"\n") + 1)
+        handle.write("".join(entries).encode("utf-8"))
+
+
+def log_changes(file_path: str, changes: list[dict]) -> None:
+    """Append *changes*, just saved to *file_path*, to this device's log."""
+    config = _read_json(_config_path(file_path), {})
+    if config:
+        _append(config, changes)
+
+
+def setup(file_path: str, directory: Path) -> dict:
+    """Start syncing *file_path* through *directory*.
+
+    The links already in the list are logged as if they were just added,
+    so the other devices receive them on their next merge.
+    """
+    directory = directory.expanduser().resolve()
+    config = {"directory": str(directory), "device": uuid.uuid4().hex, "cursors": {}}
+    with lock(file_path):
+        reading_list = load(file_path)
+        changes = [{"op": "capacity", "value": reading_list.capacity}]
+        changes += [
+            {"op": "add", "link": link.to_dict()} for link in reading_list.links
+        ]
+        _append(config, changes)
+        _write_json(_config_path(file_path), config)
+    return config
+
+
+def config(file_path: str) -> dict | None:
+    """Return how *file_path* is synced, or None if it isn't."""
+    return _read_json(_config_path(file_path), {}) or None
+
+
+def _read_new(config: dict) -> list[tuple[str, int, dict]]:
+    """Return ``(device, offset, entry)`` for every entry not merged yet."""
+    entries = []
+    cursors = config["cursors"]
+    for log in sorted(Path(config["directory"]).glob(f"*{LOG_SUFFIX}")):
+        device = log.name.removesuffix(LOG_SUFFIX)
+        offset = cursors.get(device, 0)
+        with log.open("rb") as handle:
+            handle.seek(offset)
+            data = handle.read()
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                # Still being written, or not fully synced yet.
+                break
+            try:
+                entries.append((device, offset, json.loads(line)))
+            except ValueError:
+                # A whole line that is not an entry can't become one later.
+                pass
+            offset += len(line)
+        cursors[device] = offset
+    return entries
+
+
+class _Merge:
+    """Applies log entries to a loaded list, updating the merge state."""
+
+    def __init__(self, reading_list: ReadingList, state: dict, cleared: dict) -> None:
+        self.reading_list = reading_list
+        self.origins: dict[str, list] = state["origins"]
+        self.removed: set[str] = set(state["removed"])
+        self.registers: dict[str, list] = state["registers"]
+        self.cleared = cleared
+
+    def _covered(self, device: str, offset: int) -> bool:
+        return offset < self.cleared.get(device, 0)
+
+    def _gone(self, link_id: str) -> bool:
+        """Whether *link_id* was removed, or cleared wherever it was added."""
+        if link_id in self.removed:
+            return True
+        origins = self.origins.get(link_id)
+        return bool(origins) and all(self._covered(*origin) for origin in origins)
+
+    def _set(self, key: str, stamp: list, change: dict) -> None:
+        register = self.registers.get(key)
+        if register is not None and register[:2] >= stamp:
+            return
+        self.registers[key] = [*stamp, change]
+        if change["op"] == "capacity":
+            self.reading_list.capacity = change["value"]
+            return
+        link = self.reading_list.get(change["id"])
+        fields = _REGISTER_FIELDS[change["op"]]
+        if link is not None and any(
+            getattr(link, field) != change[field] for field in fields
+        ):
+            self.reading_list.apply_change(change)
+
+    def _add(self, device: str, offset: int, stamp: list, link: dict) -> None:
+        link_id = link["id"]
+        # Devices that shared a list before syncing it add the same ids.
+        self.origins.setdefault(link_id, []).append([device, offset])
+        if self._gone(link_id):
+            self.reading_list.remove_link(link_id)
+            return
+        if self._covered(device, offset):
+            return
+        if self.reading_list.get(link_id) is None:
+            self.reading_list.apply_change(
+                {"op": "add", "link": {**link, "read_at": None}}
+            )
+            # Register writes merged before the add now have a link to set.
+            for op in _REGISTER_FIELDS:
+                register = self.registers.get(f"{op}:{link_id}")
+                if register is not None:
+                    self.reading_list.apply_change(register[2])
+        # The state the link was added in counts as a write to its registers.
+        for op, fields in _REGISTER_FIELDS.items():
+            if any(link.get(field) is not None for field in fields):
+                change = {"op": op, "id": link_id}
+                change.update((field, link.get(field)) for field in fields)
+                self._set(f"{op}:{link_id}", stamp, change)
+
+    def _clear(self, device: str, offset: int, seen: dict) -> None:
+        for other, position in {**seen, device: offset}.items():
+            self.cleared[other] = max(self.cleared.get(other, 0), position)
+        for link in self.reading_list.links:
+            if self._gone(link.id):
+                self.reading_list.remove_link(link.id)
+
+    def apply(self, device: str, offset: int, entry: dict) -> None:
+        change = entry["change"]
+        stamp = [entry["time"], device]
+        op = change["op"]
+        if op == "add":
+            self._add(device, offset, stamp, change["link"])
+        elif op == "remove":
+            self.removed.add(change["id"])
+            self.reading_list.remove_link(change["id"])
+        elif op == "clear":
+            self._clear(device, offset, change.get("seen", {}))
+        elif op == "capacity":
+            self._set("capacity", stamp, change)
+        elif op in _REGISTER_FIELDS:
+            self._set(f"{op}:{change['id']}", stamp, change)
+
+    def state(self) -> dict:
+        return {
+            "origins": self.origins,
+            "removed": sorted(self.removed),
+            "registers": self.registers,
+        }
+
+
+def merge(file_path: str) -> tuple[int, int]:
+    """Apply the entries other devices logged since the last merge.
+
+    This device's own new entries are read too, to learn where its links
+    were added and when its registers were written. Returns how many
+    entries were merged from other devices, and from how many devices.
+    """
+    with lock(file_path):
+        current = config(file_path)
+        if current is None:
+            raise SyncError("This list is not synced yet; pass a folder to sync.")
+        entries = _read_new(current)
+        state = _read_json(
+            _state_path(file_path), {"origins": {}, "removed": [], "registers": {}}
+        )
+        reading_list = load(file_path, store_cache=False)
+        merging = _Merge(reading_list, state, current.setdefault("cleared", {}))
+        for device, offset, entry in entries:
+            merging.apply(device, offset, entry)
+        # Merged changes are in the logs already; don't log them again.
+        save(reading_list, file_path, log=False)
+        _write_json(_state_path(file_path), merging.state())
+        _write_json(_config_path(file_path), current)
+    others = [device for device, _offset, _entry in entries]
+    others = [device for device in others if device != current["device"]]
+    return len(others), len(set(others))
@@ -0,0 +1,163 @@
+"""Per-phase timing behind ``bejw --profile`` and the ``BEJW_TRACE`` variable.
+
+Code marks its phases with ``with trace.phase("load"):``; that is a shared
+no-op context unless tracing was started for this process.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import ContextManager, Iterator
+
+TRACE_ENV = "BEJW_TRACE"
+
+_NO_TRACE = nullcontext()
+
+
+@dataclass(slots=True)
+class Phase:
+    name: str
+    depth: int
+    wall_ms: float | None = None
+    cpu_ms: float = 0.0
+    # Net change in live Python memory blocks (sys.getallocatedblocks).
+    blocks: int = 0
+    # Highest memory traced by tracemalloc while the phase ran.
+    peak_kib: int | None = None
+
+
+class _Tracer:
+    def __init__(self, json_path: Path | None, cprofile_path: Path | None) -> None:
+        self.json_path = json_path
+        self.cprofile_path = cprofile_path
+        self.phases: list[Phase] = []
+        self._depth = 0
+        self._peaks: list[int] = []
+        # Everything before tracing started: interpreter startup and imports.
+        self.phases.append(
+            Phase(
+                "startup",
+                0,
+                cpu_ms=time.process_time() * 1000,
+                blocks=sys.getallocatedblocks(),
+            )
+        )
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        # Imported here: ``trace`` is loaded by every command, traced or not.
+        import tracemalloc
+
+        tracemalloc.start()
+        self.profiler = None
+        if cprofile_path is not None:
+            import cProfile
+
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        import tracemalloc
+
+        record = Phase(name, self._depth)
+        self.phases.append(record)
+        self._peaks.append(0)
+        self._depth += 1
+        tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        blocks = sys.getallocatedblocks()
+        try:
+            yield
+        finally:
+            record.wall_ms = (time.perf_counter() - wall) * 1000
+            record.cpu_ms = (time.process_time() - cpu) * 1000
+            record.blocks = sys.getallocatedblocks() - blocks
+            self._depth -= 1
+            # Nested phases reset the peak, so carry theirs up to the parent.
+            peak = max(tracemalloc.get_traced_memory()[1], self._peaks.pop())
+            record.peak_kib = peak // 1024
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            tracemalloc.reset_peak()
+
+    def finish(self) -> None:
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.cprofile_path)
+        import tracemalloc
+
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.phases.append(
+            Phase(
+                "command",
+                0,
+                wall_ms=(time.perf_counter() - self._started) * 1000,
+                cpu_ms=(time.process_time() - self._cpu_started) * 1000,
+                blocks=sys.getallocatedblocks() - self.phases[0].blocks,
+                peak_kib=max([peak // 1024, *(p.peak_kib or 0 for p in self.phases)]),
+            )
+        )
+        if self.json_path is not None:
+            report = {"argv": sys.argv, "phases": [asdict(p) for p in self.phases]}
+            self.json_path.write_text(json.dumps(report, indent=2) + "\n")
+        else:
+            self._print()
+
+    def _print(self) -> None:
+        lines = [
+            f"{'phase':<20} {'wall ms':>9} {'cpu ms':>9} {'blocks':>9} {'peak KiB':>9}"
+        ]
+        for record in self.phases:
+            name = "  " * record.depth + record.name
+            wall = "-" if record.wall_ms is None else f"{record.wall_ms:.2f}"
+            peak = "-" if record.peak_kib is None else str(record.peak_kib)
+            lines.append(
+                f"{name:<20} {wall:>9} {record.cpu_ms:>9.2f}"
+                f" {record.blocks:>9} {peak:>9}"
+            )
+        sys.stderr.write("\n".join(lines) + "\n")
+
+
+_active: _Tracer | None = None
+
+
+def phase(name: str) -> ContextManager[None]:
+    """Time the enclosed block as *name* if tracing is on."""
+    if _active is None:
+        return _NO_TRACE
+    return _active.phase(name)
+
+
+def start(json_path: Path | None = None, cprofile_path: Path | None = None) -> None:
+    """Start tracing; the report goes to *json_path*, or stderr if it is None.
+
+    tracemalloc stays on while tracing, which slows Python code down, so
+    compare phases with each other rather than with untraced runs.
+    """
+    global _active
+    if _active is None:
+        _active = _Tracer(json_path, cprofile_path)
+
+
+def start_from_env() -> bool:
+    """Start tracing if ``BEJW_TRACE`` is set: ``1`` for stderr, else a JSON path."""
+    value = os.environ.get(TRACE_ENV, "")
+    if value in ("", "0"):
+        return False
+    start(json_path=None if value in ("1", "stderr") else Path(value))
+    return True
+
+
+def finish() -> None:
+    """Stop tracing and write the report."""
+    global _active
+    if _active is not None:
+        tracer, _active = _active, None
+        tracer.finish()
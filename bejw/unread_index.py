@@ -0,0 +1,201 @@
+"""Index of the unread links, kept in ``<file>.index`` and rewritten on save.
+
+Layout (little-endian)::
+
+    header   "BJWX", format version u16, flags u16 (``FLAG_NO_READ``),
+             capacity u32, list version u64, unread count u32,
+             hot read count u32, token length u32
+    token    JSON stat token of the snapshot and journal it describes
+    offsets  count + 1 record offsets u64, relative to the records
+    records  one ``binary_storage.pack_link`` record per unread link,
+             in unread order
+
+``read``, ``mark-read`` and ``remove`` look links up here instead of
+parsing the whole list, and decode only the records they touch, so their
+cost no longer grows with the size of the archive. The hot read count, the
+read links not archived yet, tells ``storage`` when saving through the
+index should compact the list.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .binary_storage import pack_link, unpack_link
+from .models import Link, ReadingList
+
+MAGIC = b"BJWX"
+FORMAT_VERSION = 2
+# Set when the list has no read links, so the index holds all of it.
+FLAG_NO_READ = 1
+
+_HEADER = struct.Struct("<4sHHIQIII")
+_OFFSET = struct.Struct("<Q")
+
+
+def _assemble(
+    flags: int,
+    capacity: int,
+    version: int,
+    hot_read: int,
+    token: tuple,
+    records: list,
+) -> bytes:
+    encoded_token = json.dumps(token).encode()
+    offsets = [0]
+    for record in records:
+        offsets.append(offsets[-1] + len(record))
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        flags,
+        capacity,
+        version,
+        len(records),
+        hot_read,
+        len(encoded_token),
+    )
+    offset_table = struct.pack(f"<{len(offsets)}Q", *offsets)
+    return b"".join([header, encoded_token, offset_table, *records])
+
+
+def encode(reading_list: ReadingList, token: tuple, hot_read: int) -> bytes:
+    """Return the index of *reading_list* as stored with stat *token*.
+
+    *hot_read* is how many read links its snapshot and journal hold.
+    """
+    records = [pack_link(link) for link in reading_list.unread_links()]
+    flags = 0
+    if reading_list.complete and len(records) == len(reading_list):
+        flags |= FLAG_NO_READ
+    return _assemble(
+        flags, reading_list.capacity, reading_list.version, hot_read, token, records
+    )
+
+
+class UnreadIndex:
+    """View of an index that decodes one record per lookup.
+
+    Links looked up through it can be marked as read or removed; the
+    resulting change records are applied by ``storage.update_unread``.
+    Numbers always refer to the unread numbering the index was opened with.
+    """
+
+    def __init__(self, data: bytes | mmap.mmap) -> None:
+        if len(data) < _HEADER.size:
+            raise ValueError("Truncated bejw index")
+        (
+            magic,
+            format_version,
+            flags,
+            capacity,
+            version,
+            count,
+            hot_read,
+            token_size,
+        ) = _HEADER.unpack_from(data)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError("Not a bejw index this version can read")
+        self._data = data
+        self.flags = flags
+        self.capacity = capacity
+        self.version = version
+        self.hot_read = hot_read
+        self._count = count
+        token_end = _HEADER.size + token_size
+        self.token = json.loads(bytes(data[_HEADER.size : token_end]))
+        self._offsets = token_end
+        self._records = token_end + (count + 1) * _OFFSET.size
+        if len(data) < self._records:
+            raise ValueError("Truncated bejw index")
+        # Ids of the links decoded so far, and the numbers retired by changes.
+        self._numbers: dict[str, int] = {}
+        self._retired: set[int] = set()
+        self._changes: list[dict] = []
+
+    def _offset(self, number: int) -> int:
+        (offset,) = _OFFSET.unpack_from(
+            self._data, self._offsets + (number - 1) * _OFFSET.size
+        )
+        return self._records + offset
+
+    def unread_count(self) -> int:
+        return self._count
+
+    def unread_at(self, number: int) -> Link | None:
+        """Return the unread link numbered *number* (1-based), if any."""
+        if number < 1 or number > self._count:
+            return None
+        try:
+            link = unpack_link(self._data, self._offset(number))
+        except struct.error as error:
+            raise ValueError("Truncated bejw index") from error
+        self._numbers[link.id] = number
+        return link
+
+    def unread_links(self) -> list[Link]:
+        return [self.unread_at(number) for number in range(1, self._count + 1)]
+
+    # Number specs resolve exactly as they do on a full list.
+    resolve_numbers = ReadingList.resolve_numbers
+    resolve_spec = ReadingList.resolve_spec
+
+    def _retire(self, link_id: str, change: dict) -> bool:
+        number = self._numbers.get(link_id)
+        if number is None or number in self._retired:
+            return False
+        self._retired.add(number)
+        self._changes.append(change)
+        return True
+
+    def mark_read(self, link_id: str) -> bool:
+        read_at = datetime.now(timezone.utc).isoformat()
+        return self._retire(link_id, {"op": "read", "id": link_id, "read_at": read_at})
+
+    def remove_link(self, link_id: str) -> bool:
+        return self._retire(link_id, {"op": "remove", "id": link_id})
+
+    def changes(self) -> list[dict]:
+        return list(self._changes)
+
+    def read_count(self) -> int:
+        """The hot read count, with the links marked read here."""
+        return self.hot_read + sum(
+            1 for change in self._changes if change["op"] == "read"
+        )
+
+    def encode_remaining(self, token: tuple) -> bytes:
+        """Return this index minus the retired links, stored with *token*.
+
+        The remaining records are copied without being decoded.
+        """
+        records = [
+            self._data[self._offset(number) : self._offset(number + 1)]
+            for number in range(1, self._count + 1)
+            if number not in self._retired
+        ]
+        flags = self.flags
+        if any(change["op"] == "read" for change in self._changes):
+            flags &= ~FLAG_NO_READ
+        return _assemble(
+            flags, self.capacity, self.version, self.read_count(), token, records
+        )
+
+
+def read(path: Path) -> UnreadIndex | None:
+    """Map the index at *path*; None if it is missing or unreadable."""
+    try:
+        with path.open("rb") as handle:
+            data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        # ValueError: mmap refuses empty files.
+        return None
+    try:
+        return UnreadIndex(data)
+    except (ValueError, struct.error):
+        data.close()
+        return None
@@ -0,0 +1,68 @@
+"""Canonical forms of URLs, so one article saved under several URLs is found.
+
+Two URLs are taken to be the same article when they differ only in:
+
+- http vs https, letter case of the scheme and host, a ``www.`` prefix
+  or the default port
+- a trailing slash, or an empty path
+- the fragment
+- tracking parameters such as ``utm_*``, or the order of the others
+"""
+
+from __future__ import annotations
+
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only say where a link was clicked.
+TRACKING_PARAMS = frozenset(
+    {
+        "dclid",
+        "fbclid",
+        "gclid",
+        "igshid",
+        "mc_cid",
+        "mc_eid",
+        "msclkid",
+        "ref_src",
+        "yclid",
+        "_hsenc",
+        "_hsmi",
+    }
+)
+TRACKING_PREFIXES = ("utm_",)
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _is_tracking(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonical_url(url: str) -> str:
+    """Return the canonical form of *url*; equal for the same article.
+
+    Strings that are not absolute http(s) URLs are only stripped of
+    surrounding whitespace.
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not parts.hostname:
+        return url
+    host = parts.hostname.removeprefix("www.")
+    if port is not None and port != _DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+    query = ""
+    if parts.query:
+        query = urlencode(
+            sorted(
+                (name, value)
+                for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                if not _is_tracking(name)
+            )
+        )
+    return urlunsplit(("https", host, parts.path.rstrip("/"), query, ""))
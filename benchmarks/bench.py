@@ -0,0 +1,367 @@
+"""Scaling benchmarks for models, storage, rendering and the CLI.
+
+Usage:
+    python benchmarks/bench.py [--sizes 10,1000,100000] [--output results.json]
+    python benchmarks/bench.py --compare baseline.json [--tolerance 0.25]
+
+Every size gets a synthetic list of mixed read/unread links with unicode
+titles, where every tenth record is a legacy one without ``created_at`` or
+``read_at``. Function benchmarks report the best of a few runs; CLI
+benchmarks run ``python -m bejw.main`` on a fresh copy of the file each
+time. Peak memory is measured with tracemalloc for functions and from the
+child's max RSS for CLI calls.
+
+With ``--compare``, results slower (or bigger) than the baseline by more
+than the tolerance are listed and the script exits with status 1.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bejw import storage  # noqa: E402
+from bejw.models import ReadingList  # noqa: E402
+from bejw.render import OutputFormat, render_links  # noqa: E402
+
+DEFAULT_SIZES = (10, 100, 1_000, 10_000, 100_000)
+TITLES = (
+    "Plain title",
+    "Résumé des épisodes",
+    "日本語の記事を読む",
+    "Ünïcödé ✨ sparkles",
+    "Launch notes 🚀",
+    "Статья о производительности",
+)
+READ_EVERY = 3
+LEGACY_EVERY = 10
+# Function runs repeat until this much time was spent, within these bounds.
+FUNCTION_BUDGET = 0.5
+FUNCTION_MIN_RUNS = 3
+FUNCTION_MAX_RUNS = 50
+# Rich tables take ~0.5ms per row, so they are only timed up to this size.
+TABLE_MAX_SIZE = 10_000
+
+
+def make_payload(count: int, seed: int = 0) -> dict:
+    """Return a ``links.json`` document with *count* synthetic links."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    zones = (timezone.utc, timezone(timedelta(hours=2)), timezone(timedelta(hours=-5)))
+    links = []
+    for index in range(count):
+        created = start + timedelta(seconds=index * 37 + rng.randrange(30))
+        link = {
+            "id": f"{rng.getrandbits(128):032x}",
+            "url": f"https://example.com/{index}/{rng.getrandbits(32):08x}",
+            "title": f"{TITLES[index % len(TITLES)]} #{index}",
+        }
+        if index % LEGACY_EVERY != LEGACY_EVERY - 1:
+            link["created_at"] = created.astimezone(zones[index % 3]).isoformat()
+            read = index % READ_EVERY == 0
+            link["read_at"] = (
+                (created + timedelta(days=1)).isoformat() if read else None
+            )
+        links.append(link)
+    return {"capacity": count + 10, "links": links}
+
+
+def _measure(setup: Callable[[], object], run: Callable[[object], object]) -> dict:
+    samples = []
+    deadline = time.perf_counter() + FUNCTION_BUDGET
+    while len(samples) < FUNCTION_MIN_RUNS or (
+        len(samples) < FUNCTION_MAX_RUNS and time.perf_counter() < deadline
+    ):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        samples.append(time.perf_counter() - start)
+    state = setup()
+    tracemalloc.start()
+    try:
+        run(state)
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(samples), "peak_kib": peak // 1024, "runs": len(samples)}
+
+
+def _progress(name: str, size: int, values: dict) -> None:
+    print(
+        f"{name:<20} {size:>9} {values['seconds'] * 1000:>10.2f}ms"
+        f" {values['peak_kib']:>9} KiB",
+        file=sys.stderr,
+    )
+
+
+def _render(reading_list: ReadingList, output_format: OutputFormat) -> None:
+    with contextlib.redirect_stdout(io.StringIO()):
+        render_links(reading_list, output_format=output_format, include_read=True)
+
+
+def function_benchmarks(directory: Path, size: int, payload: dict) -> dict:
+    json_path = str(directory / "links.json")
+    db_path = str(directory / "links.db")
+    binary_path = str(directory / "links.bejw")
+    text = json.dumps(payload, indent=2)
+    Path(json_path).write_text(text, encoding="utf-8")
+    storage.save(ReadingList.from_dict(payload), db_path)
+    storage.save(ReadingList.from_dict(payload), binary_path)
+
+    def scratch(source: str) -> Callable[[], str]:
+        def copy() -> str:
+            target = directory / f"scratch-{Path(source).name}"
+            shutil.copyfile(source, target)
+            Path(f"{target}{storage.JOURNAL_SUFFIX}").unlink(missing_ok=True)
+            return str(target)
+
+        return copy
+
+    def add_and_save(file_path: str) -> None:
+        reading_list = storage.load(file_path)
+        reading_list.add_link("https://example.com/new", "New")
+        storage.save(reading_list, file_path)
+
+    def cached(source: str) -> Callable[[], str]:
+        def build() -> str:
+            storage.load(source)
+            return source
+
+        return build
+
+    def loaded() -> ReadingList:
+        return ReadingList.from_dict(payload)
+
+    cases = {
+        "from_dict": (lambda: payload, ReadingList.from_dict),
+        "ordered_links": (loaded, ReadingList.ordered_links),
+        "unread_links": (loaded, ReadingList.unread_links),
+        "load_json": (
+            lambda: json_path,
+            lambda path: storage.load(path, store_cache=False),
+        ),
+        "load_json_unread": (
+            lambda: json_path,
+            lambda path: storage.load(path, include_read=False, store_cache=False),
+        ),
+        "load_json_cached": (cached(json_path), storage.load),
+        "load_binary": (lambda: binary_path, storage.load),
+        "load_sqlite": (lambda: db_path, storage.load),
+        "load_sqlite_unread": (
+            lambda: db_path,
+            lambda path: storage.load(path, include_read=False),
+        ),
+        "save_json_full": (
+            lambda: (loaded(), str(directory / "full.json")),
+            lambda state: storage.compact(*state),
+        ),
+        "save_binary_full": (
+            lambda: (loaded(), str(directory / "full.bejw")),
+            lambda state: storage.compact(*state),
+        ),
+        "save_json_journal": (scratch(json_path), add_and_save),
+        "save_sqlite_delta": (scratch(db_path), add_and_save),
+        "render_table": (loaded, lambda rl: _render(rl, OutputFormat.TABLE)),
+        "render_tsv": (loaded, lambda rl: _render(rl, OutputFormat.TSV)),
+        "render_jsonl": (loaded, lambda rl: _render(rl, OutputFormat.JSONL)),
+    }
+    if size > TABLE_MAX_SIZE:
+        del cases["render_table"]
+    results = {}
+    for name, case in cases.items():
+        results[name] = _measure(*case)
+        _progress(name, size, results[name])
+    return results
+
+
+CLI_COMMANDS = {
+    "init": ["init", "--capacity", "10"],
+    "add": ["add", "https://example.com/new", "New"],
+    "list": ["list"],
+    "list_tsv": ["list", "--format", "tsv"],
+    "list_all_jsonl": ["list", "--include-read", "--format", "jsonl"],
+    "list_limit": ["list", "--format", "tsv", "--limit", "20"],
+    "read": ["read", "1"],
+    "mark_read": ["mark-read", "1"],
+    "remove": ["remove", "1"],
+    "capacity": ["capacity"],
+    "capacity_set": ["capacity", "1000000"],
+    "clear": ["clear"],
+}
+
+
+# A child's ru_maxrss also counts this (large) process from before exec, so on
+# Linux the child reports its own high-water mark from /proc when it exits.
+_PEAK_REPORTER = """
+import atexit, os, runpy, sys
+def _report():
+    with open("/proc/self/status") as status:
+        peak = next(line.split()[1] for line in status if line.startswith("VmHWM"))
+    os.write(int(os.environ["BENCH_PEAK_FD"]), peak.encode())
+atexit.register(_report)
+sys.argv[0] = "bejw"
+runpy.run_module("bejw.main", run_name="__main__")
+"""
+
+
+def _run_cli(arguments: list[str], env: dict) -> tuple[float, int]:
+    read_end, write_end = os.pipe()
+    if Path("/proc/self/status").exists():
+        command = [sys.executable, "-c", _PEAK_REPORTER, *arguments]
+        env = {**env, "BENCH_PEAK_FD": str(write_end)}
+    else:
+        command = [sys.executable, "-m", "bejw.main", *arguments]
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        command,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        pass_fds=(write_end,),
+    )
+    _pid, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    os.close(write_end)
+    with os.fdopen(read_end, "rb") as reader:
+        reported = reader.read()
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError(f"bejw {' '.join(arguments)} failed")
+    if reported:
+        return elapsed, int(reported)
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    peak = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+    return elapsed, peak
+
+
+def cli_benchmarks(directory: Path, size: int, payload: dict, runs: int) -> dict:
+    source = directory / "cli-source.json"
+    source.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    target = directory / "cli.json"
+    # BROWSER makes `read` run a no-op command instead of a real browser.
+    env = {**os.environ, "PYTHONPATH": str(ROOT), "BROWSER": "true"}
+    commands = {
+        **CLI_COMMANDS,
+        "migrate": ["migrate", str(target), str(directory / "cli-migrated.db")],
+    }
+    if size > TABLE_MAX_SIZE:
+        del commands["list"]
+    results = {}
+    for name, arguments in commands.items():
+        samples, peaks = [], []
+        for _run in range(runs):
+            shutil.copyfile(source, target)
+            for leftover in directory.glob("cli*.journal"):
+                leftover.unlink()
+            (directory / "cli-migrated.db").unlink(missing_ok=True)
+            file_args = [] if name == "migrate" else ["--file-path", str(target)]
+            elapsed, peak = _run_cli([*arguments, *file_args], env)
+            samples.append(elapsed)
+            peaks.append(peak)
+        results[f"cli_{name}"] = {
+            "seconds": min(samples),
+            "peak_kib": max(peaks),
+            "runs": runs,
+        }
+        _progress(f"cli_{name}", size, results[f"cli_{name}"])
+    return results
+
+
+def run(sizes: list[int], cli: bool, cli_runs: int) -> dict:
+    results = []
+    for size in sizes:
+        payload = make_payload(size)
+        with tempfile.TemporaryDirectory() as name:
+            directory = Path(name)
+            measured = function_benchmarks(directory, size, payload)
+            if cli:
+                measured.update(cli_benchmarks(directory, size, payload, cli_runs))
+        for bench, values in measured.items():
+            seconds = values["seconds"]
+            throughput = size / seconds if seconds else None
+            results.append(
+                {"name": bench, "size": size, **values, "links_per_second": throughput}
+            )
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "results": results,
+    }
+
+
+def compare(
+    current: dict, baseline: dict, tolerance: float, min_delta: float
+) -> list[str]:
+    """Return a line for every result worse than *baseline* beyond *tolerance*."""
+    previous = {(item["name"], item["size"]): item for item in baseline["results"]}
+    regressions = []
+    for item in current["results"]:
+        old = previous.get((item["name"], item["size"]))
+        if old is None:
+            continue
+        for field, unit, floor in (
+            ("seconds", "s", min_delta),
+            ("peak_kib", "KiB", 64),
+        ):
+            before, after = old[field], item[field]
+            if after - before > floor and after > before * (1 + tolerance):
+                regressions.append(
+                    f"{item['name']}@{item['size']}: {field} {before:.4g}{unit}"
+                    f" -> {after:.4g}{unit} ({after / before - 1:+.0%})"
+                )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="Comma-separated list sizes, e.g. 10,1000,1000000.",
+    )
+    parser.add_argument("--output", type=Path, help="Write results as JSON here.")
+    parser.add_argument("--compare", type=Path, help="Baseline results to compare.")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument(
+        "--min-delta",
+        type=float,
+        default=0.002,
+        help="Ignore slowdowns smaller than this many seconds.",
+    )
+    parser.add_argument("--no-cli", action="store_true", help="Skip CLI benchmarks.")
+    parser.add_argument("--cli-runs", type=int, default=3)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    current = run(sizes, cli=not args.no_cli, cli_runs=args.cli_runs)
+    if args.output is not None:
+        args.output.write_text(json.dumps(current, indent=2) + "\n", encoding="utf-8")
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare(current, baseline, args.tolerance, args.min_delta)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
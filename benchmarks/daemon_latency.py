@@ -0,0 +1,105 @@
+"""Compare command latency with and without ``bejw serve``.
+
+Usage: python benchmarks/daemon_latency.py [LINKS] [RUNS]
+
+Times whole CLI invocations (``python -m bejw.main ...``) and, separately,
+the in-process cost of answering ``list`` from the file versus the daemon.
+"""
+
+from __future__ import annotations
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bejw import daemon, storage  # noqa: E402
+from bejw.models import ReadingList  # noqa: E402
+
+COMMANDS = [
+    ["list", "--format", "tsv", "--limit", "20"],
+    ["capacity"],
+    ["add", "https://example.com/new", "New"],
+    ["remove", "1"],
+]
+
+
+def _seed(file_path: str, count: int) -> None:
+    reading_list = ReadingList(capacity=count + 10)
+    reading_list.add_links(
+        (f"https://example.com/{index}", f"Link {index}") for index in range(count)
+    )
+    storage.save(reading_list, file_path)
+
+
+def _time_cli(file_path: str, runs: int) -> dict[str, float]:
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    results = {}
+    for command in COMMANDS:
+        samples = []
+        for _run in range(runs):
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable, "-m", "bejw.main", *command, "--file-path", file_path],
+                env=env,
+                stdout=subprocess.DEVNULL,
+                check=True,
+            )
+            samples.append(time.perf_counter() - start)
+        results[command[0]] = statistics.median(samples)
+    return results
+
+
+def _time_in_process(file_path: str, runs: int) -> tuple[float, float]:
+    direct, served = [], []
+    payload = {"op": "list", "offset": 0, "limit": 20}
+    for _run in range(runs):
+        start = time.perf_counter()
+        reading_list = storage.load(file_path, include_read=False)
+        [*reading_list.iter_links()][:20]
+        direct.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        daemon.request(file_path, payload)
+        served.append(time.perf_counter() - start)
+    return statistics.median(direct), statistics.median(served)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = str(Path(directory) / "links.json")
+        _seed(file_path, count)
+        direct = _time_cli(file_path, runs)
+        server = subprocess.Popen(
+            [sys.executable, "-m", "bejw.main", "serve", "--file-path", file_path],
+            env={**os.environ, "PYTHONPATH": str(ROOT)},
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            while daemon.request(file_path, {"op": "ping"}) is None:
+                time.sleep(0.05)
+            served = _time_cli(file_path, runs)
+            load_list, request_list = _time_in_process(file_path, runs)
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"{count} links, median of {runs} runs")
+    print(f"{'command':<10} {'direct':>10} {'daemon':>10}")
+    for name in direct:
+        print(f"{name:<10} {direct[name] * 1000:>8.1f}ms {served[name] * 1000:>8.1f}ms")
+    print(
+        f"list in-process: load {load_list * 1000:.2f}ms,"
+        f" daemon request {request_list * 1000:.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
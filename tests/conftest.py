@@ -0,0 +1,78 @@
+import threading
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "StubServer"
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def send(self, status: int, body: bytes = b"", **headers: str) -> None:
+        """Answer with *status*; underscores in header names become dashes."""
+        self.send_response(status)
+        headers.setdefault("Content_Type", "text/html; charset=utf-8")
+        for name, value in headers.items():
+            self.send_header(name.replace("_", "-"), value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_HEAD(self) -> None:
+        self._handle()
+
+    def do_GET(self) -> None:
+        self._handle()
+
+    def _handle(self) -> None:
+        server = self.server
+        conditional = "If-None-Match" in self.headers
+        with server.lock:
+            server.requests.append((self.command, self.path, conditional))
+            server.clients.add(self.client_address)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            server.route(self)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+class StubServer(ThreadingHTTPServer):
+    """A local server answering through *route* and recording what it saw."""
+
+    daemon_threads = True
+
+    def __init__(self, route: Callable[[StubHandler], None]) -> None:
+        self.route = route
+        self.lock = threading.Lock()
+        self.requests: list[tuple[str, str, bool]] = []
+        self.clients: set[tuple] = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        super().__init__(("127.0.0.1", 0), StubHandler)
+
+
+@pytest.fixture
+def serve():
+    """Start :class:`StubServer` instances for routes, returning ``(server, base_url)``."""
+    started: list[tuple[StubServer, threading.Thread]] = []
+
+    def _serve(route: Callable[[StubHandler], None]) -> tuple[StubServer, str]:
+        server = StubServer(route)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        started.append((server, thread))
+        return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield _serve
+    for server, thread in started:
+        server.shutdown()
+        server.server_close()
+        thread.join()
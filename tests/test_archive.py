@@ -0,0 +1,195 @@
+import json
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from bejw import archive, storage
+from bejw.main import app
+from bejw.models import ReadingList
+from bejw.storage import load, save, update
+
+runner = CliRunner()
+
+
+def _seed(file_path: str) -> None:
+    reading_list = ReadingList(capacity=10)
+    for index in range(3):
+        link = reading_list.add_link(f"https://old.com/{index}", f"Old {index}")
+        reading_list.mark_read(link.id)
+    reading_list.add_link("https://new.com/0", "New 0")
+    reading_list.add_link("https://new.com/1", "New 1")
+    save(reading_list, file_path)
+
+
+def _segments(file_path: str) -> list:
+    return json.loads(Path(file_path).read_text())["archive"]
+
+
+def _archive_dir(file_path: str) -> Path:
+    return Path(file_path + storage.ARCHIVE_SUFFIX)
+
+
+@pytest.fixture
+def compact_every_save(monkeypatch) -> None:
+    monkeypatch.setattr(storage, "JOURNAL_MAX_RECORDS", 0)
+
+
+def test_snapshot_keeps_only_unread_links(tmp_path: Path, monkeypatch) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    data = json.loads(Path(file_path).read_text())
+    assert [link["title"] for link in data["links"]] == ["New 0", "New 1"]
+    ((name, size),) = data["archive"]
+    assert (_archive_dir(file_path) / name).stat().st_size == size
+    assert len(load(file_path).read_links()) == 3
+
+    def _fail(directory, segments):
+        raise AssertionError("archive was read")
+
+    monkeypatch.setattr(archive, "read", _fail)
+    Path(file_path + storage.INDEX_SUFFIX).unlink()
+    assert load(file_path, include_read=False).unread_count() == 2
+    result = runner.invoke(app, ["list", "--format", "tsv", "--file-path", file_path])
+    assert result.exit_code == 0
+    assert len(result.output.splitlines()) == 3
+
+
+def test_mark_read_appends_to_current_segment(
+    tmp_path: Path, compact_every_save
+) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    ((name, size),) = _segments(file_path)
+    runner.invoke(app, ["mark-read", "1", "--file-path", file_path])
+    ((same_name, larger),) = _segments(file_path)
+    assert same_name == name and larger > size
+
+    result = runner.invoke(
+        app, ["list", "--include-read", "--format", "tsv", "--file-path", file_path]
+    )
+    rows = [line.split("\t") for line in result.output.splitlines()[1:]]
+    assert [row[1] for row in rows] == ["read"] * 4 + ["unread"]
+
+
+def test_interrupted_append_is_ignored_and_cut_off(
+    tmp_path: Path, compact_every_save
+) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    ((name, _size),) = _segments(file_path)
+    segment = _archive_dir(file_path) / name
+    with segment.open("ab") as handle:
+        handle.write(b"torn gzip member")
+    assert len(load(file_path).read_links()) == 3
+
+    runner.invoke(app, ["mark-read", "1", "--file-path", file_path])
+    ((_name, size),) = _segments(file_path)
+    assert segment.stat().st_size == size
+    assert len(load(file_path).read_links()) == 4
+
+
+def test_clear_drops_the_archive(tmp_path: Path, monkeypatch) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    runner.invoke(app, ["clear", "--file-path", file_path])
+    # Replayed from the journal over the archive.
+    assert load(file_path).links == []
+
+    monkeypatch.setattr(storage, "JOURNAL_MAX_RECORDS", 0)
+    update(file_path, lambda reading_list: reading_list.add_link("https://c.com", "C"))
+    assert not _archive_dir(file_path).exists()
+    assert [link.title for link in load(file_path).links] == ["C"]
+
+
+def test_full_list_changes_rewrite_the_archive(
+    tmp_path: Path, compact_every_save
+) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    ((name, _size),) = _segments(file_path)
+    reading_list = load(file_path)
+    reading_list.remove_link(reading_list.read_links()[0].id)
+    save(reading_list, file_path)
+
+    ((new_name, _size),) = _segments(file_path)
+    assert new_name != name
+    assert not (_archive_dir(file_path) / name).exists()
+    assert [link.title for link in load(file_path).read_links()] == ["Old 1", "Old 2"]
+
+
+def test_unread_only_compaction_applies_journaled_archive_changes(
+    tmp_path: Path, monkeypatch
+) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    reading_list = load(file_path)
+    reading_list.remove_link(reading_list.read_links()[0].id)
+    save(reading_list, file_path)
+
+    monkeypatch.setattr(storage, "JOURNAL_MAX_RECORDS", 0)
+    # Loads only the snapshot, which no longer holds the removed link.
+    update(file_path, lambda reading_list: reading_list.add_link("https://c.com", "C"))
+    assert not Path(file_path + storage.JOURNAL_SUFFIX).exists()
+    assert [link.title for link in load(file_path).read_links()] == ["Old 1", "Old 2"]
+
+
+def test_snapshot_without_archive_is_moved_on_next_save(
+    tmp_path: Path, monkeypatch
+) -> None:
+    monkeypatch.setattr(storage, "HOT_MAX_READ", 1)
+    file_path = str(tmp_path / "links.json")
+    reading_list = ReadingList(capacity=10)
+    for index in range(3):
+        link = reading_list.add_link(f"https://old.com/{index}", f"Old {index}")
+        reading_list.mark_read(link.id)
+    Path(file_path).write_text(json.dumps(reading_list.to_dict()))
+
+    update(file_path, lambda reading_list: reading_list.add_link("https://c.com", "C"))
+    data = json.loads(Path(file_path).read_text())
+    assert [link["title"] for link in data["links"]] == ["C"]
+    assert len(load(file_path).read_links()) == 3
+
+
+@pytest.mark.parametrize(
+    "command", [["mark-read", "1"], ["add", "https://c.com", "C", "--no-fetch"]]
+)
+def test_legacy_file_is_archived_after_the_index_exists(
+    tmp_path: Path, monkeypatch, command: list[str]
+) -> None:
+    monkeypatch.setattr(storage, "HOT_MAX_READ", 2)
+    file_path = str(tmp_path / "links.json")
+    reading_list = ReadingList(capacity=10)
+    for index in range(3):
+        link = reading_list.add_link(f"https://old.com/{index}", f"Old {index}")
+        reading_list.mark_read(link.id)
+    reading_list.add_link("https://new.com/0", "New 0")
+    Path(file_path).write_text(json.dumps(reading_list.to_dict()))
+
+    # Listing writes the index; later saves go through it.
+    runner.invoke(app, ["list", "--format", "tsv", "--file-path", file_path])
+    assert Path(file_path + storage.INDEX_SUFFIX).exists()
+    result = runner.invoke(app, [*command, "--file-path", file_path])
+    assert result.exit_code == 0
+
+    data = json.loads(Path(file_path).read_text())
+    assert all(link["read_at"] is None for link in data["links"])
+    assert _segments(file_path)
+    assert len(load(file_path).read_links()) == 3 + (command[0] == "mark-read")
+
+
+def test_checks_of_archived_links_reach_the_archive(
+    tmp_path: Path, monkeypatch
+) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    reading_list = load(file_path)
+    old = reading_list.read_links()[0]
+    reading_list.record_check(old.id, "https://old.com/moved", None)
+    save(reading_list, file_path)
+
+    monkeypatch.setattr(storage, "JOURNAL_MAX_RECORDS", 0)
+    # Compacts a list that only holds the snapshot's links.
+    update(file_path, lambda reading_list: reading_list.add_link("https://c.com", "C"))
+    assert not Path(file_path + storage.JOURNAL_SUFFIX).exists()
+    assert load(file_path).get(old.id).final_url == "https://old.com/moved"
@@ -0,0 +1,45 @@
+import importlib.util
+from pathlib import Path
+
+from bejw.models import ReadingList
+
+BENCH_PATH = Path(__file__).resolve().parent.parent / "benchmarks" / "bench.py"
+spec = importlib.util.spec_from_file_location("bench", BENCH_PATH)
+bench = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bench)
+
+
+def test_payload_mixes_read_legacy_and_unicode_links() -> None:
+    payload = bench.make_payload(100)
+    links = payload["links"]
+    assert len(links) == 100
+    assert any("created_at" not in link for link in links)
+    assert any(link.get("read_at") for link in links)
+    assert any(not link["title"].isascii() for link in links)
+    reading_list = ReadingList.from_dict(payload)
+    assert 0 < reading_list.unread_count() < 100
+
+
+def test_compare_flags_only_real_regressions() -> None:
+    def results(seconds: float, peak: int) -> dict:
+        return {
+            "results": [
+                {
+                    "name": "load_json",
+                    "size": 1000,
+                    "seconds": seconds,
+                    "peak_kib": peak,
+                }
+            ]
+        }
+
+    baseline = results(0.010, 1000)
+    assert bench.compare(results(0.011, 1100), baseline, 0.25, 0.002) == []
+    # Relatively slow but below the absolute noise floor.
+    assert bench.compare(results(0.0115, 1000), baseline, 0.1, 0.002) == []
+    regressions = bench.compare(results(0.020, 4000), baseline, 0.25, 0.002)
+    assert [line.split(":")[0] for line in regressions] == [
+        "load_json@1000",
+        "load_json@1000",
+    ]
+    assert "seconds" in regressions[0] and "peak_kib" in regressions[1]
@@ -0,0 +1,126 @@
+import json
+import struct
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from bejw import binary_storage, storage
+from bejw.main import app
+from bejw.models import Link, ReadingList
+from bejw.storage import SnapshotFormat, load, save
+
+runner = CliRunner()
+
+
+def _sample() -> ReadingList:
+    reading_list = ReadingList(
+        capacity=7,
+        links=[
+            Link(
+                "a", "https://example.com/one?q=1", "Résumé ✨", "2024-01-01T00:00:00"
+            ),
+            Link(
+                "b",
+                "https://example.com/two",
+                "日本語",
+                "2024-01-02T00:00:00+02:00",
+                "2024-01-03T00:00:00+00:00",
+            ),
+            Link(
+                "c",
+                "https://bare.example",
+                "No path",
+                "2024-01-04T00:00:00",
+                final_url="https://bare.example/home",
+                dead_at="2024-02-01T00:00:00+00:00",
+            ),
+            Link("d", "mailto:someone@example.com", "", "2024-01-05T00:00:00"),
+        ],
+    )
+    reading_list.version = 3
+    return reading_list
+
+
+def test_round_trip_keeps_every_field() -> None:
+    reading_list = _sample()
+    data = binary_storage.encode(reading_list)
+    assert data.startswith(binary_storage.MAGIC)
+    # The shared host is stored once.
+    assert data.count(b"https://example.com") == 1
+    decoded = binary_storage.decode(data)
+    assert decoded.links == reading_list.links
+    assert decoded.capacity == 7
+    assert decoded.version == 3
+
+
+def test_records_keep_checked_fields() -> None:
+    links = _sample().links
+    records = b"".join(binary_storage.pack_link(link) for link in links)
+    assert [*binary_storage.unpack_links(records)] == links
+    checked = binary_storage.pack_link(links[2])
+    assert binary_storage.unpack_link(checked, 0).final_url == (
+        "https://bare.example/home"
+    )
+
+
+def test_archive_segment_table_round_trips() -> None:
+    reading_list = _sample()
+    reading_list.archive = [("000001.gz", 120), ("000002.gz", 64)]
+    decoded = binary_storage.decode(binary_storage.encode(reading_list))
+    assert decoded.archive == reading_list.archive
+    assert binary_storage.decode(binary_storage.encode(_sample())).archive == []
+
+
+def test_unknown_format_version_is_rejected() -> None:
+    data = bytearray(binary_storage.encode(_sample()))
+    struct.pack_into("<H", data, 4, binary_storage.FORMAT_VERSION + 1)
+    with pytest.raises(ValueError, match="Unsupported"):
+        binary_storage.decode(bytes(data))
+
+
+def test_binary_suffix_selects_binary_snapshots(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.bejw")
+    save(_sample(), file_path)
+    assert binary_storage.is_binary(Path(file_path).read_bytes())
+    # The read link comes back from the archive, ahead of the unread ones.
+    assert sorted(load(file_path).links, key=lambda link: link.id) == _sample().links
+
+
+def test_journal_and_compaction_keep_binary_encoding(
+    tmp_path: Path, monkeypatch
+) -> None:
+    monkeypatch.setattr(storage, "JOURNAL_MAX_RECORDS", 2)
+    file_path = str(tmp_path / "links.bejw")
+    save(_sample(), file_path)
+    for index in range(4):
+        reading_list = load(file_path)
+        reading_list.add_link(f"https://example.com/{index}", f"Link {index}")
+        save(reading_list, file_path)
+    assert binary_storage.is_binary(Path(file_path).read_bytes())
+    assert len(load(file_path).links) == 8
+
+
+def test_convert_command_switches_encoding_in_place(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.json")
+    runner.invoke(app, ["init", "--file-path", file_path])
+    runner.invoke(app, ["add", "https://a.com/x", "A", "--file-path", file_path])
+
+    result = runner.invoke(app, ["convert", "binary", "--file-path", file_path])
+    assert result.exit_code == 0
+    assert result.output.endswith("to binary\n")
+    assert storage.snapshot_format(file_path) == SnapshotFormat.BINARY
+    assert not Path(file_path + storage.JOURNAL_SUFFIX).exists()
+    result = runner.invoke(app, ["list", "--format", "tsv", "--file-path", file_path])
+    assert result.output.splitlines()[1] == "1\tunread\tA\thttps://a.com/x"
+
+    runner.invoke(app, ["convert", "json", "--file-path", file_path])
+    data = json.loads(Path(file_path).read_text())
+    assert [link["url"] for link in data["links"]] == ["https://a.com/x"]
+
+
+def test_convert_refuses_sqlite(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.db")
+    runner.invoke(app, ["init", "--file-path", file_path])
+    result = runner.invoke(app, ["convert", "binary", "--file-path", file_path])
+    assert result.exit_code == 1
@@ -0,0 +1,133 @@
+import socket
+import time
+from functools import partial
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from bejw.check import CheckResult, Status, check_links
+from bejw.main import app
+from bejw.models import ReadingList
+from bejw.storage import load, save
+
+runner = CliRunner()
+
+
+def _route(handler) -> None:
+    send = partial(handler.send, body=b"<title>Page</title>")
+    if handler.path == "/ok":
+        if handler.headers.get("If-None-Match") == '"v1"':
+            send(304)
+        else:
+            send(200, ETag='"v1"')
+    elif handler.path == "/old":
+        send(301, Location="/new")
+    elif handler.path == "/new":
+        send(200)
+    elif handler.path == "/no-head":
+        send(405 if handler.command == "HEAD" else 200)
+    elif handler.path == "/busy":
+        send(503)
+    elif handler.path.startswith("/slow/"):
+        time.sleep(0.1)
+        send(200)
+    else:
+        send(404)
+
+
+@pytest.fixture
+def server(serve):
+    return serve(_route)
+
+
+def _closed_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def test_links_are_classified(server, monkeypatch) -> None:
+    server, base = server
+    refused = f"http://127.0.0.1:{_closed_port()}/"
+    getaddrinfo = socket.getaddrinfo
+
+    def _resolve(host, *args, **kwargs):
+        if host == "missing.example":
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        if host == "flaky.example":
+            raise socket.gaierror(socket.EAI_AGAIN, "Temporary failure")
+        return getaddrinfo(host, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", _resolve)
+    missing, flaky = "http://missing.example/", "http://flaky.example/"
+    urls = [f"{base}/ok", f"{base}/old", f"{base}/gone", f"{base}/no-head"]
+    results = check_links([*urls, f"{base}/busy", refused, missing, flaky])
+    assert results[f"{base}/ok"] == CheckResult(f"{base}/ok", Status.OK)
+    assert results[f"{base}/old"] == CheckResult(
+        f"{base}/old", Status.OK, f"{base}/new"
+    )
+    assert results[f"{base}/gone"].status == Status.DEAD
+    assert results[f"{base}/gone"].detail == "HTTP 404"
+    assert results[f"{base}/no-head"].status == Status.OK
+    assert results[f"{base}/busy"] == CheckResult(
+        f"{base}/busy", Status.FAILED, detail="HTTP 503"
+    )
+    assert results[refused].status == Status.FAILED
+    assert results[missing].status == Status.DEAD
+    assert results[flaky].status == Status.FAILED
+    methods = [method for method, path, _ in server.requests if path == "/no-head"]
+    assert methods == ["HEAD", "GET"]
+    assert ("GET", "/ok", False) not in server.requests
+
+
+def test_results_are_reused_within_ttl_then_revalidated(server, tmp_path: Path) -> None:
+    server, base = server
+    first = check_links([f"{base}/ok", f"{base}/busy"], tmp_path)
+    server.requests.clear()
+    assert check_links([f"{base}/ok"], tmp_path) == {f"{base}/ok": first[f"{base}/ok"]}
+    assert server.requests == []
+
+    check_links([f"{base}/ok", f"{base}/busy"], tmp_path, ttl=0)
+    # The fresh result was cached; the failure was not.
+    assert sorted(server.requests) == [
+        ("GET", "/busy", False),
+        ("HEAD", "/busy", False),
+        ("HEAD", "/ok", True),
+    ]
+
+
+def test_requests_to_one_host_are_limited(server) -> None:
+    server, base = server
+    check_links([f"{base}/slow/{index}" for index in range(6)], host_interval=0)
+    assert server.max_in_flight == 2
+
+
+def test_cli_check_reports_and_records(server, tmp_path: Path) -> None:
+    server, base = server
+    file_path = str(tmp_path / "links.json")
+    reading_list = ReadingList(capacity=10)
+    for path in ["/ok", "/old", "/gone"]:
+        reading_list.add_link(f"{base}{path}", path)
+    save(reading_list, file_path)
+
+    result = runner.invoke(app, ["check", "--mark-dead", "--file-path", file_path])
+    assert result.output.splitlines() == [
+        f"#2 moved to {base}/new: {base}/old",
+        f"#3 dead (HTTP 404): {base}/gone",
+        "Checked 3 links: 1 ok, 1 moved, 1 dead, 0 failed.",
+    ]
+    links = load(file_path).links
+    assert [link.final_url for link in links] == [None, f"{base}/new", None]
+    assert [link.dead_at is not None for link in links] == [False, False, True]
+    result = runner.invoke(app, ["list", "--format", "tsv", "--file-path", file_path])
+    assert [row.split("\t")[1] for row in result.output.splitlines()[1:]] == [
+        "unread",
+        "unread",
+        "dead",
+    ]
+
+    result = runner.invoke(app, ["check", "1", "--file-path", file_path])
+    assert result.output == "Checked 1 links: 1 ok, 0 moved, 0 dead, 0 failed.\n"
+    result = runner.invoke(app, ["check", "4", "--file-path", file_path])
+    assert result.exit_code == 1
@@ -0,0 +1,160 @@
+import webbrowser
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from bejw.main import app
+from bejw.models import Link, ReadingList
+from bejw.storage import load, save
+
+
+runner = CliRunner()
+
+
+def _seed_reading_list(file_path: Path, count: int = 5, capacity: int = 10) -> None:
+    reading_list = ReadingList(
+        capacity=capacity,
+        links=[
+            Link(
+                id=f"id-{index}",
+                title=f"Example {index}",
+                url=f"https://example.com/{index}",
+                created_at=f"2024-01-0{index}T00:00:00+00:00",
+            )
+            for index in range(1, count + 1)
+        ],
+    )
+    save(reading_list, str(file_path))
+
+
+def test_mark_read_spec_uses_one_numbering_snapshot(tmp_path: Path) -> None:
+    file_path = tmp_path / "links.json"
+    _seed_reading_list(file_path)
+
+    result = runner.invoke(app, ["mark-read", "1-2,4-", "--file-path", str(file_path)])
+
+    assert result.exit_code == 0
+    assert result.stdout == "Marked #1, #2, #4, #5 as read.\n"
+    updated = load(str(file_path))
+    assert [link.id for link in updated.unread_links()] == ["id-3"]
+
+
+def test_remove_spec_removes_every_listed_link(tmp_path: Path) -> None:
+    file_path = tmp_path / "links.json"
+    _seed_reading_list(file_path)
+
+    result = runner.invoke(app, ["remove", "2,4", "--file-path", str(file_path)])
+
+    assert result.exit_code == 0
+    updated = load(str(file_path))
+    assert [link.id for link in updated.unread_links()] == ["id-1", "id-3", "id-5"]
+
+
+def test_spec_with_missing_number_changes_nothing(tmp_path: Path) -> None:
+    file_path = tmp_path / "links.json"
+    _seed_reading_list(file_path)
+
+    result = runner.invoke(app, ["remove", "1,9", "--file-path", str(file_path)])
+
+    assert result.exit_code == 1
+    assert result.stdout == "No link found with that number.\n"
+    assert len(load(str(file_path)).unread_links()) == 5
+
+
+def test_huge_range_is_reported_missing(tmp_path: Path) -> None:
+    file_path = tmp_path / "links.json"
+    _seed_reading_list(file_path, count=0)
+
+    result = runner.invoke(
+        app, ["read", "1-99999999999", "--file-path", str(file_path)]
+    )
+
+    assert result.exit_code == 1
+    assert result.stdout == "No link found with that number.\n"
+
+
+def test_invalid_spec_is_reported(tmp_path: Path) -> None:
+    file_path = tmp_path / "links.json"
+    _seed_reading_list(file_path)
+
+    result = runner.invoke(app, ["mark-read", "3-1", "--file-path", str(file_path)])
+
+    assert result.exit_code == 1
+    assert result.stdout == "Invalid number spec: 3-1\n"
+
+
+def test_out_of_range_capacity_is_refused(tmp_path: Path) -> None:
+    file_path = tmp_path / "links.json"
+    _seed_reading_list(file_path)
+
+    for value in ["-1", "5000000000"]:
+        result = runner.invoke(
+            app, ["capacity", "--file-path", str(file_path), "--", value]
+        )
+        assert result.exit_code == 2
+    assert load(str(file_path)).capacity == 10
+
+
+def test_add_from_reports_malformed_jsonl_lines(tmp_path: Path) -> None:
+    file_path = tmp_path / "links.json"
+    _seed_reading_list(file_path, count=1)
+    source = tmp_path / "links.jsonl"
+
+    for line, reason in [('{"url": "https://a.com"', "invalid JSON"), ("{}", "no url")]:
+        source.write_text(f"https://new.com/a\tA\n{line}\n")
+        result = runner.invoke(
+            app,
+            ["add", "--from", str(source), "--no-fetch", "--file-path", str(file_path)],
+        )
+        assert result.exit_code == 1
+        assert result.stdout == f"Invalid line 2 of {source}: {reason}\n"
+    assert len(load(str(file_path)).links) == 1
+
+
+def test_read_spec_opens_each_link(tmp_path: Path, monkeypatch) -> None:
+    file_path = tmp_path / "links.json"
+    _seed_reading_list(file_path, count=3)
+    opened: list[str] = []
+    monkeypatch.setattr(webbrowser, "open", lambda url, *_a, **_k: opened.append(url))
+
+    result = runner.invoke(app, ["read", "2-", "--file-path", str(file_path)])
+
+    assert result.exit_code == 0
+    assert opened == ["https://example.com/2", "https://example.com/3"]
+
+
+def test_add_from_stdin_accepts_tsv_and_jsonl(tmp_path: Path) -> None:
+    file_path = tmp_path / "links.json"
+    _seed_reading_list(file_path, count=1)
+    lines = (
+        "https://new.com/a\tTitle A\n"
+        '{"url": "https://new.com/b", "title": "Title B"}\n'
+        "\n"
+        "https://new.com/c\n"
+    )
+
+    result = runner.invoke(
+        app,
+        ["add", "--from", "-", "--no-fetch", "--file-path", str(file_path)],
+        input=lines,
+    )
+
+    assert result.exit_code == 0
+    assert result.stdout == "Added 3 links.\n"
+    titles = [link.title for link in load(str(file_path)).unread_links()]
+    assert titles == ["Example 1", "Title A", "Title B", "https://new.com/c"]
+
+
+def test_add_from_file_fails_without_room(tmp_path: Path) -> None:
+    file_path = tmp_path / "links.json"
+    _seed_reading_list(file_path, count=2, capacity=3)
+    source = tmp_path / "new.tsv"
+    source.write_text("https://a.com\tA\nhttps://b.com\tB\n", encoding="utf-8")
+
+    result = runner.invoke(
+        app, ["add", "--from", str(source), "--file-path", str(file_path)]
+    )
+
+    assert result.exit_code == 1
+    assert result.stdout == "Not enough room: 2 links, 1 free slots.\n"
+    assert len(load(str(file_path)).links) == 2
@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _imported_modules(args: list[str], cwd: Path) -> set[str]:
+    """Run the CLI under ``-X importtime`` and collect every imported module."""
+    env = {**os.environ, "PYTHONPATH": str(REPO_ROOT)}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "bejw.main", *args],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {
+        line.rsplit("|", 1)[1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:") and "|" in line
+    }
+
+
+def test_machine_formats_and_mutations_do_not_import_rich(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.json")
+
+    commands = [
+        ["add", "https://example.com", "Example", "--file-path", file_path],
+        ["list", "--format", "tsv", "--file-path", file_path],
+        ["list", "--format", "jsonl", "--file-path", file_path],
+        ["mark-read", "1", "--file-path", file_path],
+    ]
+    for args in commands:
+        modules = _imported_modules(args, tmp_path)
+        assert "bejw.models" in modules
+        assert not {module for module in modules if module.startswith("rich")}
+        assert "bejw.importers" not in modules
+        assert "tracemalloc" not in modules
+
+
+def test_table_output_imports_rich(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.json")
+
+    modules = _imported_modules(["list", "--file-path", file_path], tmp_path)
+
+    assert "rich.table" in modules
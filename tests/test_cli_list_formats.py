@@ -114,3 +114,85 @@ def test_list_table_color_always_emits_ansi_codes(tmp_path: Path) -> None:
     assert result.exit_code == 0
     assert "Bejeweled Reading List" in result.stdout
     assert "\x1b[" in result.stdout
+
+
+def test_list_limit_offset_and_reverse_keep_numbering(tmp_path: Path) -> None:
+    file_path = tmp_path / "links.json"
+    reading_list = ReadingList(
+        capacity=10,
+        links=[
+            Link(
+                id=f"id-{index}",
+                title=f"Example {index}",
+                url=f"https://example.com/{index}",
+                created_at=f"2024-01-0{index}T00:00:00+00:00",
+            )
+            for index in range(1, 6)
+        ],
+    )
+    save(reading_list, str(file_path))
+
+    sliced = runner.invoke(
+        app,
+        [
+            "list",
+            "--file-path",
+            str(file_path),
+            "--format",
+            "csv",
+            "--no-header",
+            "--offset",
+            "1",
+            "--limit",
+            "2",
+        ],
+    )
+    reversed_result = runner.invoke(
+        app,
+        [
+            "list",
+            "--file-path",
+            str(file_path),
+            "--format",
+            "csv",
+            "--no-header",
+            "--reverse",
+            "--limit",
+            "2",
+        ],
+    )
+
+    assert sliced.exit_code == 0
+    assert sliced.stdout == (
+        "2,unread,Example 2,https://example.com/2\n"
+        "3,unread,Example 3,https://example.com/3\n"
+    )
+    assert reversed_result.exit_code == 0
+    assert reversed_result.stdout == (
+        "5,unread,Example 5,https://example.com/5\n"
+        "4,unread,Example 4,https://example.com/4\n"
+    )
+
+
+def test_list_include_read_reverse_interleaves_partitions(tmp_path: Path) -> None:
+    file_path = tmp_path / "links.json"
+    _seed_reading_list(file_path)
+
+    result = runner.invoke(
+        app,
+        [
+            "list",
+            "--file-path",
+            str(file_path),
+            "--format",
+            "jsonl",
+            "--include-read",
+            "--reverse",
+        ],
+    )
+
+    assert result.exit_code == 0
+    assert [line[:13] for line in result.stdout.splitlines()] == [
+        '{"number": 2,',
+        '{"number": 1,',
+    ]
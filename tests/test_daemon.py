@@ -0,0 +1,186 @@
+import json
+import socket
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from bejw import daemon, storage
+from bejw.main import app
+from bejw.storage import load
+
+runner = CliRunner()
+
+
+@pytest.fixture
+def served(tmp_path: Path):
+    file_path = str(tmp_path / "links.json")
+    result = runner.invoke(app, ["init", "--capacity", "3", "--file-path", file_path])
+    assert result.exit_code == 0
+    server = daemon.make_server(file_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield file_path, server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def _invoke(*args: str):
+    return runner.invoke(app, [*args])
+
+
+def test_commands_go_through_daemon_and_persist(served, monkeypatch) -> None:
+    file_path, server = served
+    opened = []
+    monkeypatch.setattr("webbrowser.open", opened.append)
+
+    assert _invoke("add", "https://a.com", "A", "--file-path", file_path).output == (
+        "Added #1\n"
+    )
+    _invoke("add", "https://b.com", "B", "--file-path", file_path)
+    result = _invoke("add", "http://b.com/", "B", "--file-path", file_path)
+    assert result.output == "Already saved as #2\n"
+    result = _invoke("list", "--format", "tsv", "--file-path", file_path)
+    assert result.output.splitlines()[1:] == [
+        "1\tunread\tA\thttps://a.com",
+        "2\tunread\tB\thttps://b.com",
+    ]
+    assert server.daemon.reading_list is not None
+
+    result = _invoke("read", "2", "--file-path", file_path)
+    assert result.output == "Opened #2: https://b.com\n"
+    assert opened == ["https://b.com"]
+
+    result = _invoke("mark-read", "1", "--file-path", file_path)
+    assert result.output == "Marked #1 as read.\n"
+    _invoke("remove", "1", "--file-path", file_path)
+    assert _invoke("capacity", "5", "--file-path", file_path).exit_code == 0
+    assert _invoke("capacity", "--file-path", file_path).output == "5\n"
+
+    reading_list = load(file_path)
+    assert reading_list.capacity == 5
+    assert [link.title for link in reading_list.links] == ["A"]
+    assert reading_list.links[0].read_at is not None
+
+
+def test_daemon_errors_match_direct_access(served) -> None:
+    file_path, _server = served
+    result = _invoke("remove", "1", "--file-path", file_path)
+    assert result.exit_code == 1
+    assert result.output == "No link found with that number.\n"
+    result = _invoke("mark-read", "x", "--file-path", file_path)
+    assert result.exit_code == 1
+    assert result.output == "Invalid number spec: x\n"
+
+
+def test_daemon_sees_direct_writes(served) -> None:
+    file_path, _server = served
+    _invoke("add", "https://a.com", "A", "--file-path", file_path)
+    # ``clear`` writes the file directly; the daemon must not serve a stale copy.
+    _invoke("clear", "--file-path", file_path)
+    result = _invoke("list", "--format", "jsonl", "--file-path", file_path)
+    assert result.output == ""
+
+
+def test_full_list_falls_back_to_replace_prompt(served) -> None:
+    file_path, _server = served
+    for index in range(3):
+        _invoke("add", f"https://{index}.com", f"L{index}", "--file-path", file_path)
+    result = runner.invoke(
+        app, ["add", "https://new.com", "New", "--file-path", file_path], input="2\n"
+    )
+    assert result.exit_code == 0
+    titles = [link.title for link in load(file_path).unread_links()]
+    assert titles == ["L0", "L2", "New"]
+
+
+def test_stale_socket_falls_back_to_file(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.json")
+    daemon.socket_path(file_path).parent.mkdir(parents=True, exist_ok=True)
+    daemon.socket_path(file_path).touch()
+    result = _invoke("add", "https://a.com", "A", "--file-path", file_path)
+    assert result.exit_code == 0
+    assert [link.url for link in load(file_path).links] == ["https://a.com"]
+
+
+@pytest.mark.parametrize("response", [b"", b'{"links": [', None])
+def test_dead_or_stalled_daemon_falls_back_only_for_reads(
+    tmp_path: Path, monkeypatch, response: bytes | None
+) -> None:
+    file_path = str(tmp_path / "links.json")
+    _invoke("add", "https://a.com", "A", "--file-path", file_path)
+    path = daemon.socket_path(file_path)
+    monkeypatch.setattr(daemon, "CLIENT_TIMEOUT", 0.2)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(path))
+    listener.listen()
+
+    def _answer() -> None:
+        for _request in range(2):
+            connection, _address = listener.accept()
+            with connection:
+                connection.recv(4096)
+                if response is None:
+                    time.sleep(0.5)
+                else:
+                    connection.sendall(response)
+
+    thread = threading.Thread(target=_answer, daemon=True)
+    thread.start()
+    try:
+        listed = _invoke("list", "--format", "tsv", "--file-path", file_path)
+        removed = _invoke("remove", "1", "--file-path", file_path)
+    finally:
+        thread.join()
+        listener.close()
+    assert listed.exit_code == 0
+    assert listed.output.splitlines()[1:] == ["1\tunread\tA\thttps://a.com"]
+    assert removed.exit_code == 1
+    assert "did not reply" in removed.stderr
+    assert [link.url for link in load(file_path).links] == ["https://a.com"]
+
+
+def test_slow_daemon_changes_are_not_applied_twice(served, monkeypatch) -> None:
+    file_path, _server = served
+    for url in ["https://a.com", "https://b.com"]:
+        _invoke("add", url, url, "--file-path", file_path)
+    monkeypatch.setattr(daemon, "CLIENT_TIMEOUT", 0.2)
+    with storage.lock(file_path):
+        result = _invoke("remove", "1", "--file-path", file_path)
+    assert result.exit_code == 1
+    # The daemon removes #1 once the lock is free, and nothing else does.
+    deadline = time.monotonic() + 5
+    while len(load(file_path).links) == 2 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    time.sleep(0.1)
+    assert [link.url for link in load(file_path).links] == ["https://b.com"]
+
+
+def test_protocol_is_line_delimited_json(served) -> None:
+    file_path, _server = served
+    assert daemon.request(file_path, {"op": "ping"}) == {}
+    assert daemon.request(file_path, {"op": "nope"}) == {"error": "unknown-op"}
+    response = daemon.request(file_path, {"op": "list"})
+    assert json.loads(json.dumps(response)) == {
+        "capacity": 3,
+        "unread_count": 0,
+        "links": [],
+    }
+
+
+def test_titles_that_are_not_utf8_pass_through(served) -> None:
+    file_path, _server = served
+    title = b"caf\xe9".decode("utf-8", "surrogateescape")
+    add = {"op": "add", "url": "https://a.com", "title": title}
+    assert daemon.request(file_path, add)["number"] == 1
+    response = daemon.request(file_path, {"op": "list"})
+    assert response["links"][0][1]["title"] == title
+
+
+def test_second_daemon_refuses_to_start(served) -> None:
+    file_path, _server = served
+    with pytest.raises(OSError):
+        daemon.make_server(file_path)
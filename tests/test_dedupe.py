@@ -0,0 +1,131 @@
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from bejw.main import app
+from bejw.models import CapacityError, OnDuplicate, ReadingList
+from bejw.storage import load, save
+from bejw.urls import canonical_url
+
+runner = CliRunner()
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "http://example.com/post",
+        "https://www.example.com/post/",
+        "HTTPS://Example.COM:443/post#comments",
+        "https://example.com/post?utm_source=feed&utm_medium=rss",
+        "https://example.com/post?fbclid=abc",
+    ],
+)
+def test_canonical_url_ignores_cosmetic_differences(url: str) -> None:
+    assert canonical_url(url) == "https://example.com/post"
+
+
+def test_canonical_url_keeps_what_names_the_page() -> None:
+    assert canonical_url("https://example.com/post?b=2&a=1") == canonical_url(
+        "https://example.com/post?a=1&b=2&utm_campaign=x"
+    )
+    assert canonical_url("https://example.com/post?id=1") != canonical_url(
+        "https://example.com/post?id=2"
+    )
+    assert canonical_url("https://example.com:8080/") != canonical_url(
+        "https://example.com/"
+    )
+    assert canonical_url(" not a url ") == "not a url"
+
+
+def test_url_index_follows_every_mutation() -> None:
+    reading_list = ReadingList(capacity=10)
+    first = reading_list.add_link("https://a.com/1", "A")
+    assert reading_list.duplicate_of("http://a.com/1/") == first
+
+    reading_list.mark_read(first.id)
+    assert reading_list.duplicate_of("https://a.com/1") is None
+    second = reading_list.add_link("https://a.com/1", "A again")
+    assert reading_list.duplicate_of("https://a.com/1") == second
+
+    reading_list.remove_link(second.id)
+    assert reading_list.duplicate_of("https://a.com/1") is None
+    reading_list.add_link("https://b.com", "B")
+    reading_list.clear_links()
+    assert reading_list.duplicate_of("https://b.com") is None
+
+
+def test_add_link_policies() -> None:
+    reading_list = ReadingList(capacity=1)
+    first = reading_list.add_link("https://a.com", "A")
+    # Skipping and refreshing need no free slot.
+    assert reading_list.add_link("https://a.com/", "A2", OnDuplicate.SKIP) is first
+    refreshed = reading_list.add_link("https://a.com/", "A2", OnDuplicate.REFRESH)
+    assert [link.title for link in reading_list.links] == ["A2"]
+    assert refreshed.id != first.id
+    with pytest.raises(CapacityError):
+        reading_list.add_link("https://a.com", "A3", OnDuplicate.ADD)
+
+
+def test_add_links_counts_only_new_links_against_capacity() -> None:
+    reading_list = ReadingList(capacity=2)
+    reading_list.add_link("https://a.com", "A")
+    items = [("https://a.com", "A"), ("https://b.com", "B"), ("http://b.com/", "B")]
+    added = reading_list.add_links(items, OnDuplicate.SKIP)
+    assert [link.title for link in added] == ["B"]
+    assert reading_list.unread_count() == 2
+
+    added = reading_list.add_links(
+        [("https://b.com", "B2"), ("https://b.com", "B3")], OnDuplicate.REFRESH
+    )
+    assert [link.title for link in added] == ["B3"]
+    assert [link.title for link in reading_list.unread_links()] == ["A", "B3"]
+
+
+def test_cli_add_skips_duplicates_by_default(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.json")
+    runner.invoke(app, ["add", "https://a.com/x", "A", "--file-path", file_path])
+    runner.invoke(app, ["add", "https://b.com", "B", "--file-path", file_path])
+
+    result = runner.invoke(
+        app, ["add", "http://a.com/x?utm_source=rss", "A", "--file-path", file_path]
+    )
+    assert result.output == "Already saved as #1\n"
+    result = runner.invoke(
+        app,
+        ["add", "https://a.com/x", "A!", "--on-duplicate", "refresh"]
+        + ["--file-path", file_path],
+    )
+    assert result.output == "Refreshed #2\n"
+    assert [link.title for link in load(file_path).unread_links()] == ["B", "A!"]
+
+    lines = "https://b.com\tB\nhttps://c.com\tC\n"
+    result = runner.invoke(
+        app, ["add", "--from", "-", "--file-path", file_path], input=lines
+    )
+    assert result.output == "Added 1 links, skipped 1 duplicates.\n"
+
+
+def test_dedupe_removes_later_copies(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.json")
+    reading_list = ReadingList(capacity=10)
+    old = reading_list.add_link("https://a.com/x", "Read A")
+    reading_list.mark_read(old.id)
+    for url in ["https://a.com/x", "https://b.com", "https://a.com/x/", "http://b.com"]:
+        reading_list.add_link(url, url)
+    save(reading_list, file_path)
+
+    result = runner.invoke(app, ["dedupe", "--file-path", file_path])
+    assert result.output == "Removed 2 duplicates.\n"
+    assert [link.url for link in load(file_path).links] == [
+        "https://a.com/x",
+        "https://a.com/x",
+        "https://b.com",
+    ]
+
+    result = runner.invoke(app, ["dedupe", "--include-read", "--file-path", file_path])
+    assert result.output == "Removed 1 duplicates.\n"
+    assert [link.title for link in load(file_path).links] == [
+        "https://a.com/x",
+        "https://b.com",
+    ]
@@ -0,0 +1,132 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from bejw.fetch import PageInfo, ResponseCache, fetch_pages, parse_head
+from bejw.main import app
+from bejw.storage import load
+
+runner = CliRunner()
+
+DELAY = 0.3
+
+
+def _route(handler) -> None:
+    path = handler.path.partition("?")[0]
+    if path.startswith("/slow/"):
+        time.sleep(DELAY)
+        handler.send(200, f"<title>Slow {path[6:]}</title>".encode())
+    elif path == "/cached":
+        if handler.headers.get("If-None-Match") == '"v1"':
+            handler.send(304, ETag='"v1"')
+        else:
+            handler.send(200, b"<title>Cached</title>", ETag='"v1"')
+    elif path == "/moved":
+        handler.send(301, Location="/article")
+    elif path == "/article":
+        body = (
+            b"<html><head><title>\n  An &amp; Article </title>"
+            b'<link rel="canonical" href="/article/canonical"></head></html>'
+        )
+        handler.send(200, body)
+    elif path == "/paper.pdf":
+        handler.send(200, b"%PDF-1.7" * 100, Content_Type="application/pdf")
+    else:
+        handler.send(404, b"<title>Not Found</title>")
+
+
+@pytest.fixture
+def server(serve):
+    return serve(_route)
+
+
+def test_parse_head_prefers_title_and_resolves_canonical() -> None:
+    html = (
+        '<meta property="og:title" content="OG">'
+        '<title>Real <b>title</b></title><link rel="Canonical" href="../b">'
+    )
+    assert parse_head(html, "https://a.com/x/y") == ("Real title", "https://a.com/b")
+    assert parse_head('<meta property="og:title" content="OG">', "https://a.com") == (
+        "OG",
+        None,
+    )
+    assert (
+        parse_head('<link rel="canonical" href="javascript:x">', "https://a.com")[1]
+        is None
+    )
+
+
+def test_pages_are_fetched_concurrently(server) -> None:
+    server, base = server
+    urls = [f"{base}/slow/{index}" for index in range(12)]
+    started = time.perf_counter()
+    pages = fetch_pages(urls)
+    elapsed = time.perf_counter() - started
+    assert [pages[url].title for url in urls] == [
+        f"Slow {index}" for index in range(12)
+    ]
+    assert server.max_in_flight > 1
+    assert elapsed < len(urls) * DELAY / 2
+
+
+def test_connections_are_kept_alive(server) -> None:
+    server, base = server
+    fetch_pages([f"{base}/slow/{index}" for index in range(3)], concurrency=1)
+    assert len(server.clients) == 1
+
+
+def test_redirects_canonical_urls_and_errors(server) -> None:
+    server, base = server
+    pages = fetch_pages(
+        [f"{base}/moved", f"{base}/paper.pdf", f"{base}/missing", "ftp://a.com"]
+    )
+    assert pages[f"{base}/moved"] == PageInfo(
+        f"{base}/moved", "An & Article", f"{base}/article/canonical", 109
+    )
+    assert pages[f"{base}/paper.pdf"] == PageInfo(
+        f"{base}/paper.pdf", content_length=800
+    )
+    assert pages[f"{base}/missing"].error == "HTTP 404"
+    assert pages["ftp://a.com"].error is not None
+
+
+def test_cache_is_revalidated_with_etag(server, tmp_path: Path) -> None:
+    server, base = server
+    first = fetch_pages([f"{base}/cached"], tmp_path)
+    second = fetch_pages([f"{base}/cached"], tmp_path)
+    assert first == second
+    assert second[f"{base}/cached"].title == "Cached"
+    assert server.requests == [("GET", "/cached", False), ("GET", "/cached", True)]
+
+
+def test_cache_keeps_the_most_recently_used_entries(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path)
+    for index, url in enumerate(["a", "b", "c"]):
+        cache.put(url, {"url": url})
+        os.utime(cache._path(url), (index, index))
+    assert cache.get("a") == {"url": "a"}
+
+    cache.prune(max_entries=2)
+    assert [url for url in "abc" if cache.get(url)] == ["a", "c"]
+
+
+def test_cli_add_without_title_fetches_it(server, tmp_path: Path) -> None:
+    server, base = server
+    file_path = str(tmp_path / "links.json")
+    result = runner.invoke(app, ["add", f"{base}/moved", "--file-path", file_path])
+    assert result.output == "Added #1\n"
+    lines = f"{base}/slow/1\n{base}/missing\n{base}/paper.pdf\tPaper\n"
+    result = runner.invoke(
+        app, ["add", "--from", "-", "--file-path", file_path], input=lines
+    )
+    assert result.stdout == "Added 3 links.\n"
+    assert [(link.url, link.title) for link in load(file_path).links] == [
+        (f"{base}/article/canonical", "An & Article"),
+        (f"{base}/slow/1", "Slow 1"),
+        (f"{base}/missing", f"{base}/missing"),
+        (f"{base}/paper.pdf", "Paper"),
+    ]
+    assert result.stderr == f"Could not fetch {base}/missing: HTTP 404\n"
@@ -0,0 +1,196 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from bejw import importers
+from bejw.importers import ImportFormat, read_links
+from bejw.main import app
+from bejw.storage import load
+
+runner = CliRunner()
+
+BOOKMARKS_HTML = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks Menu</H1>
+<DL><p>
+    <DT><H3 ADD_DATE="1600000000">Reading</H3>
+    <DL><p>
+        <DT><A HREF="https://one.com/" ADD_DATE="1600000001">One &amp; only</A>
+        <DT><A HREF="place:sort=8&maxResults=10">Recent tags</A>
+        <DT><A HREF="https://two.com/">Two</A>
+    </DL><p>
+</DL>
+"""
+
+POCKET_HTML = """<!DOCTYPE html>
+<html><body>
+<h1>Unread</h1>
+<ul><li><a href="https://unread.com" time_added="1600000000" tags="">Unread</a></li></ul>
+<h1>Read Archive</h1>
+<ul><li><a href="https://archived.com" time_added="1500000000" tags="">Old</a></li></ul>
+</body></html>
+"""
+
+CHROME_JSON = {
+    "checksum": "abc",
+    "roots": {
+        "bookmark_bar": {
+            "children": [
+                {
+                    "date_added": "13240000000000000",
+                    "name": 'Quote " and é',
+                    "type": "url",
+                    "url": "https://chrome.com/",
+                },
+                {"children": [], "name": "Empty", "type": "folder"},
+            ],
+            "name": "Bookmarks bar",
+            "type": "folder",
+        }
+    },
+    "version": 1,
+}
+
+FIREFOX_JSON = {
+    "title": "",
+    "type": "text/x-moz-place-container",
+    "children": [
+        {
+            "title": "Firefox",
+            "dateAdded": 1600000000000000,
+            "type": "text/x-moz-place",
+            "uri": "https://firefox.com/",
+        },
+        {"type": "text/x-moz-place-separator"},
+    ],
+}
+
+
+def _summary(links) -> list[tuple]:
+    return [(link.url, link.title, link.created_at, link.read_at) for link in links]
+
+
+def test_html_exports(tmp_path: Path) -> None:
+    bookmarks = tmp_path / "bookmarks.html"
+    bookmarks.write_text(BOOKMARKS_HTML)
+    links = [*read_links(bookmarks)]
+    assert [(link.url, link.title) for link in links] == [
+        ("https://one.com/", "One & only"),
+        ("https://two.com/", "Two"),
+    ]
+    assert links[0].created_at == "2020-09-13T12:26:41+00:00"
+
+    pocket = tmp_path / "ril_export"
+    pocket.write_text(POCKET_HTML)
+    assert _summary(read_links(pocket)) == [
+        ("https://unread.com", "Unread", "2020-09-13T12:26:40+00:00", None),
+        (
+            "https://archived.com",
+            "Old",
+            "2017-07-14T02:40:00+00:00",
+            "2017-07-14T02:40:00+00:00",
+        ),
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [7, importers.CHUNK_SIZE])
+def test_json_exports_are_read_in_chunks(
+    tmp_path: Path, monkeypatch, chunk_size: int
+) -> None:
+    monkeypatch.setattr(importers, "CHUNK_SIZE", chunk_size)
+    chrome = tmp_path / "Bookmarks"
+    chrome.write_text(json.dumps(CHROME_JSON, indent=3))
+    assert _summary(read_links(chrome)) == [
+        (
+            "https://chrome.com/",
+            'Quote " and é',
+            "2020-07-23T17:46:40+00:00",
+            None,
+        )
+    ]
+    firefox = tmp_path / "firefox.json"
+    firefox.write_text(json.dumps(FIREFOX_JSON))
+    assert _summary(read_links(firefox, ImportFormat.JSON)) == [
+        ("https://firefox.com/", "Firefox", "2020-09-13T12:26:40+00:00", None)
+    ]
+
+
+def test_json_links_stream_before_the_file_is_read(monkeypatch) -> None:
+    monkeypatch.setattr(importers, "CHUNK_SIZE", 1024)
+    entries = [{"url": f"https://example.com/{index}"} for index in range(10_000)]
+    handle = io.StringIO(json.dumps({"children": entries}))
+    links = importers._json_links(handle)
+    assert next(links).url == "https://example.com/0"
+    assert handle.tell() < 2048
+    assert sum(1 for _link in links) == 9_999
+
+
+def test_csv_exports(tmp_path: Path) -> None:
+    pocket = tmp_path / "part_000000.csv"
+    pocket.write_text(
+        "title,url,time_added,tags,status\n"
+        "A,https://a.com,1600000000,,unread\n"
+        "B,https://b.com,1600000001,news,archive\n"
+    )
+    instapaper = tmp_path / "instapaper-export.csv"
+    instapaper.write_text(
+        "URL,Title,Selection,Folder,Timestamp\n"
+        "https://c.com,C,,Unread,1600000002\n"
+        "https://d.com,,,Archive,1600000003\n"
+    )
+    assert [
+        (link.url, link.title, link.read_at is not None)
+        for path in [pocket, instapaper]
+        for link in read_links(path)
+    ] == [
+        ("https://a.com", "A", False),
+        ("https://b.com", "B", True),
+        ("https://c.com", "C", False),
+        ("https://d.com", "https://d.com", True),
+    ]
+
+
+def test_cli_import_keeps_timestamps_and_reports_drops(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.json")
+    runner.invoke(app, ["init", "--capacity", "3", "--file-path", file_path])
+    runner.invoke(app, ["add", "https://one.com", "One", "--file-path", file_path])
+    export = tmp_path / "export.csv"
+    rows = [
+        f"U{index},https://u{index}.com,{1600000000 + index},,unread"
+        for index in range(4)
+    ]
+    export.write_text(
+        "title,url,time_added,tags,status\n"
+        "One again,https://www.one.com/,1500000000,,unread\n"
+        + "\n".join(rows)
+        + "\nRead,https://read.com,1500000000,,archive\n"
+    )
+
+    result = runner.invoke(app, ["import", str(export), "--file-path", file_path])
+    assert result.exit_code == 0, result.output
+    assert result.output.splitlines() == [
+        "Imported 3 links.",
+        "Skipped 1 already saved as unread links.",
+        "Dropped 2 unread links over the capacity of 3; "
+        "raise it with bejw capacity to import them.",
+    ]
+    reading_list = load(file_path)
+    assert [link.url for link in reading_list.unread_links()] == [
+        "https://u0.com",
+        "https://u1.com",
+        "https://one.com",
+    ]
+    assert [link.created_at for link in reading_list.read_links()] == [
+        "2017-07-14T02:40:00+00:00"
+    ]
+
+    broken = tmp_path / "broken.json"
+    broken.write_text('{"url": "https://x.com", "title": nope}')
+    result = runner.invoke(app, ["import", str(broken), "--file-path", file_path])
+    assert result.exit_code == 1
+    assert result.stderr.startswith(f"Could not read {broken}: ")
+    assert len(load(file_path)) == 4
@@ -0,0 +1,76 @@
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from bejw import storage, unread_index
+from bejw.main import app
+from bejw.storage import list_names, list_path, load
+
+runner = CliRunner()
+
+
+def _add(file_path: str, list_name: str, *urls: str) -> None:
+    for url in urls:
+        result = runner.invoke(
+            app,
+            ["add", url, url, "--list", list_name, "--file-path", file_path],
+        )
+        assert result.exit_code == 0, result.output
+
+
+@pytest.mark.parametrize("file_name", ["links.json", "links.db"])
+def test_named_lists_are_kept_apart(tmp_path: Path, file_name: str) -> None:
+    file_path = str(tmp_path / file_name)
+    runner.invoke(app, ["init", "--capacity", "3", "--file-path", file_path])
+    runner.invoke(
+        app, ["init", "--list", "work", "--capacity", "5", "--file-path", file_path]
+    )
+    _add(file_path, "work", "https://a.com", "https://b.com")
+    _add(file_path, "default", "https://c.com")
+    _add(file_path, "weekend", "https://d.com")
+    runner.invoke(app, ["mark-read", "1", "--list", "work", "--file-path", file_path])
+
+    assert list_names(file_path) == ["default", "weekend", "work"]
+    assert [link.url for link in load(file_path).links] == ["https://c.com"]
+    work = load(list_path(file_path, "work"))
+    assert [link.url for link in work.unread_links()] == ["https://b.com"]
+    result = runner.invoke(app, ["lists", "--file-path", file_path])
+    assert result.output.splitlines() == [
+        "default  1/3 unread",
+        "weekend  1/10 unread",
+        "work     1/5 unread",
+    ]
+
+
+def test_lists_reads_only_index_headers(tmp_path: Path, monkeypatch) -> None:
+    file_path = str(tmp_path / "links.json")
+    _add(file_path, "default", "https://a.com")
+    _add(file_path, "work", "https://b.com", "https://c.com")
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("decoded a link")
+
+    monkeypatch.setattr(unread_index, "unpack_link", _fail)
+    monkeypatch.setattr(storage, "load", _fail)
+    result = runner.invoke(app, ["lists", "--file-path", file_path])
+    assert result.output == "default  1/10 unread\nwork     2/10 unread\n"
+
+
+@pytest.mark.parametrize("file_name", ["links.json", "links.db"])
+def test_lists_shows_a_default_list_never_saved_as_empty(
+    tmp_path: Path, file_name: str
+) -> None:
+    file_path = str(tmp_path / file_name)
+    _add(file_path, "work", "https://a.com")
+    result = runner.invoke(app, ["lists", "--file-path", file_path])
+    assert result.output == "default  (empty)\nwork     1/10 unread\n"
+
+
+def test_invalid_list_names_are_refused(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.json")
+    for name in ["../work", ".hidden", "a.json", ""]:
+        result = runner.invoke(app, ["list", "--list", name, "--file-path", file_path])
+        assert result.exit_code == 1
+        assert result.output == f"Invalid list name: {name}\n"
+    assert not (tmp_path / "links.json.lists").exists()
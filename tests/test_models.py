@@ -1,6 +1,6 @@
 import pytest
 
-from bejw.models import CapacityError, Link, ReadingList
+from bejw.models import CapacityError, Link, ReadingList, parse_number_spec
 
 
 def test_add_link_increases_size_and_returns_link() -> None:
@@ -110,3 +110,148 @@ def test_replace_by_number_returns_none_for_invalid_number() -> None:
     assert reading_list.replace_by_number(0, "https://new.com", "New") is None
     assert reading_list.replace_by_number(5, "https://new.com", "New") is None
     assert len(reading_list.links) == 1
+
+
+def test_partitions_stay_sorted_across_mutations() -> None:
+    reading_list = ReadingList(
+        capacity=5,
+        links=[
+            Link(
+                id="late",
+                url="u3",
+                title="Late",
+                created_at="2024-01-03T00:00:00+00:00",
+            ),
+            Link(
+                id="early",
+                url="u1",
+                title="Early",
+                created_at="2024-01-01T00:00:00+00:00",
+            ),
+            Link(
+                id="tie-a",
+                url="u2",
+                title="Tie A",
+                created_at="2024-01-02T00:00:00+00:00",
+            ),
+            Link(
+                id="tie-b",
+                url="u4",
+                title="Tie B",
+                created_at="2024-01-02T00:00:00+00:00",
+            ),
+        ],
+    )
+
+    assert [link.id for link in reading_list.unread_links()] == [
+        "early",
+        "tie-a",
+        "tie-b",
+        "late",
+    ]
+
+    reading_list.mark_read_by_number(2)
+    reading_list.remove_by_number(1)
+
+    assert [link.id for link in reading_list.unread_links()] == ["tie-b", "late"]
+    assert [link.id for link in reading_list.read_links()] == ["tie-a"]
+    assert [link.id for link in reading_list.ordered_links()] == [
+        "tie-a",
+        "tie-b",
+        "late",
+    ]
+    assert [link.id for link in reading_list.links] == ["late", "tie-a", "tie-b"]
+
+
+def test_unread_at_and_unread_number_agree() -> None:
+    reading_list = ReadingList(capacity=3)
+    first = reading_list.add_link("https://example.com/1", "One")
+    second = reading_list.add_link("https://example.com/2", "Two")
+
+    assert reading_list.unread_at(2) == second
+    assert reading_list.unread_at(3) is None
+    assert reading_list.unread_number(first.id) == 1
+    assert reading_list.unread_number(second.id) == 2
+    assert reading_list.unread_count() == 2
+
+
+def test_created_key_orders_mixed_offsets_and_legacy_values() -> None:
+    utc = Link(id="a", url="u", title="t", created_at="2024-01-01T01:00:00+00:00")
+    offset = Link(id="b", url="u", title="t", created_at="2024-01-01T02:45:00+02:00")
+    naive = Link(id="c", url="u", title="t", created_at="2024-01-01T00:30:00")
+    invalid = Link(id="d", url="u", title="t", created_at="not a timestamp")
+
+    ordered = sorted([utc, offset, naive, invalid], key=lambda link: link.created_key)
+
+    assert [link.id for link in ordered] == ["d", "c", "b", "a"]
+    assert utc.created_key == 1704070800 * 1_000_000
+    assert "created_key" not in utc.to_dict()
+
+
+def test_read_partition_tracks_mutations_after_first_use() -> None:
+    reading_list = ReadingList(capacity=5)
+    first = reading_list.add_link("https://example.com/1", "One")
+    second = reading_list.add_link("https://example.com/2", "Two")
+    assert reading_list.read_links() == []
+
+    reading_list.mark_read_by_number(2)
+    reading_list.mark_read_by_number(1)
+    reading_list.remove_by_number(1, include_read=True)
+
+    assert [link.id for link in reading_list.read_links()] == [second.id]
+    assert first.id not in {link.id for link in reading_list.links}
+
+
+def test_import_links_keeps_timestamps_and_numbering_in_order() -> None:
+    reading_list = ReadingList(capacity=3)
+    reading_list.mark_saved()
+    kept = reading_list.add_link("https://example.com/kept", "Kept")
+    assert reading_list.read_links() == []
+
+    def _link(path: str, created_at: str, read_at: str | None = None) -> Link:
+        url = f"https://example.com/{path}"
+        return Link(path, url, path, created_at, read_at)
+
+    counts = reading_list.import_links(
+        [
+            _link("old", "2001-01-01T00:00:00+00:00"),
+            _link("read", "2000-01-01T00:00:00+00:00", "2002-01-01T00:00:00+00:00"),
+            _link("again", "2003-01-01T00:00:00+00:00"),
+            _link("kept", "2003-01-01T00:00:00+00:00"),
+            _link("over", "2004-01-01T00:00:00+00:00"),
+        ]
+    )
+
+    assert counts == (3, 1, 1)
+    assert [link.id for link in reading_list.unread_links()] == [
+        "old",
+        "again",
+        kept.id,
+    ]
+    assert [link.id for link in reading_list.read_links()] == ["read"]
+    assert reading_list.unread_number("again") == 2
+    assert len(reading_list.changes()) == 4
+
+
+def test_link_is_slotted_and_mark_read_keeps_other_links() -> None:
+    reading_list = ReadingList(capacity=3)
+    first = reading_list.add_link("https://example.com/1", "One")
+    second = reading_list.add_link("https://example.com/2", "Two")
+
+    reading_list.mark_read_by_number(2)
+
+    assert not hasattr(first, "__dict__")
+    assert reading_list.links[0] is first
+    assert reading_list.links[1].id == second.id
+    assert reading_list.links[1].read_at is not None
+
+
+def test_parse_number_spec_expands_ranges() -> None:
+    assert parse_number_spec("1-3,5,7-", 8) == [1, 2, 3, 5, 7, 8]
+    assert parse_number_spec("2,2,1", 3) == [1, 2]
+    with pytest.raises(ValueError):
+        parse_number_spec("0", 3)
+    with pytest.raises(ValueError):
+        parse_number_spec("a-b", 3)
+    with pytest.raises(LookupError):
+        parse_number_spec("1-99999999999", 0)
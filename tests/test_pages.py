@@ -0,0 +1,139 @@
+import time
+import webbrowser
+from pathlib import Path
+from urllib.parse import urlsplit
+from urllib.request import url2pathname
+
+import pytest
+from typer.testing import CliRunner
+
+from bejw.main import app
+from bejw.models import ReadingList
+from bejw.pages import PageStore, download
+from bejw.storage import save
+
+runner = CliRunner()
+
+DELAY = 0.2
+
+
+def _route(handler) -> None:
+    if handler.path.startswith("/slow/"):
+        time.sleep(DELAY)
+        handler.send(200, f"<title>{handler.path}</title>".encode() * 100)
+    elif handler.path.startswith("/same/"):
+        handler.send(200, b"<title>Mirrored</title>")
+    elif handler.path == "/moved":
+        handler.send(302, Location="/same/target")
+    else:
+        handler.send(404)
+
+
+@pytest.fixture
+def server(serve):
+    return serve(_route)
+
+
+def _blobs(directory: Path) -> list[Path]:
+    return sorted((directory / "blobs").glob("*/*.gz"))
+
+
+def test_pages_are_downloaded_concurrently_into_shared_blobs(
+    server, tmp_path: Path
+) -> None:
+    server, base = server
+    store = PageStore(tmp_path)
+    urls = [f"{base}/slow/{index}" for index in range(8)]
+    started = time.perf_counter()
+    results = download(store, [*urls, f"{base}/same/a", f"{base}/moved", "/x"])
+    elapsed = time.perf_counter() - started
+    assert server.max_in_flight > 1
+    assert elapsed < len(urls) * DELAY / 2
+    assert results[f"{base}/same/a"].digest == results[f"{base}/moved"].digest
+    assert results[f"{base}/same/a"].content_type == "text/html; charset=utf-8"
+    assert results["/x"].error is not None
+    assert len(_blobs(tmp_path)) == 9
+
+    server.clients.clear()
+    download(store, [f"{base}/same/{index}" for index in range(4)], concurrency=1)
+    assert len(server.clients) == 1
+    assert len(_blobs(tmp_path)) == 9
+
+
+def test_eviction_drops_least_recently_used_copies_of_read_links(
+    tmp_path: Path,
+) -> None:
+    store = PageStore(tmp_path)
+    for index, link_id in enumerate(["old", "unread", "shared", "recent"]):
+        store.add(link_id, link_id, store.put_blob(link_id.encode() * 50), None)
+        store.pages[link_id]["used"] = index
+    store.add("twin", "twin", store.pages["shared"]["digest"], None)
+    store.pages["twin"]["used"] = 0
+    total = sum(store.pages[link_id]["size"] for link_id in ["old", "unread"])
+    total += sum(store.pages[link_id]["size"] for link_id in ["shared", "recent"])
+    assert store.size() == total
+
+    # "twin" was used long ago, but shares its blob with a more recent copy.
+    assert store.evict({"unread"}, total - store.pages["old"]["size"]) == ["old"]
+    assert store.evict({"unread"}, 0) == ["shared", "twin", "recent"]
+    assert [*store.pages] == ["unread"]
+    assert len(_blobs(tmp_path)) == 1
+    store.save()
+    assert [*PageStore(tmp_path).pages] == ["unread"]
+
+
+def test_replaced_blobs_and_copies_are_not_left_behind(tmp_path: Path) -> None:
+    store = PageStore(tmp_path)
+    old = store.put_blob(b"old" * 50)
+    store.add("a", "a", old, None)
+    store.add("b", "b", old, None)
+    store.add("c", "c", store.put_blob(b"c" * 50), None)
+    copy = store.open_copy("c")
+    assert store.size() == sum(path.stat().st_size for path in _blobs(tmp_path)) + (
+        copy.stat().st_size
+    )
+
+    store.add("a", "a", store.put_blob(b"new" * 50), None)
+    store.save()
+    assert len(_blobs(tmp_path)) == 3
+    store.add("b", "b", store.pages["a"]["digest"], None)
+    store.save()
+    assert len(_blobs(tmp_path)) == 2
+
+    # Copies are rebuilt from their blob, so they go before any blob does.
+    store.evict({"a", "b", "c"}, store.size() - 1)
+    assert not copy.exists()
+    assert len(_blobs(tmp_path)) == 2
+
+
+def test_cli_fetch_and_read_offline(server, tmp_path: Path, monkeypatch) -> None:
+    server, base = server
+    file_path = str(tmp_path / "links.json")
+    reading_list = ReadingList(capacity=10)
+    for path in ["/slow/1", "/same/a", "/missing"]:
+        reading_list.add_link(f"{base}{path}", path)
+    save(reading_list, file_path)
+    opened = []
+    monkeypatch.setattr(webbrowser, "open", lambda url, *_a, **_k: opened.append(url))
+
+    result = runner.invoke(app, ["fetch", "--file-path", file_path])
+    assert result.stdout.startswith("Fetched 2 pages; ")
+    assert result.stderr == "Could not fetch #3: HTTP 404\n"
+
+    result = runner.invoke(app, ["read", "1-3", "--offline", "--file-path", file_path])
+    assert result.exit_code == 1
+    assert result.stdout.splitlines() == [
+        f"Opened #1 offline: {base}/slow/1",
+        f"Opened #2 offline: {base}/same/a",
+    ]
+    assert result.stderr.startswith(f"No offline copy of #3: {base}/missing\n")
+    copy = Path(url2pathname(urlsplit(opened[0]).path))
+    assert copy.suffix == ".html"
+    assert copy.read_bytes() == b"<title>/slow/1</title>" * 100
+
+    # Read links' copies make room first; unread links' are always kept.
+    runner.invoke(app, ["mark-read", "1", "--file-path", file_path])
+    runner.invoke(app, ["fetch", "--max-size", "0", "--file-path", file_path])
+    store = PageStore(tmp_path / "links.json.pages")
+    assert [entry["url"] for entry in store.pages.values()] == [f"{base}/same/a"]
+    assert not copy.exists()
@@ -0,0 +1,134 @@
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from bejw import archive, storage
+from bejw.main import app
+from bejw.models import Link, ReadingList
+from bejw.storage import load, save, search
+
+runner = CliRunner()
+
+
+def _seed(file_path: str) -> None:
+    links = [
+        Link("a", "https://docs.python.org/3/", "Python docs", "2024-01-01T00:00:00"),
+        Link("b", "https://example.com/pythonic", "Idioms", "2024-01-02T00:00:00"),
+        Link(
+            "c",
+            "https://python.example/",
+            "Snakes",
+            "2024-01-03T00:00:00",
+            "2024-02-01T00:00:00",
+        ),
+        Link("d", "https://rust-lang.org/", "Rust book", "2024-01-04T00:00:00"),
+        Link(
+            "e",
+            "https://blog.example/typing",
+            "Python typing tips",
+            "2024-01-05T00:00:00",
+            "2024-02-02T00:00:00",
+        ),
+    ]
+    save(ReadingList(capacity=10, links=links), file_path)
+
+
+def _numbers(file_path: str, include_read: bool) -> dict[str, int]:
+    reading_list = load(file_path)
+    return {
+        link.id: number
+        for number, link in reading_list.iter_links(include_read=include_read)
+    }
+
+
+def test_prefix_and_terms_are_ranked_with_list_numbers(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    _list, results = search(file_path, "pyth")
+    # Title beats host beats path; unread links only.
+    assert [link.id for _number, link in results] == ["a", "b"]
+    numbers = _numbers(file_path, include_read=False)
+    assert [number for number, _link in results] == [numbers["a"], numbers["b"]]
+
+    _list, results = search(file_path, "python DOCS")
+    assert [link.id for _number, link in results] == ["a"]
+    assert search(file_path, "python rust")[1] == []
+    with pytest.raises(ValueError):
+        search(file_path, " -- ")
+
+
+def test_archived_links_are_found_through_terms_files(
+    tmp_path: Path, monkeypatch
+) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    numbers = _numbers(file_path, include_read=True)
+
+    def _fail(directory, segments):
+        raise AssertionError("whole archive was read")
+
+    monkeypatch.setattr(archive, "read", _fail)
+    _list, results = search(file_path, "python", include_read=True)
+    assert [(number, link.id) for number, link in results] == [
+        (numbers["a"], "a"),
+        (numbers["e"], "e"),
+        (numbers["c"], "c"),
+        (numbers["b"], "b"),
+    ]
+
+
+def test_terms_follow_archive_appends_and_rewrites(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(storage, "JOURNAL_MAX_RECORDS", 0)
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    runner.invoke(app, ["mark-read", "3", "--file-path", file_path])
+    _list, results = search(file_path, "rust", include_read=True)
+    assert [(link.id, link.read_at is not None) for _n, link in results] == [
+        ("d", True)
+    ]
+
+    reading_list = load(file_path)
+    reading_list.remove_link("e")
+    save(reading_list, file_path)
+    _list, results = search(file_path, "typing", include_read=True)
+    assert results == []
+
+
+def test_archive_without_terms_or_with_pending_changes_is_scanned(
+    tmp_path: Path,
+) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    reading_list = load(file_path)
+    reading_list.remove_link("e")
+    # Journaled only: the archive still holds "e".
+    save(reading_list, file_path)
+    _list, results = search(file_path, "typing", include_read=True)
+    assert results == []
+
+    for terms in Path(file_path + storage.ARCHIVE_SUFFIX).glob("*.terms"):
+        terms.unlink()
+    _list, results = search(file_path, "snakes", include_read=True)
+    assert [link.id for _number, link in results] == ["c"]
+
+
+def test_search_command(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    result = runner.invoke(
+        app,
+        ["search", "python", "--include-read", "-f", "tsv", "--file-path", file_path],
+    )
+    assert result.exit_code == 0
+    rows = [line.split("\t") for line in result.output.splitlines()[1:]]
+    assert [row[2] for row in rows] == [
+        "Python docs",
+        "Python typing tips",
+        "Snakes",
+        "Idioms",
+    ]
+
+    result = runner.invoke(app, ["search", "!!", "--file-path", file_path])
+    assert result.exit_code == 1
+    assert result.output == "Nothing to search for.\n"
@@ -0,0 +1,135 @@
+import sqlite3
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from bejw.main import app
+from bejw.models import Link, ReadingList
+from bejw.storage import load, save
+
+
+runner = CliRunner()
+
+
+def _seed_reading_list(file_path: str) -> None:
+    reading_list = ReadingList(
+        capacity=10,
+        links=[
+            Link(
+                id="id-1",
+                title="Read First",
+                url="https://example.com/1",
+                created_at="2024-01-01T00:00:00+00:00",
+                read_at="2024-01-05T00:00:00+00:00",
+            ),
+            Link(
+                id="id-2",
+                title="Unread Later",
+                url="https://example.com/2",
+                created_at="2024-01-03T00:00:00+00:00",
+            ),
+            Link(
+                id="id-3",
+                title="Unread Earlier",
+                url="https://example.com/3",
+                created_at="2024-01-02T00:00:00+00:00",
+            ),
+        ],
+    )
+    save(reading_list, file_path)
+
+
+def test_sqlite_round_trip_by_suffix(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.db")
+    _seed_reading_list(file_path)
+
+    loaded = load(file_path)
+
+    assert loaded.capacity == 10
+    assert [link.id for link in loaded.links] == ["id-1", "id-2", "id-3"]
+    assert loaded.links[0].read_at == "2024-01-05T00:00:00+00:00"
+
+
+def test_sqlite_unread_only_load_is_ordered(tmp_path: Path) -> None:
+    file_path = "sqlite:" + str(tmp_path / "links")
+    _seed_reading_list(file_path)
+
+    loaded = load(file_path, include_read=False)
+
+    assert [link.id for link in loaded.links] == ["id-3", "id-2"]
+
+
+def test_sqlite_save_applies_changes_without_touching_read_links(
+    tmp_path: Path,
+) -> None:
+    file_path = str(tmp_path / "links.sqlite")
+    _seed_reading_list(file_path)
+
+    reading_list = load(file_path, include_read=False)
+    reading_list.mark_read_by_number(1)
+    reading_list.capacity = 4
+    save(reading_list, file_path)
+
+    loaded = load(file_path)
+    assert loaded.capacity == 4
+    assert len(loaded.links) == 3
+    assert [link.id for link in loaded.unread_links()] == ["id-2"]
+
+
+def test_sqlite_queries_use_indexes(tmp_path: Path) -> None:
+    file_path = tmp_path / "links.db"
+    _seed_reading_list(str(file_path))
+
+    with sqlite3.connect(file_path) as connection:
+        plan = connection.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM links WHERE read_at IS NULL"
+            " ORDER BY created_key, seq"
+        ).fetchall()
+    connection.close()
+
+    assert "links_read_created" in " ".join(str(row) for row in plan)
+
+
+def test_migrate_copies_json_list_into_sqlite(tmp_path: Path) -> None:
+    source = str(tmp_path / "links.json")
+    target = str(tmp_path / "links.db")
+    _seed_reading_list(source)
+
+    result = runner.invoke(app, ["migrate", source, target])
+
+    assert result.exit_code == 0
+    assert result.stdout == f"Migrated 3 links to {target}\n"
+    list_result = runner.invoke(
+        app, ["list", "--file-path", target, "--format", "tsv", "--no-header"]
+    )
+    assert list_result.stdout == (
+        "1\tunread\tUnread Earlier\thttps://example.com/3\n"
+        "2\tunread\tUnread Later\thttps://example.com/2\n"
+    )
+
+
+def test_checked_fields_are_stored_and_added_to_old_databases(
+    tmp_path: Path,
+) -> None:
+    path = tmp_path / "links.db"
+    with sqlite3.connect(path) as connection:
+        connection.executescript(
+            "CREATE TABLE links (seq INTEGER PRIMARY KEY, id TEXT NOT NULL,"
+            " url TEXT NOT NULL, title TEXT NOT NULL, created_at TEXT NOT NULL,"
+            " created_key INTEGER NOT NULL, read_at TEXT);"
+            "INSERT INTO links VALUES"
+            " (1, 'id-1', 'https://a.com', 'A', '2024-01-01T00:00:00', 0, NULL);"
+        )
+    connection.close()
+    file_path = str(path)
+
+    reading_list = load(file_path)
+    assert reading_list.links[0].final_url is None
+    reading_list.record_check("id-1", "https://a.com/moved", "2024-02-01T00:00:00")
+    save(reading_list, file_path)
+
+    (link,) = load(file_path).links
+    assert (link.final_url, link.dead_at) == (
+        "https://a.com/moved",
+        "2024-02-01T00:00:00",
+    )
@@ -1,8 +1,12 @@
 from pathlib import Path
 import json
+import os
 
+import pytest
+
+from bejw import storage
 from bejw.models import ReadingList
-from bejw.storage import load, save
+from bejw.storage import load, save, update
 
 
 def test_load_returns_default_when_file_missing(tmp_path: Path) -> None:
@@ -48,3 +52,177 @@ def test_load_legacy_payload_without_read_at(tmp_path: Path) -> None:
     assert loaded.capacity == 3
     assert len(loaded.links) == 1
     assert loaded.links[0].read_at is None
+
+
+def test_mutations_after_load_append_to_journal(tmp_path: Path) -> None:
+    file_path = tmp_path / "links.json"
+    original = ReadingList(capacity=3)
+    original.add_link("https://example.com/1", "One")
+    save(original, str(file_path))
+    snapshot = file_path.read_text(encoding="utf-8")
+
+    reading_list = load(str(file_path))
+    reading_list.add_link("https://example.com/2", "Two")
+    reading_list.mark_read_by_number(1)
+    save(reading_list, str(file_path))
+
+    assert file_path.read_text(encoding="utf-8") == snapshot
+    journal = tmp_path / "links.json.journal"
+    header, *records = [json.loads(line) for line in journal.read_text().splitlines()]
+    assert header == {"base": 1}
+    assert [record["op"] for record in records] == ["add", "read"]
+
+    loaded = load(str(file_path))
+    assert [link.title for link in loaded.unread_links()] == ["Two"]
+    assert [link.title for link in loaded.read_links()] == ["One"]
+
+
+def test_load_ignores_torn_journal_record(tmp_path: Path) -> None:
+    file_path = tmp_path / "links.json"
+    save(ReadingList(capacity=3), str(file_path))
+    reading_list = load(str(file_path))
+    reading_list.capacity = 5
+    save(reading_list, str(file_path))
+    with (tmp_path / "links.json.journal").open("a") as handle:
+        handle.write('{"op": "cle')
+
+    assert load(str(file_path)).capacity == 5
+
+
+def test_appends_after_a_torn_record_are_kept(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.json")
+    save(ReadingList(capacity=5), file_path)
+    update(file_path, lambda reading_list: reading_list.add_link("https://a.com", "A"))
+    journal = tmp_path / "links.json.journal"
+    with journal.open("a") as handle:
+        handle.write('{"op": "add", "li')
+    for url in ["https://b.com", "https://c.com"]:
+        update(file_path, lambda reading_list: reading_list.add_link(url, url))
+    (tmp_path / "links.json.index").unlink()
+
+    assert [link.url for link in load(file_path).links] == [
+        "https://a.com",
+        "https://b.com",
+        "https://c.com",
+    ]
+    # A torn line in the middle only loses itself.
+    journal.write_bytes(journal.read_bytes().replace(b"}}\n", b"}\n", 1))
+    assert [link.url for link in load(file_path).links] == [
+        "https://b.com",
+        "https://c.com",
+    ]
+
+
+def test_journal_is_compacted_past_record_threshold(
+    tmp_path: Path, monkeypatch
+) -> None:
+    monkeypatch.setattr(storage, "JOURNAL_MAX_RECORDS", 2)
+    file_path = tmp_path / "links.json"
+    save(ReadingList(capacity=5), str(file_path))
+
+    for index in range(3):
+        reading_list = load(str(file_path))
+        reading_list.add_link(f"https://example.com/{index}", f"Link {index}")
+        save(reading_list, str(file_path))
+
+    assert not (tmp_path / "links.json.journal").exists()
+    data = json.loads(file_path.read_text(encoding="utf-8"))
+    assert len(data["links"]) == 3
+
+
+def test_bulk_changes_skip_the_journal(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(storage, "JOURNAL_MAX_RECORDS", 2)
+    monkeypatch.setattr(storage, "_append_journal", None)
+    file_path = str(tmp_path / "links.json")
+    save(ReadingList(capacity=5), file_path)
+
+    def _add_three(reading_list: ReadingList) -> None:
+        reading_list.add_links([(f"https://example.com/{i}", "Link") for i in "abc"])
+
+    update(file_path, _add_three, include_read=True)
+    assert len(load(file_path)) == 3
+
+
+def _written(directory: Path) -> dict[str, tuple[int, int]]:
+    return {
+        path.name: (path.stat().st_mtime_ns, path.stat().st_size)
+        for path in directory.iterdir()
+        if path.suffix != storage.LOCK_SUFFIX
+    }
+
+
+@pytest.mark.parametrize("file_name", ["links.json", "links.bejw", "links.db"])
+def test_unchanged_lists_are_not_written(tmp_path: Path, file_name: str) -> None:
+    file_path = str(tmp_path / file_name)
+    original = ReadingList(capacity=3)
+    read = original.add_link("https://example.com/1", "One")
+    original.mark_read(read.id)
+    original.add_link("https://example.com/2", "Two")
+    save(original, file_path)
+    written = _written(tmp_path)
+
+    def _no_op(reading_list: ReadingList) -> None:
+        reading_list.capacity = 3
+        assert not reading_list.remove_by_number(5)
+        assert reading_list.mark_read(read.id)
+
+    update(file_path, _no_op, include_read=True)
+    update(file_path, _no_op, include_read=True)
+    assert _written(tmp_path) == written
+
+    # Only the unread link is loaded, but the read one must be cleared too.
+    assert update(file_path, ReadingList.clear_links)
+    assert load(file_path).links == []
+    written = _written(tmp_path)
+    assert not update(file_path, ReadingList.clear_links)
+    assert _written(tmp_path) == written
+
+
+@pytest.mark.parametrize("capacity", [-1, 5_000_000_000])
+def test_capacities_the_index_cannot_hold_do_not_break_loading(
+    tmp_path: Path, capacity: int
+) -> None:
+    file_path = str(tmp_path / "links.json")
+    original = ReadingList(capacity=3)
+    original.add_link("https://example.com", "Example")
+    save(original, file_path)
+
+    def _set_capacity(reading_list: ReadingList) -> None:
+        reading_list.capacity = capacity
+
+    update(file_path, _set_capacity)
+    assert not (tmp_path / "links.json.index").exists()
+    assert load(file_path, include_read=False).capacity == capacity
+    assert update(file_path, lambda reading_list: reading_list.mark_read_by_number(1))
+    assert len(load(file_path).read_links()) == 1
+
+
+def test_rewrites_keep_the_file_mode(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(storage, "JOURNAL_MAX_RECORDS", 0)
+    file_path = tmp_path / "links.json"
+    umask = os.umask(0o022)
+    try:
+        save(ReadingList(capacity=3), str(file_path))
+        assert file_path.stat().st_mode & 0o777 == 0o644
+
+        file_path.chmod(0o640)
+        update(str(file_path), lambda reading_list: reading_list.add_link("u", "t"))
+    finally:
+        os.umask(umask)
+    assert file_path.stat().st_mode & 0o777 == 0o640
+
+
+@pytest.mark.parametrize("file_name", ["links.json", "links.bejw"])
+def test_titles_that_are_not_utf8_are_saved(tmp_path: Path, file_name: str) -> None:
+    # What Python makes of a Latin-1 argument in a UTF-8 locale.
+    title = b"caf\xe9".decode("utf-8", "surrogateescape")
+    file_path = str(tmp_path / file_name)
+    save(ReadingList(capacity=3), file_path)
+
+    update(
+        file_path, lambda reading_list: reading_list.add_link("https://x.com", title)
+    )
+    assert load(file_path, include_read=False).links[0].title == title
+    update(file_path, lambda reading_list: reading_list.mark_read_by_number(1))
+    storage.compact(load(file_path), file_path)
+    assert load(file_path).read_links()[0].title == title
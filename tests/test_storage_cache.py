@@ -0,0 +1,100 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from bejw import storage
+from bejw.models import ReadingList
+from bejw.storage import load, save, update
+
+
+@pytest.fixture(autouse=True)
+def cache_everything(monkeypatch) -> None:
+    monkeypatch.setattr(storage, "CACHE_MIN_BYTES", 0)
+
+
+def _cache(file_path: str) -> Path:
+    return Path(file_path + storage.CACHE_SUFFIX)
+
+
+def _seed(file_path: str) -> None:
+    reading_list = ReadingList(capacity=5)
+    reading_list.add_link("https://a.com", "A")
+    reading_list.add_link("https://b.com", "B")
+    save(reading_list, file_path)
+
+
+def _no_decoding(monkeypatch) -> None:
+    def _fail(data: dict) -> ReadingList:
+        raise AssertionError("JSON was decoded")
+
+    monkeypatch.setattr(ReadingList, "from_dict", staticmethod(_fail))
+
+
+def test_second_load_comes_from_cache(tmp_path: Path, monkeypatch) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    first = load(file_path)
+    assert _cache(file_path).exists()
+
+    _no_decoding(monkeypatch)
+    cached = load(file_path)
+    assert cached.links == first.links
+    assert cached.capacity == 5
+    assert [link.title for link in cached.unread_links()] == ["A", "B"]
+
+
+def test_cached_list_saves_like_a_decoded_one(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    load(file_path)
+    cached = load(file_path)
+    cached.mark_read(cached.unread_at(1).id)
+    save(cached, file_path)
+    assert not _cache(file_path).exists()
+    assert [link.title for link in load(file_path).unread_links()] == ["B"]
+
+
+def test_update_does_not_build_cache(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    update(file_path, lambda reading_list: reading_list.add_link("https://c.com", "C"))
+    assert not _cache(file_path).exists()
+
+
+def test_same_stat_different_content_is_detected(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    load(file_path)
+    path = Path(file_path)
+    before = path.stat()
+    # Rewrite in place with the same size and mtime, so only the hash differs.
+    data = path.read_bytes().replace(b"https://a.com", b"https://x.com")
+    with path.open("r+b") as handle:
+        handle.write(data)
+    os.utime(path, ns=(before.st_atime_ns, before.st_mtime_ns))
+    assert path.stat().st_size == before.st_size
+
+    assert load(file_path).unread_at(1).url == "https://x.com"
+
+
+def test_journal_changes_miss_the_cache(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    load(file_path)
+    other = load(file_path, store_cache=False)
+    other.add_link("https://c.com", "C")
+    save(other, file_path)
+    assert [link.title for link in load(file_path).unread_links()] == ["A", "B", "C"]
+
+
+def test_corrupt_cache_is_ignored(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    load(file_path)
+    _cache(file_path).write_bytes(b"garbage")
+    assert len(load(file_path).links) == 2
+    # A valid header followed by a truncated snapshot.
+    load(file_path)
+    _cache(file_path).write_bytes(_cache(file_path).read_bytes()[:-10])
+    assert len(load(file_path).links) == 2
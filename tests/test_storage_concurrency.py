@@ -0,0 +1,104 @@
+import multiprocessing
+from pathlib import Path
+
+import pytest
+
+from bejw import storage
+from bejw.models import ConflictError, ReadingList
+from bejw.storage import load, save, update
+
+WORKERS = 4
+ADDS_PER_WORKER = 25
+
+
+def _add_many(file_path: str, worker: int) -> None:
+    for index in range(ADDS_PER_WORKER):
+        update(
+            file_path,
+            lambda reading_list: reading_list.add_link(
+                f"https://example.com/{worker}/{index}", f"Link {worker}-{index}"
+            ),
+        )
+
+
+def _run_workers(file_path: str) -> None:
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=_add_many, args=(file_path, worker))
+        for worker in range(WORKERS)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+
+@pytest.mark.parametrize("file_name", ["links.json", "links.db"])
+def test_concurrent_writers_lose_no_updates(
+    tmp_path: Path, monkeypatch, file_name: str
+) -> None:
+    # A tiny journal threshold makes the writers race through compactions too.
+    monkeypatch.setattr(storage, "JOURNAL_MAX_RECORDS", 7)
+    file_path = str(tmp_path / file_name)
+    save(ReadingList(capacity=1000), file_path)
+
+    _run_workers(file_path)
+
+    loaded = load(file_path)
+    assert len(loaded.links) == WORKERS * ADDS_PER_WORKER
+    assert len({link.url for link in loaded.links}) == WORKERS * ADDS_PER_WORKER
+
+
+@pytest.mark.parametrize("file_name", ["links.json", "links.db"])
+def test_save_detects_write_since_load(tmp_path: Path, file_name: str) -> None:
+    file_path = str(tmp_path / file_name)
+    save(ReadingList(capacity=5), file_path)
+    first = load(file_path)
+    second = load(file_path)
+
+    first.add_link("https://example.com/1", "One")
+    save(first, file_path)
+    second.add_link("https://example.com/2", "Two")
+
+    with pytest.raises(ConflictError):
+        save(second, file_path)
+    assert [link.title for link in load(file_path).links] == ["One"]
+
+
+def test_update_retries_after_conflict(tmp_path: Path, monkeypatch) -> None:
+    file_path = str(tmp_path / "links.json")
+    save(ReadingList(capacity=5), file_path)
+    real_load = storage.load
+    interfered = []
+
+    def _load_then_interfere(*args, **kwargs):
+        reading_list = real_load(*args, **kwargs)
+        if not interfered:
+            other = real_load(file_path)
+            other.add_link("https://example.com/other", "Other")
+            save(other, file_path)
+            interfered.append(True)
+        return reading_list
+
+    monkeypatch.setattr(storage, "load", _load_then_interfere)
+
+    update(file_path, lambda reading_list: reading_list.add_link("https://a.com", "A"))
+
+    titles = sorted(link.title for link in real_load(file_path).links)
+    assert titles == ["A", "Other"]
+
+
+def test_reader_ignores_journal_folded_into_newer_snapshot(tmp_path: Path) -> None:
+    file_path = tmp_path / "links.json"
+    save(ReadingList(capacity=5), str(file_path))
+    reading_list = load(str(file_path))
+    reading_list.add_link("https://example.com", "Example")
+    save(reading_list, str(file_path))
+    stale_journal = (tmp_path / "links.json.journal").read_text()
+
+    storage.compact(load(str(file_path)), str(file_path))
+    # Simulate a reader that sees the new snapshot before the unlink.
+    (tmp_path / "links.json.journal").write_text(stale_journal)
+
+    assert len(load(str(file_path)).links) == 1
@@ -0,0 +1,133 @@
+import json
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from bejw import sync
+from bejw.main import app
+from bejw.storage import load
+
+runner = CliRunner()
+
+
+@pytest.fixture
+def devices(tmp_path: Path):
+    shared = tmp_path / "shared"
+    return shared, [str(tmp_path / name / "links.json") for name in "abc"]
+
+
+def _run(file_path: str, *args: str) -> str:
+    result = runner.invoke(app, [*args, "--file-path", file_path])
+    assert result.exit_code == 0, result.output
+    return result.output
+
+
+def _links(file_path: str) -> list[tuple[str, bool]]:
+    return sorted(
+        (link.url, link.read_at is not None) for link in load(file_path).links
+    )
+
+
+def _sync_all(shared: Path, files: list[str]) -> None:
+    # Twice round, so every device has seen every other device's changes.
+    for _round in range(2):
+        for file_path in files:
+            _run(file_path, "sync", str(shared))
+
+
+def test_concurrent_changes_all_survive(devices) -> None:
+    shared, (a, b, c) = devices
+    _run(a, "add", "https://one.com", "One")
+    assert _run(a, "sync", str(shared)) == (
+        f"Syncing through {shared}\nMerged 0 changes from 0 other devices.\n"
+    )
+    assert _run(b, "sync", str(shared)) == (
+        f"Syncing through {shared}\nMerged 2 changes from 1 other devices.\n"
+    )
+    assert _links(b) == [("https://one.com", False)]
+
+    _run(a, "add", "https://two.com", "Two")
+    _run(b, "mark-read", "1")
+    _run(c, "add", "https://three.com", "Three")
+    _sync_all(shared, [a, b, c])
+
+    expected = [
+        ("https://one.com", True),
+        ("https://three.com", False),
+        ("https://two.com", False),
+    ]
+    assert _links(a) == _links(b) == _links(c) == expected
+    assert {link.id for link in load(a).links} == {link.id for link in load(c).links}
+    assert _run(a, "sync") == "Merged 0 changes from 0 other devices.\n"
+
+
+def test_adds_win_over_concurrent_clear_and_removals_stick(devices) -> None:
+    shared, (a, b, _c) = devices
+    _run(a, "add", "https://one.com", "One")
+    _run(a, "add", "https://two.com", "Two")
+    _sync_all(shared, [a, b])
+
+    _run(a, "clear")
+    _run(b, "add", "https://three.com", "Three")
+    _run(b, "mark-read", "1")
+    _sync_all(shared, [b, a])
+    assert _links(a) == _links(b) == [("https://three.com", False)]
+
+    _run(b, "remove", "1")
+    _run(a, "mark-read", "1")
+    _sync_all(shared, [a, b])
+    assert _links(a) == _links(b) == []
+
+
+def test_latest_capacity_wins_whatever_the_merge_order(devices) -> None:
+    shared, (a, b, _c) = devices
+    _sync_all(shared, [a, b])
+    _run(a, "capacity", "5")
+    _run(b, "capacity", "7")
+    _sync_all(shared, [b, a])
+    assert load(a).capacity == load(b).capacity == 7
+
+
+def test_merge_reads_only_complete_new_entries(devices) -> None:
+    shared, (a, b, _c) = devices
+    _run(a, "add", "https://one.com", "One")
+    _sync_all(shared, [a, b])
+    config = sync.config(b)
+    log = shared / f"{sync.config(a)['device']}{sync.LOG_SUFFIX}"
+    assert config["cursors"][sync.config(a)["device"]] == log.stat().st_size
+
+    entry = {"time": 1e12, "change": {"op": "capacity", "value": 3}}
+    with log.open("a") as handle:
+        handle.write(json.dumps(entry))
+    assert _run(b, "sync") == "Merged 0 changes from 0 other devices.\n"
+    with log.open("a") as handle:
+        handle.write("\n")
+    assert _run(b, "sync") == "Merged 1 changes from 1 other devices.\n"
+    assert load(b).capacity == 3
+
+
+def test_torn_entries_do_not_stall_the_log(devices) -> None:
+    shared, (a, b, _c) = devices
+    _sync_all(shared, [a, b])
+    log = shared / f"{sync.config(a)['device']}{sync.LOG_SUFFIX}"
+    with log.open("a") as handle:
+        handle.write('{"time": 1, "change": {"op": "ca')
+    _run(a, "add", "https://one.com", "One")
+    assert _run(b, "sync") == "Merged 1 changes from 1 other devices.\n"
+
+    # A broken line that did end in a newline is skipped, not waited on.
+    with log.open("a") as handle:
+        handle.write("not json\n")
+    _run(a, "add", "https://two.com", "Two")
+    assert _run(b, "sync") == "Merged 1 changes from 1 other devices.\n"
+    assert _links(b) == [("https://one.com", False), ("https://two.com", False)]
+
+
+def test_sync_needs_a_folder_first(devices) -> None:
+    shared, (a, _b, _c) = devices
+    result = runner.invoke(app, ["sync", "--file-path", a])
+    assert result.exit_code == 1
+    _run(a, "sync", str(shared))
+    result = runner.invoke(app, ["sync", str(shared / "other"), "--file-path", a])
+    assert result.output == f"Already syncing through {shared}\n"
@@ -0,0 +1,94 @@
+import json
+import pstats
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from bejw import trace
+from bejw.main import app
+
+runner = CliRunner()
+
+
+def _seed(file_path: str) -> None:
+    runner.invoke(app, ["init", "--file-path", file_path])
+    runner.invoke(app, ["add", "https://a.com", "A", "--file-path", file_path])
+    runner.invoke(app, ["mark-read", "1", "--file-path", file_path])
+
+
+def test_profile_prints_phases_to_stderr(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    result = runner.invoke(
+        app,
+        [
+            "--profile",
+            "list",
+            "--include-read",
+            "--format",
+            "tsv",
+            "--file-path",
+            file_path,
+        ],
+    )
+    assert result.exit_code == 0
+    assert result.stdout.splitlines()[1] == "1\tread\tA\thttps://a.com"
+    names = [line.split()[0] for line in result.stderr.splitlines()[1:]]
+    assert names == [
+        "startup",
+        "load",
+        "cache",
+        "decode",
+        "from_dict",
+        "journal",
+        "render",
+        "sort_read",
+        "command",
+    ]
+    assert trace._active is None
+
+
+def test_profile_json_and_cprofile(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.json")
+    report_path = tmp_path / "trace.json"
+    stats_path = tmp_path / "bejw.prof"
+    runner.invoke(app, ["init", "--file-path", file_path])
+    result = runner.invoke(
+        app,
+        [
+            "--profile-json",
+            str(report_path),
+            "--cprofile",
+            str(stats_path),
+            "add",
+            "https://a.com",
+            "A",
+            "--file-path",
+            file_path,
+        ],
+    )
+    assert result.exit_code == 0
+    assert result.stderr == ""
+    phases = json.loads(report_path.read_text())["phases"]
+    by_name = {phase["name"]: phase for phase in phases}
+    assert {"load", "save", "command"} <= by_name.keys()
+    assert by_name["save"]["wall_ms"] >= 0
+    assert by_name["load"]["peak_kib"] is not None
+    assert pstats.Stats(str(stats_path)).total_calls > 0
+
+
+def test_trace_env_writes_json(tmp_path: Path, monkeypatch) -> None:
+    file_path = str(tmp_path / "links.json")
+    report_path = tmp_path / "trace.json"
+    monkeypatch.setenv(trace.TRACE_ENV, str(report_path))
+    result = runner.invoke(app, ["capacity", "--file-path", file_path])
+    assert result.exit_code == 0
+    phases = json.loads(report_path.read_text())["phases"]
+    assert phases[-1]["name"] == "command"
+
+
+def test_phase_is_a_no_op_without_tracing() -> None:
+    assert trace._active is None
+    with trace.phase("load"):
+        pass
+    assert trace.phase("load") is trace.phase("save")
@@ -0,0 +1,136 @@
+import json
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from bejw import binary_storage, storage, unread_index
+from bejw.main import app
+from bejw.models import ReadingList
+from bejw.storage import compact, load, open_index, save, update, update_unread
+
+runner = CliRunner()
+
+
+def _seed(file_path: str, unread: int = 4, read: int = 3) -> None:
+    reading_list = ReadingList(capacity=10)
+    for index in range(read):
+        link = reading_list.add_link(f"https://old.com/{index}", f"Old {index}")
+        reading_list.mark_read(link.id)
+    for index in range(unread):
+        reading_list.add_link(f"https://new.com/{index}", f"New {index}")
+    save(reading_list, file_path)
+
+
+def _count_decodes(monkeypatch) -> list:
+    decoded = []
+    real = unread_index.unpack_link
+
+    def _unpack(data, offset):
+        link = real(data, offset)
+        decoded.append(link.title)
+        return link
+
+    monkeypatch.setattr(unread_index, "unpack_link", _unpack)
+    return decoded
+
+
+def test_index_resolves_specs_decoding_only_touched_links(
+    tmp_path: Path, monkeypatch
+) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    decoded = _count_decodes(monkeypatch)
+    index = open_index(file_path)
+    assert index is not None
+    assert index.unread_count() == 4
+    resolved = index.resolve_spec("2,4")
+    assert [(number, link.title) for number, link in resolved] == [
+        (2, "New 1"),
+        (4, "New 3"),
+    ]
+    assert decoded == ["New 1", "New 3"]
+    with pytest.raises(LookupError):
+        index.resolve_spec("9")
+
+
+def test_stale_index_is_not_used(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    other = ReadingList(capacity=3)
+    other.add_link("https://other.com", "Other")
+    # Written by something that doesn't know about the index.
+    Path(file_path).write_text(json.dumps(other.to_dict()))
+    Path(file_path + storage.JOURNAL_SUFFIX).unlink(missing_ok=True)
+    assert open_index(file_path) is None
+    assert [link.title for link in load(file_path, include_read=False).links] == [
+        "Other"
+    ]
+
+
+def test_update_unread_appends_journal_and_trims_index(
+    tmp_path: Path, monkeypatch
+) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    decoded = _count_decodes(monkeypatch)
+
+    def _mark_second(index) -> None:
+        ((_number, link),) = index.resolve_spec("2")
+        index.mark_read(link.id)
+
+    update_unread(file_path, _mark_second)
+    assert decoded == ["New 1"]
+
+    index = open_index(file_path)
+    assert [link.title for link in index.unread_links()] == ["New 0", "New 2", "New 3"]
+    full = load(file_path)
+    assert [link.title for link in full.unread_links()] == ["New 0", "New 2", "New 3"]
+    assert len(full.read_links()) == 4
+
+
+def test_partial_list_compaction_keeps_read_links(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(storage, "JOURNAL_MAX_RECORDS", 2)
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    for index in range(4):
+        update(
+            file_path,
+            lambda reading_list, index=index: reading_list.add_link(
+                f"https://c.com/{index}", "C"
+            ),
+        )
+        # remove goes through the index, also compacting on the way.
+        update_unread(
+            file_path,
+            lambda view: view.remove_link(view.resolve_spec("1")[0][1].id),
+        )
+    full = load(file_path)
+    assert len(full.read_links()) == 3
+    assert full.unread_count() == 4
+
+
+def test_partial_list_cannot_be_snapshotted(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    partial = load(file_path, include_read=False)
+    assert len(partial.links) == 4
+    with pytest.raises(ValueError):
+        compact(partial, file_path)
+
+
+def test_binary_lists_are_indexed_too(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.bejw")
+    _seed(file_path)
+    assert binary_storage.is_binary(Path(file_path).read_bytes())
+    assert open_index(file_path).unread_at(1).title == "New 0"
+
+
+def test_cli_commands_keep_numbering_with_index(tmp_path: Path) -> None:
+    file_path = str(tmp_path / "links.json")
+    _seed(file_path)
+    result = runner.invoke(app, ["mark-read", "1,3", "--file-path", file_path])
+    assert result.output == "Marked #1, #3 as read.\n"
+    runner.invoke(app, ["remove", "2", "--file-path", file_path])
+    result = runner.invoke(app, ["list", "--format", "tsv", "--file-path", file_path])
+    assert result.output.splitlines()[1:] == ["1\tunread\tNew 1\thttps://new.com/1"]